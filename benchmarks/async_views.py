@@ -0,0 +1,105 @@
+"""
+Бенчмарк пропускной способности синхронных (DRF) и асинхронных представлений под uvicorn при большом количестве
+одновременных запросов. Скрипт запускает uvicorn с config.asgi, создает пользователя бенчмарка с модулями (если их
+нет) и поочередно нагружает пары эндпоинтов одинаковым количеством запросов с <concurrency> соединений keep-alive.
+
+Кеш ответов списков и детальной информации обходится уникальным параметром запроса, чтобы сравнивались представления,
+а не кеш (ключ --use-cache отключает это). Под ASGI каждый запрос выполняет синхронный код в новом потоке, и
+постоянные соединения с базой данных не переиспользуются, а копятся до DB_CONN_MAX_AGE, поэтому сервер запускается
+с DB_POOL_MODE=off (или pgbouncer).
+
+Запуск из директории training_modules (нужен uvicorn: pip install uvicorn):
+    python -m benchmarks.async_views --concurrency 200 --requests 5000
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import subprocess
+import sys
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
+
+from rest_framework_simplejwt.tokens import AccessToken  # noqa: E402
+
+from benchmarks.load import build_request, run_load, summarize, wait_for_server  # noqa: E402
+from modules.models import Module  # noqa: E402
+from users.models import User  # noqa: E402
+
+BENCH_EMAIL = 'bench-async@localhost.com'
+
+
+def prepare_data(modules):
+    user, _ = User.objects.get_or_create(email=BENCH_EMAIL, defaults={'is_active': True})
+    missing = modules - Module.objects.filter(module_user=user).count()
+    for number in range(max(missing, 0)):
+        Module.objects.create(title=f'модуль {number}', description='описание модуля', module_user=user)
+    module = Module.objects.filter(module_user=user).order_by('id').first()
+    return str(AccessToken.for_user(user)), module.pk
+
+
+async def bench(name, path, args, token, report=True):
+    counter = itertools.count()
+    separator = '&' if '?' in path else '?'
+
+    def make_request():
+        request_path = path if args.use_cache else f'{path}{separator}_={next(counter)}'
+        return build_request(args.host, 'GET', request_path, token), 200
+
+    result = await run_load(args.host, args.port, make_request, args.requests, args.concurrency)
+    if not report:
+        return
+
+    summary = summarize(result)
+    print(
+        f'{name:<26} {summary["throughput"]:>9.1f} {summary["p50_ms"]:>9.1f} '
+        f'{summary["p95_ms"]:>9.1f} {summary["p99_ms"]:>9.1f} {summary["errors"]:>7}'
+    )
+
+
+async def run(args, token, module_pk):
+    await wait_for_server(args.host, args.port)
+    endpoints = (
+        ('modules list (sync)', '/modules/'),
+        ('modules list (async)', '/modules/async/'),
+        ('module detail (sync)', f'/modules/{module_pk}/'),
+        ('module detail (async)', f'/modules/async/{module_pk}/'),
+        ('users list (sync)', '/user/'),
+        ('users list (async)', '/user/async/'),
+    )
+    print(f'{"эндпоинт":<26} {"запр./с":>9} {"p50, мс":>9} {"p95, мс":>9} {"p99, мс":>9} {"ошибок":>7}')
+    for name, path in endpoints:
+        # Прогрев: кеш пользователя, соединение с базой данных и импорт модулей в процессе сервера
+        await bench(name, path, argparse.Namespace(**{**vars(args), 'requests': args.concurrency}), token, False)
+        await bench(name, path, args, token)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--concurrency', type=int, default=100, help='количество одновременных соединений')
+    parser.add_argument('--requests', type=int, default=2000, help='количество запросов к каждому эндпоинту')
+    parser.add_argument('--modules', type=int, default=50, help='количество модулей пользователя бенчмарка')
+    parser.add_argument('--use-cache', action='store_true', help='не обходить кеш ответов')
+    parser.add_argument('--db-pool-mode', default='off', choices=('off', 'pgbouncer', 'persistent'))
+    args = parser.parse_args()
+
+    token, module_pk = prepare_data(args.modules)
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'config.asgi:application', '--host', args.host, '--port', str(args.port),
+         '--no-access-log', '--log-level', 'warning'],
+        env={**os.environ, 'DB_POOL_MODE': args.db_pool_mode},
+    )
+    try:
+        asyncio.run(run(args, token, module_pk))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == '__main__':
+    main()
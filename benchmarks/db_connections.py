@@ -0,0 +1,82 @@
+"""
+Бенчмарк задержки запроса с постоянными соединениями к базе данных и без них. Жизненный цикл запроса воспроизводится
+сигналами request_started / request_finished, по которым Django закрывает устаревшие соединения, а между ними
+выполняются запросы, которые делает список модулей (пользователь из JWT и страница модулей).
+
+Запуск из директории training_modules (HOST=127.0.0.1 для TCP-подключения, как в docker-compose):
+    python -m benchmarks.db_connections
+"""
+import argparse
+import os
+import statistics
+import time
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
+
+from django.core.signals import request_finished, request_started  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.db.backends.signals import connection_created  # noqa: E402
+
+from modules.models import Module  # noqa: E402
+from users.models import User  # noqa: E402
+
+MODES = {
+    'off': {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False},
+    'persistent': {'CONN_MAX_AGE': 60, 'CONN_HEALTH_CHECKS': True},
+}
+
+
+def handle_request():
+    request_started.send(sender=None)
+    try:
+        User.objects.filter(pk=1).first()
+        list(Module.objects.order_by('id').values('id', 'title')[:20])
+    finally:
+        request_finished.send(sender=None)
+
+
+def bench(mode, requests):
+    connection.close()
+    connection.settings_dict.update(MODES[mode])
+
+    connections_opened = 0
+
+    def on_connection_created(**kwargs):
+        nonlocal connections_opened
+        connections_opened += 1
+
+    connection_created.connect(on_connection_created)
+    try:
+        # Прогрев: первый запрос в обоих режимах открывает соединение
+        handle_request()
+        connections_opened = 0
+        timings = []
+        for _ in range(requests):
+            started = time.perf_counter()
+            handle_request()
+            timings.append((time.perf_counter() - started) * 1000)
+    finally:
+        connection_created.disconnect(on_connection_created)
+
+    timings.sort()
+    print(
+        f'{mode:<12} {statistics.mean(timings):>8.3f} {timings[len(timings) // 2]:>8.3f} '
+        f'{timings[int(len(timings) * 0.95)]:>8.3f} {connections_opened:>12}'
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=500, help='количество запросов в каждом режиме')
+    args = parser.parse_args()
+
+    print(f'{"режим":<12} {"сред, мс":>8} {"p50, мс":>8} {"p95, мс":>8} {"соединений":>12}')
+    for mode in MODES:
+        bench(mode, args.requests)
+
+
+if __name__ == '__main__':
+    main()
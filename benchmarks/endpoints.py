@@ -0,0 +1,240 @@
+"""
+Нагрузочный бенчмарк основных эндпоинтов на заполненной базе данных. Скрипт добавляет пользователей и модули
+бенчмарка до заданного объема (--scale или --users/--modules), нагружает запущенный сервер <concurrency>
+соединениями keep-alive и выводит для каждого эндпоинта пропускную способность, задержки p50/p95/p99 и количество
+SQL-запросов на запрос. Количество запросов измеряется в процессе бенчмарка тестовым клиентом Django на той же базе
+данных. Результаты сохраняются в JSON (--output), с ключом --compare выводится изменение относительно сохраненных.
+
+Запуск из директории training_modules. Сервер запускается отдельно с теми же настройками базы данных, письма о
+создании модулей лучше не отправлять:
+    EMAIL_BACKEND=django.core.mail.backends.dummy.EmailBackend CELERY_TASK_ALWAYS_EAGER=True \\
+        python manage.py runserver --noreload
+    python -m benchmarks.endpoints --scale small --output results.json
+    python -m benchmarks.endpoints --scale small --compare results.json
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import random
+import subprocess
+from datetime import datetime, timezone
+from unittest.mock import patch
+from urllib.parse import urlsplit
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
+
+from django.db import connection  # noqa: E402
+from django.test import Client  # noqa: E402
+from django.test.utils import CaptureQueriesContext  # noqa: E402
+from rest_framework_simplejwt.tokens import AccessToken  # noqa: E402
+
+from benchmarks.load import build_request, run_load, summarize, wait_for_server  # noqa: E402
+from modules.generate import generate_modules, generate_users  # noqa: E402
+from modules.models import Module  # noqa: E402
+from users.models import User  # noqa: E402
+
+# Объемы данных: (пользователей, модулей)
+SCALES = {
+    'tiny': (100, 1_000),
+    'small': (1_000, 10_000),
+    'large': (100_000, 1_000_000),
+}
+BENCH_DOMAIN = 'bench.local'
+BENCH_PASSWORD = 'BenchmarkPassword123'
+# Количество пользователей, от имени которых отправляются запросы
+SAMPLE_SIZE = 100
+
+
+def bench_users():
+    return User.objects.filter(email__endswith=f'@{BENCH_DOMAIN}')
+
+
+def seed(users, modules, batch_size):
+    """Метод добавляет пользователей и модули бенчмарка (generate_data) до заданного количества."""
+
+    missing_users = users - bench_users().count()
+    if missing_users > 0:
+        generate_users(missing_users, BENCH_DOMAIN, BENCH_PASSWORD, batch_size)
+
+    missing_modules = modules - Module.objects.filter(module_user__email__endswith=f'@{BENCH_DOMAIN}').count()
+    if missing_modules > 0:
+        owner_ids = list(bench_users().order_by('id').values_list('id', flat=True))
+        generate_modules(missing_modules, owner_ids, batch_size=batch_size)
+
+
+def get_samples():
+    """Метод возвращает пользователей, от имени которых отправляются запросы, с токеном и одним из их модулей."""
+
+    owned = dict(
+        Module.objects.filter(module_user__email__endswith=f'@{BENCH_DOMAIN}').order_by(
+            'module_user_id', 'id'
+        ).distinct('module_user_id').values_list('module_user_id', 'id')[:SAMPLE_SIZE]
+    )
+    users = bench_users().filter(pk__in=owned)
+    return [
+        {'email': user.email, 'token': str(AccessToken.for_user(user)), 'module_id': owned[user.pk]}
+        for user in users
+    ]
+
+
+def get_endpoints(samples):
+    """Метод возвращает эндпоинты бенчмарка: имя, функцию, которая строит очередной запрос, и ожидаемый код ответа.
+    Кеш ответов списков и детальной информации обходится уникальным параметром запроса."""
+
+    counter = itertools.count()
+
+    def modules_list():
+        sample = random.choice(samples)
+        return 'GET', f'/modules/?_={next(counter)}', sample['token'], None
+
+    def module_detail():
+        sample = random.choice(samples)
+        return 'GET', f'/modules/{sample["module_id"]}/?_={next(counter)}', sample['token'], None
+
+    def module_create():
+        sample = random.choice(samples)
+        body = {'title': f'модуль {next(counter)}', 'description': 'описание', 'module_user': sample['email']}
+        return 'POST', '/modules/create/', sample['token'], json.dumps(body)
+
+    def users_list():
+        return 'GET', '/user/', random.choice(samples)['token'], None
+
+    def token():
+        body = {'email': random.choice(samples)['email'], 'password': BENCH_PASSWORD}
+        return 'POST', '/user/token/', None, json.dumps(body)
+
+    return (
+        ('modules_list', modules_list, 200),
+        ('module_detail', module_detail, 200),
+        ('module_create', module_create, 201),
+        ('users_list', users_list, 200),
+        ('token', token, 200),
+    )
+
+
+def count_queries(endpoints):
+    """Метод возвращает количество SQL-запросов на один запрос к каждому эндпоинту. Первый запрос прогревает кеши
+    процесса (пользователь, запрещенные слова), считается второй."""
+
+    client = Client()
+    counts = {}
+    # Письма о созданных модулях при подсчете не отправляются
+    with patch('modules.tasks.send_queued_notifications.delay'):
+        for name, make_request, _ in endpoints:
+            for _ in range(2):
+                method, path, token, body = make_request()
+                headers = {'Authorization': f'Bearer {token}'} if token else {}
+                with CaptureQueriesContext(connection) as context:
+                    if method == 'GET':
+                        client.get(path, headers=headers)
+                    else:
+                        client.post(path, body, content_type='application/json', headers=headers)
+            counts[name] = len(context)
+    return counts
+
+
+async def run(args, endpoints):
+    url = urlsplit(args.url)
+    host, port = url.hostname, url.port or 80
+    await wait_for_server(host, port)
+
+    results = {}
+    for name, make_request, expected_status in endpoints:
+        def make_raw_request():
+            method, path, token, body = make_request()
+            return build_request(host, method, path, token, body), expected_status
+
+        # Прогрев: соединения с базой данных и кеши процессов сервера
+        await run_load(host, port, make_raw_request, args.concurrency, args.concurrency)
+        results[name] = summarize(await run_load(host, port, make_raw_request, args.requests, args.concurrency))
+    return results
+
+
+def get_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results, baseline=None):
+    columns = ('throughput', 'p50_ms', 'p95_ms', 'p99_ms', 'queries_per_request', 'errors')
+    print(f'{"эндпоинт":<16}' + ''.join(f'{column:>22}' for column in columns))
+    for name, result in results.items():
+        cells = []
+        for column in columns:
+            cell = f'{result[column]}'
+            previous = (baseline or {}).get(name, {}).get(column)
+            if previous:
+                cell += f' ({(result[column] - previous) / previous:+.0%})'
+            cells.append(f'{cell:>22}')
+        print(f'{name:<16}' + ''.join(cells))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://127.0.0.1:8000', help='адрес запущенного сервера')
+    parser.add_argument('--scale', choices=SCALES, default='small', help='объем данных')
+    parser.add_argument('--users', type=int, help='количество пользователей (вместо --scale)')
+    parser.add_argument('--modules', type=int, help='количество модулей (вместо --scale)')
+    parser.add_argument('--no-seed', action='store_true', help='не добавлять данные')
+    parser.add_argument('--batch-size', type=int, default=5000, help='размер пачки при добавлении данных')
+    parser.add_argument('--concurrency', type=int, default=20, help='количество одновременных соединений')
+    parser.add_argument('--requests', type=int, default=1000, help='количество запросов к каждому эндпоинту')
+    parser.add_argument('--only', nargs='+', help='имена эндпоинтов для запуска')
+    parser.add_argument('--output', help='файл JSON для сохранения результатов')
+    parser.add_argument('--compare', help='файл JSON с результатами для сравнения')
+    args = parser.parse_args()
+
+    users, modules = SCALES[args.scale]
+    users, modules = args.users or users, args.modules or modules
+    if not args.no_seed:
+        seed(users, modules, args.batch_size)
+
+    samples = get_samples()
+    if not samples:
+        parser.error('Нет данных бенчмарка: запустите без --no-seed')
+    endpoints = [
+        endpoint for endpoint in get_endpoints(samples)
+        if not args.only or endpoint[0] in args.only
+    ]
+
+    queries = count_queries(endpoints)
+    results = asyncio.run(run(args, endpoints))
+    for name, result in results.items():
+        result['queries_per_request'] = queries[name]
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as file:
+            baseline = json.load(file)['endpoints']
+    print_results(results, baseline)
+
+    if args.output:
+        report = {
+            'meta': {
+                'started_at': datetime.now(timezone.utc).isoformat(),
+                'revision': get_revision(),
+                'python': platform.python_version(),
+                'url': args.url,
+                'users': bench_users().count(),
+                'modules': Module.objects.filter(module_user__email__endswith=f'@{BENCH_DOMAIN}').count(),
+                'concurrency': args.concurrency,
+                'requests': args.requests,
+            },
+            'endpoints': results,
+        }
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
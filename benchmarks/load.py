@@ -0,0 +1,104 @@
+"""
+Общий код нагрузочных бенчмарков: минимальный асинхронный HTTP/1.1-клиент с соединениями keep-alive и подсчет
+задержек. Внешние зависимости не нужны, поэтому клиент почти не влияет на измеряемый сервер.
+"""
+import asyncio
+import time
+
+
+async def read_response(reader):
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError('Сервер закрыл соединение')
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+    if headers.get('transfer-encoding') == 'chunked':
+        while True:
+            size = int((await reader.readline()).strip(), 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    else:
+        await reader.readexactly(int(headers.get('content-length', 0)))
+    return int(status_line.split()[1])
+
+
+def build_request(host, method, path, token=None, body=None, content_type='application/json'):
+    """Метод возвращает байты HTTP-запроса. <body> передается строкой или байтами."""
+
+    lines = [f'{method} {path} HTTP/1.1', f'Host: {host}']
+    if token is not None:
+        lines.append(f'Authorization: Bearer {token}')
+    if body is not None:
+        body = body.encode() if isinstance(body, str) else body
+        lines += [f'Content-Type: {content_type}', f'Content-Length: {len(body)}']
+    return '\r\n'.join(lines).encode() + b'\r\n\r\n' + (body or b'')
+
+
+async def _client(host, port, requests, timings, errors):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for request, expected_status in requests:
+            started = time.perf_counter()
+            writer.write(request)
+            await writer.drain()
+            status = await read_response(reader)
+            timings.append((time.perf_counter() - started) * 1000)
+            if status != expected_status:
+                errors.append(status)
+    finally:
+        writer.close()
+
+
+async def run_load(host, port, make_request, total, concurrency):
+    """
+    Метод отправляет <total> запросов с <concurrency> соединений и возвращает словарь с задержками (мс), кодами
+    ответов, которые отличаются от ожидаемых, и общим временем выполнения. <make_request> возвращает пару
+    (байты запроса, ожидаемый код ответа) и вызывается для каждого запроса заранее.
+    """
+
+    per_client = [total // concurrency + (1 if number < total % concurrency else 0) for number in range(concurrency)]
+    timings, errors = [], []
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        _client(host, port, [make_request() for _ in range(count)], timings, errors)
+        for count in per_client if count
+    ))
+    return {'timings': sorted(timings), 'errors': errors, 'elapsed': time.perf_counter() - started}
+
+
+def percentile(timings, fraction):
+    return timings[min(int(len(timings) * fraction), len(timings) - 1)] if timings else 0.0
+
+
+def summarize(result):
+    """Метод возвращает сводку результата run_load: количество запросов, ошибок, пропускную способность и
+    перцентили задержки."""
+
+    timings = result['timings']
+    return {
+        'requests': len(timings),
+        'errors': len(result['errors']),
+        'throughput': round(len(timings) / result['elapsed'], 1) if result['elapsed'] else 0.0,
+        'p50_ms': round(percentile(timings, 0.5), 2),
+        'p95_ms': round(percentile(timings, 0.95), 2),
+        'p99_ms': round(percentile(timings, 0.99), 2),
+    }
+
+
+async def wait_for_server(host, port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            _, writer = await asyncio.open_connection(host, port)
+            writer.close()
+            return
+        except OSError:
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f'Сервер {host}:{port} недоступен')
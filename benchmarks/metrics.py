@@ -0,0 +1,105 @@
+"""
+Бенчмарк накладных расходов MetricsMiddleware. Запросы к детальной информации о модуле (с обходом кеша ответов)
+выполняются тестовым клиентом Django поочередными сериями с middleware и без него, чтобы колебания нагрузки на
+базу данных одинаково влияли на оба варианта. Отдельно измеряется время самого middleware вокруг пустого
+представления с несколькими SQL-запросами.
+
+Запуск из директории training_modules (в базе данных должен быть хотя бы один модуль):
+    python -m benchmarks.metrics --requests 2000
+"""
+import argparse
+import itertools
+import os
+import statistics
+import time
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.http import HttpResponse  # noqa: E402
+from django.test import Client, RequestFactory, override_settings  # noqa: E402
+from django.urls import resolve  # noqa: E402
+from rest_framework_simplejwt.tokens import AccessToken  # noqa: E402
+
+from config.metrics import MetricsMiddleware  # noqa: E402
+from modules.models import Module  # noqa: E402
+
+METRICS_MIDDLEWARE = 'config.metrics.MetricsMiddleware'
+ROUNDS = 10
+
+
+def bench_client(path, token, requests):
+    """Метод возвращает среднее время запроса (мс) с middleware и без него."""
+
+    middleware = {
+        'with': settings.MIDDLEWARE,
+        'without': [name for name in settings.MIDDLEWARE if name != METRICS_MIDDLEWARE],
+    }
+    counter = itertools.count()
+    timings = {name: [] for name in middleware}
+    for _ in range(ROUNDS):
+        for name, classes in middleware.items():
+            with override_settings(MIDDLEWARE=classes):
+                client = Client(headers={'Authorization': f'Bearer {token}'})
+                client.get(path)
+                for _ in range(requests // ROUNDS):
+                    started = time.perf_counter()
+                    client.get(f'{path}?_={next(counter)}')
+                    timings[name].append((time.perf_counter() - started) * 1000)
+    return {name: statistics.mean(values) for name, values in timings.items()}
+
+
+def bench_middleware(path, requests, queries=3):
+    """Метод возвращает время (мкс) пустого представления с <queries> SQL-запросами с middleware и без него."""
+
+    request = RequestFactory().get(path)
+    match = resolve(path)
+
+    def view(request):
+        request.resolver_match = match
+        with connection.cursor() as cursor:
+            for _ in range(queries):
+                cursor.execute('SELECT 1')
+        return HttpResponse(b'x' * 1000)
+
+    results = {}
+    for name, handler in (('without', view), ('with', MetricsMiddleware(view))):
+        handler(request)
+        started = time.perf_counter()
+        for _ in range(requests):
+            handler(request)
+        results[name] = (time.perf_counter() - started) / requests * 1_000_000
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=2000, help='количество запросов в каждом варианте')
+    args = parser.parse_args()
+
+    module = Module.objects.select_related('module_user').order_by('id').first()
+    if module is None:
+        parser.error('В базе данных нет модулей')
+    path = f'/modules/{module.pk}/'
+    token = str(AccessToken.for_user(module.module_user))
+
+    client = bench_client(path, token, args.requests)
+    overhead = client['with'] - client['without']
+    print(
+        f'{path}: без middleware {client["without"]:.3f} мс, с middleware {client["with"]:.3f} мс '
+        f'({overhead:+.3f} мс, {overhead / client["without"]:+.1%})'
+    )
+
+    direct = bench_middleware(path, args.requests * 5)
+    print(
+        f'пустое представление: без middleware {direct["without"]:.1f} мкс, с middleware {direct["with"]:.1f} мкс '
+        f'({direct["with"] - direct["without"]:+.1f} мкс)'
+    )
+
+
+if __name__ == '__main__':
+    main()
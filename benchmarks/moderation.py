@@ -0,0 +1,83 @@
+"""
+Микробенчмарк проверки запрещенных слов: прежняя реализация TitleValidation (регулярное выражение с (.*) по краям,
+собираемое при каждом вызове) против автомата Ахо — Корасик из modules.moderation. Кроме исходных 9 слов проверяется
+список из --words слов: так прежний подход выглядел бы, если бы регулярное выражение собиралось из таблицы BannedWord.
+
+Запуск из директории training_modules:
+    python -m benchmarks.moderation
+"""
+import argparse
+import os
+import random
+import re
+import timeit
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
+
+from modules.moderation import AhoCorasick  # noqa: E402
+
+BANNED_WORDS = ('биржа', 'казино', 'криптовалюта', 'крипта', 'дешево', 'бесплатно', 'обман', 'полиция', 'радар')
+VOCABULARY = (
+    'модуль', 'курс', 'математика', 'физика', 'задачи', 'решение', 'теория', 'практика', 'лекция', 'семинар',
+    'алгоритм', 'анализ', 'данные', 'структура', 'история', 'литература', 'язык', 'программирование',
+)
+
+
+def make_regex_check(words):
+    """Прежняя реализация TitleValidation для произвольного списка слов."""
+
+    banned_words = rf'(.*)({"|".join(map(re.escape, words))})(.*)'
+
+    def regex_check(text):
+        return re.match(banned_words, text, flags=re.IGNORECASE | re.DOTALL) is not None
+    return regex_check
+
+
+def make_words(count, rng):
+    alphabet = 'абвгдежзийклмнопрстуфхцчшщыэюя'
+    return tuple({''.join(rng.choice(alphabet) for _ in range(rng.randint(5, 9))) for _ in range(count)})
+
+
+def make_text(words, rng):
+    return ' '.join(rng.choice(VOCABULARY) for _ in range(words))
+
+
+def bench(name, func, texts, number):
+    seconds = timeit.timeit(lambda: [func(text) for text in texts], number=number)
+    per_text = seconds / (number * len(texts)) * 1e6
+    print(f'{name:<28} {per_text:>12.2f} мкс на текст')
+    return per_text
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--number', type=int, default=20, help='количество повторов')
+    parser.add_argument('--words', type=int, default=500, help='размер расширенного списка запрещенных слов')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    cases = {
+        'название (3 слова)': ([make_text(3, rng) for _ in range(1000)], args.number),
+        'описание (200 слов)': ([make_text(200, rng) for _ in range(100)], args.number),
+        'описание (100 000 слов)': ([make_text(100_000, rng)], 1),
+    }
+
+    for words in (BANNED_WORDS, make_words(args.words, rng)):
+        regex_check = make_regex_check(words)
+        automaton = AhoCorasick(words)
+        print(f'\n=== Запрещенных слов: {len(words)}')
+        for case, (texts, number) in cases.items():
+            # Обе реализации должны давать одинаковый результат
+            assert [regex_check(text) for text in texts] == [automaton.search(text) is not None for text in texts]
+            print(f'\n{case}')
+            regex_time = bench('регулярное выражение', regex_check, texts, number)
+            automaton_time = bench('автомат Ахо — Корасик', automaton.search, texts, number)
+            print(f'{"ускорение":<28} {regex_time / automaton_time:>12.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+from django.contrib.auth.models import AnonymousUser
+from django.http import JsonResponse
+from django.views import View
+from rest_framework import exceptions
+from rest_framework.permissions import IsAuthenticated
+
+from users.authentication import CachedJWTAuthentication
+
+
+class AsyncAPIView(View):
+    """
+    Базовое асинхронное представление для чтения данных под ASGI. DRF выполняет представления синхронно, поэтому
+    здесь повторены только нужные его части: аутентификация по JWT (CachedJWTAuthentication.aauthenticate), проверка
+    прав классами <permission_classes> и ответ с ошибкой в формате DRF. Запрос не занимает поток на время обращения
+    к базе данных и кешу.
+    """
+
+    authentication_class = CachedJWTAuthentication
+    permission_classes = (IsAuthenticated,)
+    # Размер страницы списка и параметр с идентификатором последнего объекта предыдущей страницы (paginate)
+    page_size = None
+    after_param = 'after'
+
+    async def dispatch(self, request, *args, **kwargs):
+        handler = getattr(self, request.method.lower(), None)
+        if request.method.lower() not in self.http_method_names or handler is None:
+            handler = self.http_method_not_allowed
+        try:
+            await self.authenticate(request)
+            self.check_permissions(request)
+            return await handler(request, *args, **kwargs)
+        except exceptions.APIException as exc:
+            return self.handle_exception(request, exc)
+
+    async def authenticate(self, request):
+        # request.user из AuthenticationMiddleware загружает пользователя сессии синхронно, поэтому заменяется сразу
+        request.user = AnonymousUser()
+        request.auth = None
+        result = await self.authentication_class().aauthenticate(request)
+        if result is not None:
+            request.user, request.auth = result
+
+    def get_permissions(self):
+        return [permission() for permission in self.permission_classes]
+
+    def check_permissions(self, request):
+        for permission in self.get_permissions():
+            if not permission.has_permission(request, self):
+                self.permission_denied(request, getattr(permission, 'message', None))
+
+    def check_object_permissions(self, request, obj):
+        for permission in self.get_permissions():
+            if not permission.has_object_permission(request, self, obj):
+                self.permission_denied(request, getattr(permission, 'message', None))
+
+    def permission_denied(self, request, message=None):
+        if request.auth is None:
+            raise exceptions.NotAuthenticated()
+        raise exceptions.PermissionDenied(detail=message)
+
+    def handle_exception(self, request, exc):
+        data = exc.detail if isinstance(exc.detail, dict) else {'detail': exc.detail}
+        response = JsonResponse(data, status=exc.status_code, json_dumps_params={'ensure_ascii': False})
+        if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+            response['WWW-Authenticate'] = self.authentication_class().authenticate_header(request)
+        return response
+
+    async def paginate(self, request, queryset):
+        """
+        Метод возвращает страницу объектов выборки и ссылку на следующую страницу (или None). Страница выбирается по
+        первичному ключу: параметр <after> — идентификатор последнего объекта предыдущей страницы, поэтому глубокие
+        страницы стоят столько же, сколько первая.
+        """
+
+        try:
+            after = int(request.GET.get(self.after_param, 0))
+        except ValueError:
+            raise exceptions.ValidationError({self.after_param: ['Требуется целочисленное значение.']})
+
+        queryset = queryset.filter(pk__gt=after).order_by('pk')[:self.page_size + 1]
+        objects = [obj async for obj in queryset.aiterator()]
+
+        next_url = None
+        if len(objects) > self.page_size:
+            objects = objects[:self.page_size]
+            query = request.GET.copy()
+            query[self.after_param] = objects[-1].pk
+            next_url = request.build_absolute_uri(f'?{query.urlencode()}')
+        return objects, next_url
+
+    def render(self, data):
+        return JsonResponse(data, safe=False, json_dumps_params={'ensure_ascii': False})
@@ -0,0 +1,77 @@
+import hashlib
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+
+def make_etag(request, *parts):
+    """Метод возвращает слабый ETag, зависящий от пути с параметрами запроса, формата ответа и переданных значений
+    (количества записей, времени изменения и т.п.)."""
+
+    renderer = getattr(request, 'accepted_renderer', None)
+    raw = '|'.join(str(part) for part in (request.get_full_path(), getattr(renderer, 'format', ''), *parts))
+    return f'W/"{hashlib.md5(raw.encode()).hexdigest()}"'
+
+
+def set_validators(response, etag, last_modified):
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    return response
+
+
+def get_not_modified_response(request, etag, last_modified):
+    """Метод возвращает ответ 304 (или 412), если ресурс не изменился с версии, указанной в заголовках
+    If-None-Match / If-Modified-Since, иначе None."""
+
+    response = get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=int(last_modified.timestamp()) if last_modified is not None else None
+    )
+    if response is None:
+        return None
+    return set_validators(response, etag, last_modified)
+
+
+def make_content_etag(request, data):
+    """Метод возвращает ETag, зависящий от сериализованных данных ответа."""
+
+    content = json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False, sort_keys=True)
+    return make_etag(request, hashlib.md5(content.encode()).hexdigest())
+
+
+class ConditionalListMixin:
+    """
+    Для условных GET-запросов к списку объектов. ETag вычисляется по сериализованным данным ответа, поэтому учитывает
+    и изменение, и удаление записей без агрегатного запроса (COUNT) по всей выборке. Неизменившийся список
+    возвращается ответом 304 без тела. Список отдается только с ETag: удаление записи не изменяет максимальное время
+    изменения оставшихся, поэтому Last-Modified (и If-Modified-Since) для списка не подходит.
+    """
+
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        etag = make_content_etag(request, response.data)
+        return set_validators(get_not_modified_response(request, etag, None) or response, etag, None)
+
+
+class ConditionalRetrieveMixin:
+    """Для условных GET-запросов к объекту. Валидаторы вычисляются по времени изменения объекта до сериализации."""
+
+    last_modified_field = 'updated_at'
+
+    def get_object_last_modified(self, instance):
+        return getattr(instance, self.last_modified_field)
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        last_modified = self.get_object_last_modified(instance)
+        etag = make_etag(request, instance.pk, last_modified and last_modified.isoformat())
+        not_modified = get_not_modified_response(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+        serializer = self.get_serializer(instance)
+        return set_validators(Response(serializer.data), etag, last_modified)
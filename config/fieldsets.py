@@ -0,0 +1,133 @@
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+FIELDS_PARAM = 'fields'
+EXPAND_PARAM = 'expand'
+
+
+class Fieldset:
+    """
+    Поля, которые клиент выбрал параметрами запроса ?fields= и ?expand=. <fields> — поля верхнего уровня в порядке
+    сериализатора, <expand> — связанные объекты, которые выводятся вложенными, <nested> — выбранные поля вложенных
+    объектов (fields=module_user.email).
+    """
+
+    def __init__(self, fields, expand=(), nested=None):
+        self.fields = tuple(fields)
+        self.expand = frozenset(expand)
+        self.nested = nested or {}
+
+
+def _split(value):
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+def get_fieldset(request, serializer_class):
+    """
+    Метод возвращает поля, выбранные параметрами запроса, или None, если параметры не переданы. Без ?fields= выводятся
+    все поля сериализатора. Если передан любой из параметров, связанные объекты выводятся идентификатором, пока они не
+    перечислены в ?expand= или не выбраны через точку. Неизвестные поля приводят к ошибке 400.
+    """
+
+    fields_param = request.query_params.get(FIELDS_PARAM)
+    expand_param = request.query_params.get(EXPAND_PARAM)
+    if fields_param is None and expand_param is None:
+        return None
+
+    available = serializer_class().fields
+    relations = {name for name, field in available.items() if isinstance(field, serializers.BaseSerializer)}
+    requested = _split(fields_param) if fields_param is not None else list(available)
+    expand = set(_split(expand_param or ''))
+
+    errors = {}
+    unknown_expand = expand - relations
+    if unknown_expand:
+        errors[EXPAND_PARAM] = [f'Нельзя развернуть поля: {", ".join(sorted(unknown_expand))}.']
+
+    selected, nested, unknown = set(), {}, []
+    for name in requested:
+        relation, dot, nested_name = name.partition('.')
+        if not dot:
+            if name in available:
+                selected.add(name)
+            else:
+                unknown.append(name)
+        elif relation in relations and nested_name in available[relation].fields:
+            selected.add(relation)
+            expand.add(relation)
+            nested.setdefault(relation, set()).add(nested_name)
+        else:
+            unknown.append(name)
+    if unknown:
+        errors[FIELDS_PARAM] = [f'Неизвестные поля: {", ".join(unknown)}.']
+    if errors:
+        raise serializers.ValidationError(errors)
+
+    return Fieldset(
+        fields=(name for name in available if name in selected),
+        expand=expand & selected,
+        nested={
+            relation: Fieldset(name for name in available[relation].fields if name in names)
+            for relation, names in nested.items()
+        }
+    )
+
+
+class SparseFieldsetSerializerMixin:
+    """Для вывода только выбранных полей: сериализатор принимает аргумент <fieldset>. Связанный объект, который не
+    нужно разворачивать, выводится первичным ключом из поля внешнего ключа без обращения к связанной таблице."""
+
+    def __init__(self, *args, fieldset=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fieldset = fieldset
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if self.fieldset is None:
+            return fields
+
+        selected = {}
+        for name in self.fieldset.fields:
+            field = fields[name]
+            if isinstance(field, serializers.BaseSerializer):
+                if name not in self.fieldset.expand:
+                    field = serializers.PrimaryKeyRelatedField(read_only=True)
+                elif name in self.fieldset.nested:
+                    field = type(field)(*field._args, **field._kwargs, fieldset=self.fieldset.nested[name])
+            selected[name] = field
+        return selected
+
+
+class SparseFieldsetMixin:
+    """
+    Для выборочного вывода полей в ответах на GET-запросы (?fields=id,title&expand=module_user). Выбранные поля
+    передаются сериализатору и методу get_queryset, который загружает из базы данных только нужные столбцы.
+    В <fieldset_required_fields> перечисляются поля, которые нужны представлению независимо от выбора клиента.
+    """
+
+    fieldset_required_fields = ('pk',)
+
+    def get_fieldset(self):
+        if not hasattr(self, '_fieldset'):
+            request = self.request
+            fieldset = None
+            if request is not None and request.method in SAFE_METHODS:
+                fieldset = get_fieldset(request, self.get_serializer_class())
+            self._fieldset = fieldset
+        return self._fieldset
+
+    def get_serializer(self, *args, **kwargs):
+        fieldset = self.get_fieldset()
+        if fieldset is not None:
+            kwargs.setdefault('fieldset', fieldset)
+        return super().get_serializer(*args, **kwargs)
+
+    def get_queryset(self):
+        return self.apply_fieldset(super().get_queryset(), self.get_fieldset())
+
+    def apply_fieldset(self, queryset, fieldset):
+        """Метод ограничивает выборку столбцами выбранных полей. Если поля не выбраны, выборка не изменяется."""
+
+        if fieldset is None:
+            return queryset
+        return queryset.only(*fieldset.fields, *self.fieldset_required_fields)
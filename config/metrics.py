@@ -0,0 +1,266 @@
+import bisect
+import secrets
+import threading
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+from django.views import View
+
+METRICS_PREFIX = 'metrics'
+
+# Границы корзин гистограммы длительности запроса, секунды
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Маршрут запроса, который не сопоставлен ни с одним URL: путь не используется как метка, чтобы количество рядов
+# не росло с каждым несуществующим адресом
+UNMATCHED_ROUTE = 'unmatched'
+# Позиции значений ряда: количество запросов, сумма длительностей, количество SQL-запросов, их суммарное время,
+# сумма размеров ответов и счетчики корзин гистограммы
+COUNT, DURATION, QUERIES, QUERY_TIME, RESPONSE_BYTES, BUCKETS = range(6)
+
+
+class _Registry:
+    """
+    Метрики процесса: ряды по ключу (маршрут, метод, код ответа) с накопленными значениями. Запрос изменяет только
+    память процесса, а общий кеш получает снимок всех рядов процесса не чаще раза в METRICS_FLUSH_INTERVAL секунд,
+    поэтому запрос почти никогда не обращается к Redis. Эндпоинт /metrics/ суммирует снимки всех процессов.
+
+    Снимок хранится под номером процесса (слотом) от 1 до METRICS_MAX_SLOTS. Процесс арендует свободный слот на
+    METRICS_SNAPSHOT_TIMEOUT секунд и продлевает аренду при каждом сохранении, поэтому слот остановленного процесса
+    освобождается вместе с его снимком, и количество слотов не растет с каждым перезапуском.
+    """
+
+    def __init__(self):
+        self.series = {}
+        self.lock = threading.Lock()
+        self.slot = None
+        self.token = None
+        self.flushed_at = time.monotonic()
+
+    def observe(self, key, duration, queries, query_time, response_bytes):
+        with self.lock:
+            values = self.series.get(key)
+            if values is None:
+                values = self.series[key] = [0, 0.0, 0, 0.0, 0, [0] * len(LATENCY_BUCKETS)]
+            values[COUNT] += 1
+            values[DURATION] += duration
+            values[QUERIES] += queries
+            values[QUERY_TIME] += query_time
+            values[RESPONSE_BYTES] += response_bytes
+            bucket = bisect.bisect_left(LATENCY_BUCKETS, duration)
+            if bucket < len(LATENCY_BUCKETS):
+                values[BUCKETS][bucket] += 1
+
+    def snapshot(self):
+        with self.lock:
+            return {key: [*values[:BUCKETS], list(values[BUCKETS])] for key, values in self.series.items()}
+
+    @staticmethod
+    def snapshot_key(slot):
+        return f'{METRICS_PREFIX}:process:{slot}'
+
+    @staticmethod
+    def lease_key(slot):
+        return f'{METRICS_PREFIX}:slot:{slot}'
+
+    def acquire_slot(self):
+        """Метод арендует первый свободный слот и возвращает его номер или None, если все слоты заняты. Токен аренды
+        создается здесь, а не при импорте, чтобы процессы, порожденные fork, не получили одинаковый токен."""
+
+        self.token = secrets.token_hex(16)
+        for slot in range(1, settings.METRICS_MAX_SLOTS + 1):
+            if cache.add(self.lease_key(slot), self.token, settings.METRICS_SNAPSHOT_TIMEOUT):
+                return slot
+        return None
+
+    def flush_due(self):
+        return time.monotonic() - self.flushed_at >= settings.METRICS_FLUSH_INTERVAL
+
+    def flush(self):
+        """Метод сохраняет снимок метрик процесса в общий кеш."""
+
+        self.flushed_at = time.monotonic()
+        # Аренда могла истечь, пока процесс не получал запросов, и слот мог занять другой процесс
+        if self.slot is not None and cache.get(self.lease_key(self.slot)) == self.token:
+            cache.touch(self.lease_key(self.slot), settings.METRICS_SNAPSHOT_TIMEOUT)
+        else:
+            self.slot = self.acquire_slot()
+            if self.slot is None:
+                return
+        cache.set(self.snapshot_key(self.slot), self.snapshot(), settings.METRICS_SNAPSHOT_TIMEOUT)
+
+    def collect(self):
+        """Метод возвращает ряды, просуммированные по снимкам всех процессов. Ряды текущего процесса берутся из
+        памяти, а не из его снимка."""
+
+        self.flush()
+        keys = [
+            self.snapshot_key(slot) for slot in range(1, settings.METRICS_MAX_SLOTS + 1) if slot != self.slot
+        ]
+        snapshots = cache.get_many(keys).values()
+        series = {}
+        for snapshot in [self.snapshot(), *snapshots]:
+            for key, values in snapshot.items():
+                total = series.setdefault(key, [0, 0.0, 0, 0.0, 0, [0] * len(LATENCY_BUCKETS)])
+                for position in range(BUCKETS):
+                    total[position] += values[position]
+                total[BUCKETS] = [first + second for first, second in zip(total[BUCKETS], values[BUCKETS])]
+        return series
+
+
+registry = _Registry()
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def render_metrics(series):
+    """Метод возвращает ряды в текстовом формате Prometheus."""
+
+    counters = (
+        ('http_requests_total', 'Количество запросов', COUNT),
+        ('http_db_queries_total', 'Количество SQL-запросов', QUERIES),
+        ('http_db_query_duration_seconds_total', 'Суммарное время SQL-запросов', QUERY_TIME),
+        ('http_response_size_bytes_total', 'Суммарный размер ответов', RESPONSE_BYTES),
+    )
+    lines = []
+    items = sorted(series.items())
+    labels = {
+        key: f'route="{_escape(key[0])}",method="{_escape(key[1])}",status="{key[2]}"' for key, _ in items
+    }
+    for name, description, position in counters:
+        lines += [f'# HELP {name} {description}', f'# TYPE {name} counter']
+        lines += [f'{name}{{{labels[key]}}} {values[position]}' for key, values in items]
+
+    name = 'http_request_duration_seconds'
+    lines += [f'# HELP {name} Длительность запроса', f'# TYPE {name} histogram']
+    for key, values in items:
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS, values[BUCKETS]):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels[key]},le="{bound}"}} {cumulative}')
+        lines += [
+            f'{name}_bucket{{{labels[key]},le="+Inf"}} {values[COUNT]}',
+            f'{name}_sum{{{labels[key]}}} {values[DURATION]}',
+            f'{name}_count{{{labels[key]}}} {values[COUNT]}',
+        ]
+    return '\n'.join(lines) + '\n'
+
+
+class _QueryCounter:
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+
+# Счетчик SQL-запросов текущего запроса. Переменная контекста доступна и в потоках sync_to_async, в которых под ASGI
+# выполняются обращения к базе данных
+_query_counter = ContextVar('metrics_query_counter', default=None)
+
+
+def _count_queries(execute, sql, params, many, context):
+    counter = _query_counter.get()
+    if counter is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        counter.count += 1
+        counter.duration += time.perf_counter() - started
+
+
+def install_query_counter(connection, **kwargs):
+    """Метод добавляет подсчет SQL-запросов в обертки выполнения запросов соединения (execute_wrappers). Соединения
+    с базой данных свои в каждом потоке, поэтому обертка добавляется при создании соединения."""
+
+    if _count_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_count_queries)
+
+
+connection_created.connect(install_query_counter)
+
+
+class MetricsMiddleware:
+    """
+    Для сбора метрик по маршрутам: количество запросов по кодам ответа, гистограмма длительности, количество и время
+    SQL-запросов и размер ответа. Маршрут определяется именем URL (например, modules:list_module). Для потоковых
+    ответов размер учитывается по заголовку Content-Length, а длительность — до начала передачи тела. Middleware
+    поддерживает асинхронный режим, чтобы не переводить асинхронные представления в синхронные под ASGI.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+
+        # Соединение могло быть создано до загрузки middleware
+        install_query_counter(connection)
+        counter = _QueryCounter()
+        token = _query_counter.set(counter)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _query_counter.reset(token)
+        if self.observe(request, response, time.perf_counter() - started, counter):
+            registry.flush()
+        return response
+
+    async def __acall__(self, request):
+        counter = _QueryCounter()
+        token = _query_counter.set(counter)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _query_counter.reset(token)
+        if self.observe(request, response, time.perf_counter() - started, counter):
+            await sync_to_async(registry.flush)()
+        return response
+
+    def observe(self, request, response, duration, counter):
+        """Метод учитывает запрос в метриках процесса и возвращает True, если метрики пора сохранить в общий кеш."""
+
+        match = request.resolver_match
+        route = match.view_name if match is not None else UNMATCHED_ROUTE
+        if route == 'metrics':
+            return False
+        if response.streaming:
+            response_bytes = int(response.get('Content-Length', 0))
+        else:
+            response_bytes = len(response.content)
+        registry.observe(
+            (route, request.method, response.status_code),
+            duration,
+            counter.count,
+            counter.duration,
+            response_bytes
+        )
+        return registry.flush_due()
+
+
+class MetricsView(View):
+    """Эндпоинт для Prometheus. Запрос должен содержать заголовок Authorization: Bearer <METRICS_TOKEN>. Если токен
+    не задан, метрики не отдаются никому, в том числе в режиме DEBUG."""
+
+    def get(self, request):
+        token = settings.METRICS_TOKEN
+        if not token or not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+            return HttpResponseForbidden()
+        return HttpResponse(render_metrics(registry.collect()), content_type='text/plain; version=0.0.4')
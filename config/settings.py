@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 import os
 from datetime import timedelta
 from pathlib import Path
+from urllib.parse import urlsplit
 
 from dotenv import load_dotenv
 
@@ -41,6 +42,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
 
     'rest_framework',
     'django_filters',
@@ -52,14 +54,17 @@ INSTALLED_APPS = [
 
     'users',
     'modules',
+    'mailing',
 ]
 
 MIDDLEWARE = [
+    'config.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'config.sql_capture.SQLCaptureMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -88,6 +93,18 @@ WSGI_APPLICATION = 'config.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
+# Режим соединений с базой данных (переменная окружения DB_POOL_MODE):
+# - persistent — каждый поток веб-сервера и воркера Celery держит одно соединение до DB_CONN_MAX_AGE секунд и
+#   проверяет его перед повторным использованием, поэтому запрос не платит за TCP-подключение и аутентификацию;
+# - pgbouncer — соединения идут через PgBouncer в режиме transaction pooling (DB_PORT обычно 6432): курсоры на
+#   стороне сервера отключаются, так как транзакции одного клиента могут выполняться в разных соединениях;
+# - off — соединение открывается на каждый запрос.
+# Каждый поток держит не больше одного соединения, поэтому PostgreSQL (или PgBouncer) должен принимать не меньше
+# WEB_CONCURRENCY * WEB_THREADS + CELERY_WORKER_CONCURRENCY соединений на каждый экземпляр сервиса.
+DB_POOL_MODE = os.getenv('DB_POOL_MODE', 'persistent')
+WEB_CONCURRENCY = int(os.getenv('WEB_CONCURRENCY', 2))
+WEB_THREADS = int(os.getenv('WEB_THREADS', 1))
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
@@ -95,7 +112,13 @@ DATABASES = {
         'USER': os.getenv('USER'),
         'HOST': os.getenv('HOST'),
         'PASSWORD': os.getenv('PASSWORD'),
-        'PORT': 5432,
+        'PORT': int(os.getenv('DB_PORT', 5432)),
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 60)) if DB_POOL_MODE != 'off' else 0,
+        'CONN_HEALTH_CHECKS': DB_POOL_MODE != 'off',
+        'DISABLE_SERVER_SIDE_CURSORS': DB_POOL_MODE == 'pgbouncer',
+        'OPTIONS': {
+            'connect_timeout': int(os.getenv('DB_CONNECT_TIMEOUT', 5)),
+        },
     }
 }
 
@@ -211,7 +234,7 @@ REST_FRAMEWORK = {
         'rest_framework.filters.OrderingFilter',
     ),
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.CachedJWTAuthentication',
     ),
 }
 
@@ -233,13 +256,93 @@ EMAIL_PORT = 465
 EMAIL_USE_TLS = False
 EMAIL_USE_SSL = True
 DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
+# Таймаут каждой операции с SMTP-сервером (подключение, отправка) в секундах
+EMAIL_TIMEOUT = 10
+# Размыкатель цепи почтовых задач: после указанного количества ошибок подряд отправка приостанавливается на
+# указанное количество секунд
+MAILING_BREAKER_FAILURE_THRESHOLD = 5
+MAILING_BREAKER_RESET_TIMEOUT = 60
+# Количество сообщений, которое задача отправки забирает из очереди за один раз
+NOTIFICATIONS_BATCH_SIZE = 100
+# Через сколько секунд сообщения, забранные задачей, которая так и не отправила их, можно забрать повторно (больше
+# ограничения времени почтовой задачи)
+NOTIFICATIONS_CLAIM_TIMEOUT = 10 * 60
+# Количество неудачных попыток, после которого сообщение больше не отправляется
+NOTIFICATIONS_MAX_ATTEMPTS = 5
+# Сколько дней хранятся отправленные и неотправляемые сообщения
+NOTIFICATIONS_RETENTION_DAYS = 30
 
 CELERY_BROKER_URL = os.getenv('LOCATION')
 CELERY_RESULT_BACKEND = os.getenv('LOCATION')
 CELERY_TIMEZONE = 'Australia/Tasmania'
 CELERY_TASK_TRACK_STARTED = True
 CELERY_TASK_TIME_LIMIT = 30 * 60
-CELERY_TASK_ALWAYS_EAGER = True
+# Количество процессов воркера: каждый держит свое соединение с базой данных (см. DB_POOL_MODE)
+CELERY_WORKER_CONCURRENCY = int(os.getenv('CELERY_WORKER_CONCURRENCY', 4))
+# Задачи выполняются воркером Celery и не задерживают HTTP-запросы. Синхронное выполнение включается переменной
+# окружения CELERY_TASK_ALWAYS_EAGER=True (тесты включают его через override_settings)
+CELERY_TASK_ALWAYS_EAGER = os.getenv('CELERY_TASK_ALWAYS_EAGER') == 'True'
+# Расписание хранится в базе данных. Задачи из CELERY_BEAT_SCHEDULE beat записывает в PeriodicTask при каждом запуске,
+# поэтому их изменения в административной панели действуют только до перезапуска beat (постоянный интервал задается
+# здесь). Задачи, добавленные в административной панели, beat не изменяет
+CELERY_BEAT_SCHEDULER = 'django_celery_beat.schedulers:DatabaseScheduler'
+CELERY_BEAT_SCHEDULE = {
+    'send-notification-digests': {
+        'task': 'modules.tasks.send_notification_digests',
+        'schedule': timedelta(hours=1),
+    },
+    'purge-notifications': {
+        'task': 'modules.tasks.purge_notifications',
+        'schedule': timedelta(days=1),
+    },
+}
+
+# Кеш хранится в том же Redis, что и брокер Celery, но в отдельной базе, чтобы очистка кеша не затрагивала очереди
+if CELERY_BROKER_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': urlsplit(CELERY_BROKER_URL)._replace(path='/1').geturl(),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+MODULES_CACHE_TIMEOUT = 60 * 5
+# Кеш пользователей для аутентификации по JWT: общий (Redis) и в памяти процесса. Запись в памяти процесса не
+# сбрасывается при изменении пользователя в другом процессе, поэтому время ее жизни короткое
+USERS_AUTH_CACHE_TIMEOUT = 60
+USERS_AUTH_LOCAL_CACHE_TIMEOUT = 5
+USERS_AUTH_LOCAL_CACHE_SIZE = 1024
+MODULES_AUTOCOMPLETE_CACHE_TIMEOUT = 30
+
+# Максимальное количество модулей в одном запросе на пакетное создание
+MODULES_BULK_MAX_SIZE = 1000
+# Количество строк, которое выгрузка модулей читает из базы данных и отдает клиенту за один раз
+MODULES_EXPORT_CHUNK_SIZE = 2000
+# Количество строк, которое загрузка модулей переносит из промежуточной таблицы в одной транзакции
+MODULES_IMPORT_BATCH_SIZE = 10000
+
+# Метрики запросов (/metrics/): интервал сохранения метрик процесса в общий кеш (секунды), время хранения снимка
+# остановленного процесса, наибольшее количество одновременно хранимых снимков процессов и токен, который Prometheus
+# передает в заголовке Authorization (без токена эндпоинт отвечает 403 независимо от DEBUG)
+METRICS_FLUSH_INTERVAL = int(os.getenv('METRICS_FLUSH_INTERVAL', 10))
+METRICS_SNAPSHOT_TIMEOUT = 60 * 60 * 24
+METRICS_MAX_SLOTS = 256
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+
+# Запись SQL-запросов по заголовку X-SQL-Capture (только для сотрудников): директория отчетов, количество самых
+# медленных запросов, для которых выполняется EXPLAIN, и количество повторов запроса, начиная с которого он
+# считается признаком N+1
+SQL_CAPTURE_DIR = os.getenv('SQL_CAPTURE_DIR', BASE_DIR / 'sql_capture')
+SQL_CAPTURE_EXPLAIN_LIMIT = 3
+SQL_CAPTURE_N_PLUS_ONE_THRESHOLD = 3
+# Количество хранимых отчетов (более старые удаляются) и маршруты аутентификации, запросы к которым не записываются
+SQL_CAPTURE_MAX_REPORTS = 200
+SQL_CAPTURE_EXCLUDED_PATHS = ('/auth/', '/user/token/')
 
 CORS_ALLOWED_ORIGINS = [
     'https://example.com',
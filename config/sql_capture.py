@@ -0,0 +1,264 @@
+import json
+import os
+import re
+import time
+import traceback
+import uuid
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.db.backends.signals import connection_created
+from django.utils import timezone
+from rest_framework import exceptions
+
+from config import metrics
+from users.authentication import CachedJWTAuthentication
+
+# Заголовок запроса включает запись SQL-запросов (значение 1) или запись с планами выполнения (значение explain).
+# В заголовке ответа с тем же именем возвращается сводка
+SQL_CAPTURE_HEADER = 'X-SQL-Capture'
+SQL_CAPTURE_EXPLAIN = 'explain'
+SQL_CAPTURE_MODES = ('1', SQL_CAPTURE_EXPLAIN)
+
+# Блокирующее предложение запроса SELECT: такой запрос не выполняется повторно под EXPLAIN ANALYZE
+_LOCKING_CLAUSE = re.compile(r'\bFOR\s+(NO\s+KEY\s+UPDATE|UPDATE|KEY\s+SHARE|SHARE)\b', re.IGNORECASE)
+
+# Файлы проекта, по которым определяется место вызова SQL-запроса: код Django и библиотек пропускается, как и
+# обертки выполнения запросов
+_PROJECT_ROOT = str(settings.BASE_DIR)
+_SKIPPED_FILES = {__file__, metrics.__file__}
+
+
+class _Capture:
+    def __init__(self):
+        self.queries = []
+
+    def add(self, sql, params, duration, origin):
+        self.queries.append({'sql': sql, 'params': params, 'duration_ms': duration * 1000, 'origin': origin})
+
+
+# Запись текущего запроса. Переменная контекста доступна и в потоках sync_to_async, в которых под ASGI выполняются
+# обращения к базе данных
+_capture = ContextVar('sql_capture', default=None)
+
+
+def _get_origin():
+    """Метод возвращает место вызова SQL-запроса в коде проекта: файл, строку и функцию."""
+
+    for frame in reversed(traceback.extract_stack()):
+        filename = frame.filename
+        if filename.startswith(_PROJECT_ROOT) and 'site-packages' not in filename and filename not in _SKIPPED_FILES:
+            return f'{os.path.relpath(filename, _PROJECT_ROOT)}:{frame.lineno} in {frame.name}'
+    return None
+
+
+def _capture_query(execute, sql, params, many, context):
+    capture = _capture.get()
+    if capture is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        capture.add(sql, None if many else params, time.perf_counter() - started, _get_origin())
+
+
+def install_sql_capture(connection, **kwargs):
+    """Метод добавляет запись SQL-запросов в обертки выполнения запросов соединения. Соединения с базой данных свои
+    в каждом потоке, поэтому обертка добавляется при создании соединения."""
+
+    if _capture_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_capture_query)
+
+
+connection_created.connect(install_sql_capture)
+
+
+def is_staff_request(request):
+    """Метод проверяет, что запрос выполнен сотрудником: по сессии (административная панель) или по JWT-токену."""
+
+    if getattr(request, 'user', None) is not None and request.user.is_staff:
+        return True
+    try:
+        result = CachedJWTAuthentication().authenticate(request)
+    except exceptions.APIException:
+        return False
+    return result is not None and result[0].is_staff
+
+
+def get_capture_mode(request):
+    """Метод возвращает режим записи из заголовка X-SQL-Capture (1 или explain) или None, если запрос не нужно
+    записывать: заголовка нет, его значение не поддерживается или запрос относится к маршрутам аутентификации, в
+    параметрах SQL-запросов которых могут быть учетные данные."""
+
+    mode = request.headers.get(SQL_CAPTURE_HEADER, '').strip().lower()
+    if mode not in SQL_CAPTURE_MODES or request.path.startswith(settings.SQL_CAPTURE_EXCLUDED_PATHS):
+        return None
+    return mode
+
+
+def redact_params(params):
+    """Метод заменяет значения параметров SQL-запроса их типами: отчеты хранятся в файлах, а значения могут
+    содержать персональные данные."""
+
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        return {name: f'<{type(value).__name__}>' for name, value in params.items()}
+    return [f'<{type(value).__name__}>' for value in params]
+
+
+def is_explainable(sql):
+    """Метод проверяет, что запрос можно безопасно выполнить повторно под EXPLAIN ANALYZE: это обычный запрос SELECT
+    без блокировки строк. Запросы WITH пропускаются, так как могут изменять данные."""
+
+    return sql.lstrip().upper().startswith('SELECT') and not _LOCKING_CLAUSE.search(sql)
+
+
+def analyze_queries(queries):
+    """
+    Метод возвращает повторяющиеся SQL-запросы (одинаковый текст и параметры) и признаки N+1: один и тот же запрос
+    с разными параметрами, выполненный не меньше SQL_CAPTURE_N_PLUS_ONE_THRESHOLD раз, обычно из цикла по объектам.
+    """
+
+    duplicates = Counter((query['sql'], repr(query['params'])) for query in queries)
+    by_sql = defaultdict(list)
+    for query in queries:
+        by_sql[query['sql']].append(query)
+
+    n_plus_one = []
+    for sql, group in by_sql.items():
+        distinct_params = {repr(query['params']) for query in group}
+        if len(group) >= settings.SQL_CAPTURE_N_PLUS_ONE_THRESHOLD and len(distinct_params) > 1:
+            n_plus_one.append({
+                'sql': sql,
+                'count': len(group),
+                'duration_ms': sum(query['duration_ms'] for query in group),
+                'origins': sorted({query['origin'] for query in group if query['origin']}),
+            })
+    return (
+        [{'sql': sql, 'count': count} for (sql, _), count in duplicates.items() if count > 1],
+        n_plus_one,
+    )
+
+
+def explain_queries(queries):
+    """Метод возвращает планы выполнения EXPLAIN (ANALYZE, BUFFERS) самых медленных запросов SELECT (см.
+    is_explainable). Запросы выполняются повторно в транзакции, которая откатывается."""
+
+    selects = [query for query in queries if is_explainable(query['sql'])]
+    slowest = sorted(selects, key=lambda query: query['duration_ms'], reverse=True)
+    plans = []
+    with transaction.atomic(), connection.cursor() as cursor:
+        for query in slowest[:settings.SQL_CAPTURE_EXPLAIN_LIMIT]:
+            plan = {'sql': query['sql'], 'params': redact_params(query['params']), 'duration_ms': query['duration_ms']}
+            try:
+                with transaction.atomic():
+                    cursor.execute(f'EXPLAIN (ANALYZE, BUFFERS) {query["sql"]}', query['params'])
+                    plan['plan'] = '\n'.join(row[0] for row in cursor.fetchall())
+            except DatabaseError as error:
+                plan['error'] = str(error)
+            plans.append(plan)
+        transaction.set_rollback(True)
+    return plans
+
+
+def prune_reports():
+    """Метод удаляет самые старые отчеты, оставляя в директории SQL_CAPTURE_DIR не больше SQL_CAPTURE_MAX_REPORTS
+    файлов. Имена отчетов начинаются со времени записи, поэтому сортировка по имени совпадает с порядком записи."""
+
+    names = sorted(name for name in os.listdir(settings.SQL_CAPTURE_DIR) if name.endswith('.json'))
+    for name in names[:-settings.SQL_CAPTURE_MAX_REPORTS]:
+        try:
+            os.remove(os.path.join(settings.SQL_CAPTURE_DIR, name))
+        except FileNotFoundError:
+            pass
+
+
+def write_report(request, response, queries, explain):
+    """Метод записывает подробный отчет в файл JSON в директории SQL_CAPTURE_DIR и возвращает сводку для заголовка
+    ответа. Значения параметров SQL-запросов в отчет не попадают (см. redact_params)."""
+
+    duplicates, n_plus_one = analyze_queries(queries)
+    plans = explain_queries(queries) if explain else []
+    total_ms = sum(query['duration_ms'] for query in queries)
+
+    name = f'{timezone.now():%Y%m%dT%H%M%S%f}-{uuid.uuid4().hex[:8]}.json'
+    os.makedirs(settings.SQL_CAPTURE_DIR, exist_ok=True)
+    with open(os.path.join(settings.SQL_CAPTURE_DIR, name), 'w', encoding='utf-8') as file:
+        json.dump({
+            'method': request.method,
+            'path': request.get_full_path(),
+            'status': response.status_code,
+            'queries_count': len(queries),
+            'duration_ms': total_ms,
+            'duplicates': duplicates,
+            'n_plus_one': n_plus_one,
+            'explain': plans,
+            'queries': [{**query, 'params': redact_params(query['params'])} for query in queries],
+        }, file, ensure_ascii=False, indent=2, default=str)
+    prune_reports()
+
+    return (
+        f'queries={len(queries)}; time_ms={total_ms:.1f}; duplicates={len(duplicates)}; '
+        f'n_plus_one={len(n_plus_one)}; explained={len(plans)}; report={name}'
+    )
+
+
+class SQLCaptureMiddleware:
+    """
+    Для записи SQL-запросов отдельного запроса без DEBUG: если сотрудник передает заголовок X-SQL-Capture, все
+    SQL-запросы записываются с временем выполнения и местом вызова в коде проекта. Подробный отчет с повторяющимися
+    запросами, признаками N+1 и (для значения explain) планами выполнения самых медленных запросов записывается в
+    файл, а сводка возвращается в заголовке ответа X-SQL-Capture. Запросы без заголовка (или с другим значением) и
+    запросы к маршрутам аутентификации не записываются.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+
+        mode = get_capture_mode(request)
+        if mode is None or not is_staff_request(request):
+            return self.get_response(request)
+
+        # Соединение могло быть создано до загрузки middleware
+        install_sql_capture(connection)
+        capture = _Capture()
+        token = _capture.set(capture)
+        try:
+            response = self.get_response(request)
+        finally:
+            _capture.reset(token)
+        response[SQL_CAPTURE_HEADER] = write_report(
+            request, response, capture.queries, mode == SQL_CAPTURE_EXPLAIN
+        )
+        return response
+
+    async def __acall__(self, request):
+        mode = get_capture_mode(request)
+        if mode is None or not await sync_to_async(is_staff_request)(request):
+            return await self.get_response(request)
+
+        capture = _Capture()
+        token = _capture.set(capture)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _capture.reset(token)
+        response[SQL_CAPTURE_HEADER] = await sync_to_async(write_report)(
+            request, response, capture.queries, mode == SQL_CAPTURE_EXPLAIN
+        )
+        return response
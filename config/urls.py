@@ -20,8 +20,11 @@ from django.urls import path, include
 from drf_yasg import openapi
 from drf_yasg.views import get_schema_view
 from rest_framework import permissions
+from rest_framework.routers import DefaultRouter
 
 from config import settings
+from config.metrics import MetricsView
+from users.views import UserViewSet
 
 schema_view = get_schema_view(
     openapi.Info(
@@ -36,13 +39,18 @@ schema_view = get_schema_view(
     permission_classes=[permissions.AllowAny],
 )
 
+# Маршруты djoser для пользователей с заменой UserViewSet на расширенный
+users_router = DefaultRouter()
+users_router.register('users', UserViewSet)
+
 urlpatterns = [
       path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
       path('redoc/', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
 
       path('admin/', admin.site.urls),
-      path('auth/', include('djoser.urls')),
+      path('auth/', include(users_router.urls)),
       path('auth/', include('djoser.urls.jwt')),
       path('user/', include('users.urls', namespace='users')),
       path('modules/', include('modules.urls', namespace='modules')),
+      path('metrics/', MetricsView.as_view(), name='metrics'),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -0,0 +1,10 @@
+from django.contrib import admin
+
+from mailing.models import DeadLetter
+
+
+# Register your models here.
+@admin.register(DeadLetter)
+class DeadLetterAdmin(admin.ModelAdmin):
+    list_display = ('id', 'task', 'error', 'created_at', 'replayed_at')
+    list_filter = ('task',)
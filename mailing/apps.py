@@ -0,0 +1,7 @@
+from django.apps import AppConfig
+
+
+class MailingConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'mailing'
+    verbose_name = 'Рассылка'
@@ -0,0 +1,129 @@
+from contextlib import contextmanager
+from smtplib import SMTPConnectError, SMTPDataError, SMTPException, SMTPRecipientsRefused, SMTPServerDisconnected
+
+from celery import Task
+from django.conf import settings
+from django.core.cache import cache
+from django.core.mail import get_connection
+
+# Ошибки, которые означают недоступность или неисправность почтового сервера
+MAIL_ERRORS = (SMTPException, OSError)
+# Ошибки соединения с почтовым сервером: они не зависят от отправляемого сообщения. Кроме них соединение
+# обрывают ошибки сокета (OSError, в том числе таймауты), но все SMTPException тоже наследуют OSError, поэтому
+# проверка выполняется функцией is_connection_error, а не по кортежу в except
+CONNECTION_ERRORS = (SMTPConnectError, SMTPServerDisconnected)
+# Ошибки, которые относятся к конкретному сообщению (адрес отклонен, сервер не принял текст): повторная отправка
+# того же сообщения снова завершится ошибкой
+PERMANENT_MAIL_ERRORS = (SMTPRecipientsRefused, SMTPDataError)
+
+
+def is_connection_error(exc):
+    """Метод возвращает True, если ошибка означает недоступность почтового сервера, а не ответ сервера с ошибкой."""
+
+    return isinstance(exc, CONNECTION_ERRORS) or (isinstance(exc, OSError) and not isinstance(exc, SMTPException))
+
+
+class CircuitOpenError(Exception):
+    """Возбуждается вместо обращения к почтовому серверу, пока размыкатель цепи разомкнут."""
+
+
+class CircuitBreaker:
+    """
+    Размыкатель цепи, общий для всех процессов: состояние хранится в кеше. После <failure_threshold> ошибок соединения
+    подряд цепь размыкается на <reset_timeout> секунд, и обращения к серверу сразу завершаются ошибкой
+    CircuitOpenError, не занимая воркер ожиданием таймаута. Затем к серверу пропускается одна пробная попытка: при
+    успехе цепь замыкается, при ошибке снова размыкается. Ответ сервера с ошибкой (например, отклоненный адрес)
+    означает, что сервер доступен, и не размыкает цепь.
+    """
+
+    def __init__(self, name, failure_threshold, reset_timeout):
+        self.failures_key = f'mailing:breaker:{name}:failures'
+        self.open_key = f'mailing:breaker:{name}:open'
+        self.probe_key = f'mailing:breaker:{name}:probe'
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+    @property
+    def is_open(self):
+        return cache.get(self.open_key) is not None
+
+    def before_call(self):
+        if self.is_open:
+            raise CircuitOpenError('Почтовый сервер недоступен, отправка приостановлена')
+        failures = cache.get(self.failures_key, 0)
+        # Полуоткрытое состояние: пробную попытку выполняет только один процесс
+        if failures >= self.failure_threshold and not cache.add(self.probe_key, 1, self.reset_timeout):
+            raise CircuitOpenError('Почтовый сервер недоступен, выполняется пробная отправка')
+
+    def record_success(self):
+        cache.delete_many([self.failures_key, self.probe_key])
+
+    def record_failure(self):
+        try:
+            failures = cache.incr(self.failures_key)
+        except ValueError:
+            failures = 1
+            cache.set(self.failures_key, failures, None)
+        if failures >= self.failure_threshold:
+            cache.set(self.open_key, 1, self.reset_timeout)
+            cache.delete(self.probe_key)
+
+    def reset(self):
+        cache.delete_many([self.failures_key, self.open_key, self.probe_key])
+
+    @contextmanager
+    def guard(self):
+        """Контекстный менеджер для обращения к серверу через размыкатель цепи."""
+
+        self.before_call()
+        try:
+            yield
+        except MAIL_ERRORS as exc:
+            if is_connection_error(exc):
+                self.record_failure()
+            else:
+                self.record_success()
+            raise
+        self.record_success()
+
+
+mail_breaker = CircuitBreaker(
+    'smtp',
+    failure_threshold=settings.MAILING_BREAKER_FAILURE_THRESHOLD,
+    reset_timeout=settings.MAILING_BREAKER_RESET_TIMEOUT
+)
+
+
+@contextmanager
+def open_connection():
+    """Контекстный менеджер возвращает открытое соединение с почтовым сервером. Каждая операция ограничена таймаутом
+    EMAIL_TIMEOUT, а ошибки учитываются размыкателем цепи."""
+
+    with mail_breaker.guard():
+        with get_connection(timeout=settings.EMAIL_TIMEOUT) as connection:
+            yield connection
+
+
+class MailTask(Task):
+    """
+    Базовый класс почтовых задач Celery. При ошибке почтового сервера или разомкнутой цепи задача повторяется с
+    экспоненциально растущей задержкой; задача, не выполненная после всех попыток, сохраняется в модели DeadLetter.
+    Ошибки конкретного письма (PERMANENT_MAIL_ERRORS) не повторяются и не сохраняются: повторный запуск снова
+    завершился бы той же ошибкой.
+    """
+
+    autoretry_for = (*MAIL_ERRORS, CircuitOpenError)
+    dont_autoretry_for = PERMANENT_MAIL_ERRORS
+    retry_backoff = True
+    retry_backoff_max = 10 * 60
+    retry_jitter = True
+    max_retries = 5
+    # Попытка не может занимать воркер дольше, чем несколько таймаутов SMTP
+    time_limit = 5 * 60
+
+    def on_failure(self, exc, task_id, args, kwargs, einfo):
+        from mailing.models import DeadLetter
+
+        if isinstance(exc, PERMANENT_MAIL_ERRORS):
+            return
+        DeadLetter.objects.create(task=self.name, args=list(args), kwargs=dict(kwargs), error=repr(exc))
@@ -0,0 +1,36 @@
+from celery import current_app
+from django.core.management import BaseCommand
+from django.utils import timezone
+
+from mailing.delivery import mail_breaker
+from mailing.models import DeadLetter
+
+
+class Command(BaseCommand):
+    help = 'Повторно запускает почтовые задачи, не выполненные после всех попыток'
+
+    def add_arguments(self, parser):
+        parser.add_argument('ids', nargs='*', type=int, help='Идентификаторы задач (по умолчанию все)')
+        parser.add_argument('--task', help='Запустить только задачи с указанным именем')
+        parser.add_argument('--reset-breaker', action='store_true', help='Замкнуть размыкатель цепи перед запуском')
+
+    def handle(self, *args, **options):
+        dead_letters = DeadLetter.objects.filter(replayed_at__isnull=True)
+        if options['ids']:
+            dead_letters = dead_letters.filter(pk__in=options['ids'])
+        if options['task']:
+            dead_letters = dead_letters.filter(task=options['task'])
+        if options['reset_breaker']:
+            mail_breaker.reset()
+
+        replayed = 0
+        for dead_letter in dead_letters.iterator():
+            task = current_app.tasks.get(dead_letter.task)
+            if task is None:
+                self.stderr.write(f'{dead_letter.pk}: задача {dead_letter.task} не найдена')
+                continue
+            task.apply_async(args=dead_letter.args, kwargs=dead_letter.kwargs)
+            dead_letter.replayed_at = timezone.now()
+            dead_letter.save(update_fields=('replayed_at',))
+            replayed += 1
+        self.stdout.write(f'replayed: {replayed}')
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.6 on 2026-10-18 13:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeadLetter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task', models.CharField(max_length=255, verbose_name='задача')),
+                ('args', models.JSONField(default=list, verbose_name='позиционные аргументы')),
+                ('kwargs', models.JSONField(default=dict, verbose_name='именованные аргументы')),
+                ('error', models.TextField(verbose_name='ошибка')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='дата создания')),
+                ('replayed_at', models.DateTimeField(blank=True, null=True, verbose_name='дата повторного запуска')),
+            ],
+            options={
+                'verbose_name': 'Невыполненная почтовая задача',
+                'verbose_name_plural': 'Невыполненные почтовые задачи',
+                'ordering': ('id',),
+            },
+        ),
+    ]
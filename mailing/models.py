@@ -0,0 +1,24 @@
+from django.db import models
+
+NULLABLE = {'null': True, 'blank': True}
+
+
+# Create your models here.
+class DeadLetter(models.Model):
+    """Почтовая задача, которая не выполнилась после всех повторных попыток. Задачу можно запустить повторно
+    командой replay_dead_letters."""
+
+    task = models.CharField(max_length=255, verbose_name='задача')
+    args = models.JSONField(default=list, verbose_name='позиционные аргументы')
+    kwargs = models.JSONField(default=dict, verbose_name='именованные аргументы')
+    error = models.TextField(verbose_name='ошибка')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='дата создания')
+    replayed_at = models.DateTimeField(verbose_name='дата повторного запуска', **NULLABLE)
+
+    def __str__(self):
+        return f'{self.task} ({self.created_at})'
+
+    class Meta:
+        verbose_name = 'Невыполненная почтовая задача'
+        verbose_name_plural = 'Невыполненные почтовые задачи'
+        ordering = ('id',)
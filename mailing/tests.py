@@ -0,0 +1,149 @@
+from io import StringIO
+from smtplib import SMTPRecipientsRefused, SMTPSenderRefused, SMTPServerDisconnected
+from unittest.mock import patch
+
+from django.conf import settings
+from django.core import mail
+from django.core.cache import cache
+from django.core.mail import get_connection
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from mailing.delivery import CircuitOpenError, mail_breaker, open_connection
+from mailing.models import DeadLetter
+from modules.models import Notification
+from modules.tasks import send_queued_notifications
+from users.models import User
+from users.tasks import send_user_email
+
+SEND_MESSAGES = 'django.core.mail.backends.locmem.EmailBackend.send_messages'
+
+
+# Create your tests here.
+@override_settings(CELERY_TASK_ALWAYS_EAGER=True)
+class MailingTestCase(TestCase):
+    """Для тестирования общего слоя отправки почты."""
+
+    def setUp(self) -> None:
+        # Очистка состояния размыкателя цепи
+        cache.clear()
+
+        # Сообщение, ожидающее отправки
+        Notification.objects.create(email='test@test.com', subject='тема', message='текст')
+
+    def send_failing(self, times, error=SMTPServerDisconnected):
+        for _ in range(times):
+            with self.assertRaises(error):
+                with open_connection() as connection:
+                    connection.send_messages([mail.EmailMessage('тема', 'текст', to=['test@test.com'])])
+
+    def test_connection_is_opened_with_timeout(self):
+        """Соединение с почтовым сервером открывается с таймаутом на каждую операцию."""
+
+        with patch('mailing.delivery.get_connection', wraps=get_connection) as mock_connection:
+            with open_connection():
+                pass
+
+        # Проверка переданного таймаута
+        mock_connection.assert_called_once_with(timeout=settings.EMAIL_TIMEOUT)
+
+    def test_breaker_opens_after_failures_and_short_circuits(self):
+        """После нескольких ошибок подряд цепь размыкается, и сервер больше не вызывается до пробной попытки."""
+
+        with patch(SEND_MESSAGES, side_effect=SMTPServerDisconnected):
+            self.send_failing(settings.MAILING_BREAKER_FAILURE_THRESHOLD)
+
+        # Проверка того, что соединение не открывается, пока цепь разомкнута
+        self.assertTrue(mail_breaker.is_open)
+        with patch('mailing.delivery.get_connection') as mock_connection:
+            with self.assertRaises(CircuitOpenError):
+                with open_connection():
+                    pass
+        mock_connection.assert_not_called()
+
+        # Истечение времени размыкания: успешная пробная попытка замыкает цепь
+        cache.delete(mail_breaker.open_key)
+        with open_connection() as connection:
+            connection.send_messages([mail.EmailMessage('тема', 'текст', to=['test@test.com'])])
+        self.assertEqual(cache.get(mail_breaker.failures_key), None)
+
+    def test_failed_probe_opens_breaker_again(self):
+        """Ошибка пробной попытки снова размыкает цепь."""
+
+        with patch(SEND_MESSAGES, side_effect=SMTPServerDisconnected):
+            self.send_failing(settings.MAILING_BREAKER_FAILURE_THRESHOLD)
+            cache.delete(mail_breaker.open_key)
+            self.send_failing(1)
+
+        # Проверка состояния цепи
+        self.assertTrue(mail_breaker.is_open)
+
+    def test_rejected_recipient_does_not_open_breaker(self):
+        """Отклоненный сервером адрес не считается недоступностью сервера и не размыкает цепь."""
+
+        refused = SMTPRecipientsRefused({'test@test.com': (550, b'No such user')})
+        with patch(SEND_MESSAGES, side_effect=refused):
+            self.send_failing(settings.MAILING_BREAKER_FAILURE_THRESHOLD + 1, error=SMTPRecipientsRefused)
+
+        # Проверка состояния цепи
+        self.assertFalse(mail_breaker.is_open)
+        self.assertEqual(cache.get(mail_breaker.failures_key), None)
+
+    def test_server_replies_do_not_open_breaker_unlike_socket_errors(self):
+        """Ответы сервера с ошибкой (SMTPException наследует OSError) не размыкают цепь, а ошибки сокета размыкают."""
+
+        errors = (
+            SMTPRecipientsRefused({'test@test.com': (550, b'No such user')}),
+            SMTPSenderRefused(553, b'Sender rejected', 'noreply@test.com'),
+        )
+        for error in errors * settings.MAILING_BREAKER_FAILURE_THRESHOLD:
+            with self.assertRaises(type(error)):
+                with mail_breaker.guard():
+                    raise error
+
+        # Проверка состояния цепи после ответов сервера
+        self.assertFalse(mail_breaker.is_open)
+
+        for _ in range(settings.MAILING_BREAKER_FAILURE_THRESHOLD):
+            with self.assertRaises(TimeoutError):
+                with mail_breaker.guard():
+                    raise TimeoutError('timed out')
+
+        # Проверка состояния цепи после таймаутов
+        self.assertTrue(mail_breaker.is_open)
+
+    def test_rejected_recipient_is_not_retried_or_dead_lettered(self):
+        """Задача, письмо которой сервер отклонил, не повторяется и не сохраняется для повторного запуска."""
+
+        user = User.objects.create(email='user@test.com', is_active=False)
+        context = {'domain': 'example.com', 'protocol': 'http', 'site_name': 'example'}
+        refused = SMTPRecipientsRefused({'user@test.com': (550, b'No such user')})
+
+        with patch(SEND_MESSAGES, side_effect=refused) as mock_send:
+            result = send_user_email.apply(args=('users.views.ActivationEmail', user.pk, context, ['user@test.com']))
+
+        # Проверка одной попытки без сохранения задачи
+        self.assertTrue(result.failed())
+        self.assertEqual(mock_send.call_count, 1)
+        self.assertFalse(DeadLetter.objects.exists())
+
+    def test_exhausted_task_goes_to_dead_letters_and_can_be_replayed(self):
+        """Задача, не выполненная после всех повторных попыток, сохраняется и может быть запущена повторно."""
+
+        with patch(SEND_MESSAGES, side_effect=SMTPServerDisconnected) as mock_send:
+            result = send_queued_notifications.apply()
+
+        # Проверка количества попыток и сохраненной задачи
+        self.assertTrue(result.failed())
+        self.assertLessEqual(mock_send.call_count, send_queued_notifications.max_retries + 1)
+        dead_letter = DeadLetter.objects.get()
+        self.assertEqual(dead_letter.task, 'modules.tasks.send_queued_notifications')
+        self.assertTrue(Notification.objects.filter(sent_at__isnull=True).exists())
+
+        call_command('replay_dead_letters', '--reset-breaker', stdout=StringIO())
+
+        # Проверка отправки сообщения и отметки о повторном запуске
+        dead_letter.refresh_from_db()
+        self.assertIsNotNone(dead_letter.replayed_at)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertFalse(Notification.objects.filter(sent_at__isnull=True).exists())
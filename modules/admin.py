@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from modules.models import Module
+from modules.models import BannedWord, Module, Notification
 
 
 # Register your models here.
@@ -10,3 +10,15 @@ class ModuleAdmin(admin.ModelAdmin):
     list_display_links = ('id',)
     search_fields = ('title',)
     list_filter = ('title',)
+
+
+@admin.register(BannedWord)
+class BannedWordAdmin(admin.ModelAdmin):
+    list_display = ('id', 'word')
+    search_fields = ('word',)
+
+
+@admin.register(Notification)
+class NotificationAdmin(admin.ModelAdmin):
+    list_display = ('id', 'email', 'subject', 'created_at', 'sent_at', 'attempts', 'failed_at')
+    search_fields = ('email',)
@@ -0,0 +1,247 @@
+import csv
+import io
+import json
+import uuid
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from modules.cache import invalidate_list
+from modules.models import POSITION_STEP, Module
+from modules.moderation import get_automaton
+from modules.validators import TitleValidation
+from users.models import User
+
+# Столбцы промежуточной таблицы, которые можно загрузить из файла. Файл выгрузки (export_modules) подходит для
+# загрузки без изменений: его служебные столбцы загружаются, но не используются. Владелец задается email в столбце
+# owner_email или module_user (как в API пакетного создания)
+IMPORT_COLUMNS = ('id', 'title', 'description', 'position', 'owner_email', 'module_user', 'created_at', 'updated_at')
+
+CREATE_SQL = '''
+    CREATE UNLOGGED TABLE {table} (
+        line bigint GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
+        {columns},
+        owner_id bigint,
+        error text
+    )
+'''
+
+RESOLVE_OWNERS_SQL = f'''
+    UPDATE {{table}} AS staging
+    SET owner_id = owner.id
+    FROM {User._meta.db_table} AS owner
+    WHERE owner.email = coalesce(staging.owner_email, staging.module_user) AND staging.error IS NULL
+'''
+
+# Проверки сериализатора ModuleCreateSerializer одним запросом для всех строк. Запрещенные слова (TitleValidation)
+# ищутся отдельно тем же автоматом Ахо — Корасик, что и в API: сравнение в SQL через lower() расходится с casefold()
+# автомата, а подзапрос по BannedWord перебирает все слова для каждой строки
+VALIDATE_SQL = '''
+    UPDATE {table} AS staging
+    SET error = CASE
+        WHEN coalesce(btrim(staging.title), '') = '' THEN 'title: Обязательное поле.'
+        WHEN char_length(staging.title) > %(title_max_length)s
+            THEN 'title: Убедитесь, что это значение содержит не более ' || %(title_max_length)s || ' символов.'
+        WHEN coalesce(btrim(staging.description), '') = '' THEN 'description: Обязательное поле.'
+        WHEN staging.owner_id IS NULL THEN
+            'module_user: Пользователь ' || coalesce(staging.owner_email, staging.module_user, '') || ' не существует.'
+    END
+    WHERE staging.error IS NULL
+'''
+
+# Строки, прошедшие проверки VALIDATE_SQL, читаются пачками по номеру строки для поиска запрещенных слов
+VALID_ROWS_SQL = '''
+    SELECT line, title, description
+    FROM {table}
+    WHERE line > %(after)s AND error IS NULL
+    ORDER BY line
+    LIMIT %(limit)s
+'''
+
+REJECT_LINES_SQL = 'UPDATE {table} SET error = %(error)s WHERE line = ANY(%(lines)s)'
+
+# Владельцы строк пачки блокируются до переноса (как в Module.objects.next_positions), чтобы одновременное создание
+# модулей тех же владельцев не получило те же порядковые номера
+LOCK_OWNERS_SQL = f'''
+    SELECT id FROM {User._meta.db_table}
+    WHERE id IN (
+        SELECT owner_id FROM {{table}} WHERE line > %(start)s AND line <= %(end)s AND error IS NULL
+    )
+    ORDER BY id
+    FOR UPDATE
+'''
+
+# Новые модули добавляются в конец последовательности своего владельца в порядке строк файла
+MERGE_SQL = f'''
+    INSERT INTO {Module._meta.db_table} (title, description, module_user_id, position, created_at, updated_at)
+    SELECT
+        staging.title,
+        staging.description,
+        staging.owner_id,
+        coalesce(last.position, 0) + row_number() OVER (PARTITION BY staging.owner_id ORDER BY staging.line) * %(step)s,
+        %(now)s,
+        %(now)s
+    FROM {{table}} AS staging
+    LEFT JOIN (
+        SELECT module_user_id, max(position) AS position
+        FROM {Module._meta.db_table}
+        WHERE module_user_id IN (
+            SELECT owner_id FROM {{table}} WHERE line > %(start)s AND line <= %(end)s AND error IS NULL
+        )
+        GROUP BY module_user_id
+    ) AS last ON last.module_user_id = staging.owner_id
+    WHERE staging.line > %(start)s AND staging.line <= %(end)s AND staging.error IS NULL
+    ORDER BY staging.line
+'''
+
+REJECTED_SQL = '''
+    COPY (
+        SELECT line, error, title, description, coalesce(owner_email, module_user) AS owner_email
+        FROM {table}
+        WHERE error IS NOT NULL
+        ORDER BY line
+    ) TO STDOUT WITH (FORMAT csv, HEADER true)
+'''
+
+
+class ImportFormatError(Exception):
+    """Возбуждается, если заголовок файла содержит неизвестные столбцы."""
+
+
+class _NdjsonAsCsv(io.TextIOBase):
+    """
+    Файлоподобный объект для COPY, который читает NDJSON построчно и отдает его в виде CSV со столбцами title,
+    description, owner_email и error. Строка, которая не является JSON-объектом, загружается с текстом ошибки, чтобы
+    попасть в файл отклоненных строк под своим номером.
+    """
+
+    columns = ('title', 'description', 'owner_email', 'error')
+
+    def __init__(self, file):
+        self.lines = iter(file)
+        self.buffer = ''
+        self.output = io.StringIO()
+        self.writer = csv.writer(self.output)
+
+    def convert(self, line):
+        try:
+            document = json.loads(line)
+        except ValueError:
+            document = None
+        if not isinstance(document, dict):
+            return [None, line.rstrip('\n'), None, 'Строка не является JSON-объектом.']
+        return [
+            document.get('title'),
+            document.get('description'),
+            document.get('owner_email', document.get('module_user')),
+            None,
+        ]
+
+    def read(self, size=-1):
+        while size < 0 or len(self.buffer) < size:
+            line = next(self.lines, None)
+            if line is None:
+                break
+            if not line.strip():
+                continue
+            self.writer.writerow(self.convert(line))
+            self.buffer += self.output.getvalue()
+            self.output.seek(0)
+            self.output.truncate()
+        if size < 0:
+            size = len(self.buffer)
+        chunk, self.buffer = self.buffer[:size], self.buffer[size:]
+        return chunk
+
+
+def _copy_csv(cursor, table, file):
+    header = next(csv.reader([file.readline()]), [])
+    unknown = [name for name in header if name not in IMPORT_COLUMNS]
+    if unknown or not header:
+        raise ImportFormatError(
+            f'Неизвестные столбцы: {", ".join(unknown) or "заголовок не найден"}. '
+            f'Допустимые столбцы: {", ".join(IMPORT_COLUMNS)}.'
+        )
+    cursor.copy_expert(f'COPY {table} ({", ".join(header)}) FROM STDIN WITH (FORMAT csv)', file)
+
+
+def _copy_ndjson(cursor, table, file):
+    cursor.copy_expert(
+        f'COPY {table} ({", ".join(_NdjsonAsCsv.columns)}) FROM STDIN WITH (FORMAT csv)',
+        _NdjsonAsCsv(file)
+    )
+
+
+def _reject_banned(cursor, table, batch_size):
+    """Метод отмечает строки, название или описание которых содержит запрещенное слово. Строки читаются пачками по
+    <batch_size>, автомат получается один раз на всю загрузку."""
+
+    automaton = get_automaton()
+    validation = TitleValidation()
+    after = 0
+    while True:
+        cursor.execute(VALID_ROWS_SQL.format(table=table), {'after': after, 'limit': batch_size})
+        rows = cursor.fetchall()
+        if not rows:
+            return
+        errors = {}
+        for line, title, description in rows:
+            for field, messages in validation.get_errors(
+                {'title': title, 'description': description}, automaton=automaton
+            ).items():
+                errors.setdefault(f'{field}: {messages[0]}', []).append(line)
+        for error, lines in errors.items():
+            cursor.execute(REJECT_LINES_SQL.format(table=table), {'error': error, 'lines': lines})
+        after = rows[-1][0]
+
+
+def import_modules(file, file_format, rejected_path=None, batch_size=None):
+    """
+    Метод загружает модули из файла CSV или NDJSON и возвращает пару (загружено, отклонено).
+    Файл целиком загружается командой COPY в промежуточную таблицу, после чего владельцы находятся по email и строки
+    проверяются несколькими запросами UPDATE для всех строк сразу, а на запрещенные слова — автоматом пачками по
+    <batch_size> строк. Прошедшие проверку строки переносятся в таблицу модулей такими же пачками, каждая пачка в
+    своей транзакции. Отклоненные строки с номером и причиной записываются в файл <rejected_path> в формате CSV.
+    """
+
+    batch_size = batch_size or settings.MODULES_IMPORT_BATCH_SIZE
+    # Обычная (нежурналируемая) таблица вместо временной доступна из любого соединения, в том числе через PgBouncer
+    table = f'modules_import_{uuid.uuid4().hex}'
+    imported = 0
+    with connection.cursor() as cursor:
+        cursor.execute(CREATE_SQL.format(table=table, columns=', '.join(f'{name} text' for name in IMPORT_COLUMNS)))
+        try:
+            with transaction.atomic():
+                (_copy_csv if file_format == 'csv' else _copy_ndjson)(cursor, table, file)
+                cursor.execute(f'ANALYZE {table}')
+                cursor.execute(RESOLVE_OWNERS_SQL.format(table=table))
+                cursor.execute(
+                    VALIDATE_SQL.format(table=table),
+                    {'title_max_length': Module._meta.get_field('title').max_length}
+                )
+                _reject_banned(cursor, table, batch_size)
+                cursor.execute(f'SELECT coalesce(max(line), 0), count(error) FROM {table}')
+                last_line, rejected = cursor.fetchone()
+
+            for start in range(0, last_line, batch_size):
+                with transaction.atomic():
+                    cursor.execute(LOCK_OWNERS_SQL.format(table=table), {'start': start, 'end': start + batch_size})
+                    cursor.execute(MERGE_SQL.format(table=table), {
+                        'step': POSITION_STEP,
+                        'now': timezone.now(),
+                        'start': start,
+                        'end': start + batch_size,
+                    })
+                    imported += cursor.rowcount
+
+            if rejected and rejected_path is not None:
+                with open(rejected_path, 'w', encoding='utf-8', newline='') as rejected_file:
+                    cursor.copy_expert(REJECTED_SQL.format(table=table), rejected_file)
+        finally:
+            cursor.execute(f'DROP TABLE IF EXISTS {table}')
+
+    # Запрос INSERT ... SELECT не отправляет сигналы post_save, поэтому кеш списка сбрасывается явно
+    if imported:
+        invalidate_list()
+    return imported, rejected
@@ -0,0 +1,301 @@
+import hashlib
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.redis import RedisCache
+from django.db import transaction
+from django.shortcuts import get_object_or_404
+from rest_framework.response import Response
+
+from config.conditional import get_not_modified_response, make_etag, set_validators
+from modules.models import Module
+
+CACHE_PREFIX = 'modules:cache'
+LIST_VERSION_KEY = f'{CACHE_PREFIX}:list:version'
+STATS_KEYS = {
+    'hit': f'{CACHE_PREFIX}:stats:hits',
+    'miss': f'{CACHE_PREFIX}:stats:misses',
+    'coalesced': f'{CACHE_PREFIX}:stats:coalesced',
+}
+
+# Время жизни блокировки вычисления значения, время ожидания результата, который вычисляет другой процесс (намного
+# меньше таймаута запроса: после него процесс вычисляет значение сам), и интервал опроса кеша в это время
+LOCK_TIMEOUT = 10
+LOCK_WAIT_TIMEOUT = 1
+LOCK_POLL_INTERVAL = 0.05
+
+# Удаление блокировки, только если она все еще хранит токен процесса, который ее захватил
+RELEASE_LOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+# Идентификаторы модулей, сброс кеша которых отложен до конца блока batch_invalidation() в текущем потоке
+_batch = threading.local()
+
+
+def _incr(key, delta=1, initial=None):
+    try:
+        return cache.incr(key, delta)
+    except ValueError:
+        value = delta if initial is None else initial
+        cache.set(key, value, None)
+        return value
+
+
+def get_stats():
+    """Метод возвращает счетчики попаданий и промахов кеша, общие для всех процессов."""
+
+    values = cache.get_many(list(STATS_KEYS.values()))
+    return {name: values.get(key, 0) for name, key in STATS_KEYS.items()}
+
+
+def reset_stats():
+    cache.delete_many(list(STATS_KEYS.values()))
+
+
+def _new_version():
+    """Метод возвращает случайный номер версии: после очистки кеша нумерация не начинается заново, поэтому ключ или
+    ETag, выданный до очистки, не совпадет с ключом или ETag другого содержимого."""
+
+    return secrets.randbits(48)
+
+
+def _detail_version_key(pk):
+    return f'{CACHE_PREFIX}:detail:{pk}:version'
+
+
+def _owner_version_key(owner_id):
+    return f'{CACHE_PREFIX}:owner:{owner_id}:version'
+
+
+def _request_fingerprint(request):
+    """Метод возвращает хеш от хоста и отсортированной строки запроса: ссылки пагинации в ответе абсолютные."""
+
+    query = sorted(request.GET.lists())
+    raw = f'{request.get_host()}|{query}'
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def get_list_version():
+    return cache.get_or_set(LIST_VERSION_KEY, _new_version, None)
+
+
+def get_owner_version(owner_id):
+    """Метод возвращает версию данных владельца, которые выводятся вместе с его модулями."""
+
+    return cache.get_or_set(_owner_version_key(owner_id), _new_version, None)
+
+
+def list_cache_key(request, version=None):
+    version = get_list_version() if version is None else version
+    return f'{CACHE_PREFIX}:list:v{version}:{_request_fingerprint(request)}'
+
+
+def detail_cache_key(request, pk):
+    version = cache.get_or_set(_detail_version_key(pk), _new_version, None)
+    return f'{CACHE_PREFIX}:detail:{pk}:v{version}:{_request_fingerprint(request)}'
+
+
+def invalidate_list():
+    """Метод делает недействительными все закешированные страницы списка: ключи содержат номер версии, поэтому
+    запись, вычисленная до изменения, никогда не будет прочитана после него."""
+
+    _incr(LIST_VERSION_KEY, initial=_new_version())
+
+
+def invalidate_details(pks):
+    """Метод делает недействительной детальную информацию о модулях <pks>: версии всех модулей заменяются новыми
+    случайными значениями одним обращением к кешу."""
+
+    cache.set_many({_detail_version_key(pk): _new_version() for pk in pks}, None)
+
+
+def invalidate_owner(owner_id):
+    """Метод делает недействительными список и детальную информацию обо всех модулях владельца: записи хранят версию
+    владельца, с которой они вычислены, поэтому для сброса достаточно увеличить одну версию."""
+
+    invalidate_list()
+    _incr(_owner_version_key(owner_id), initial=_new_version())
+
+
+def invalidate_modules(pks=()):
+    """
+    Метод сбрасывает кеш списка и детальной информации о модулях <pks> после фиксации текущей транзакции: если
+    сбросить кеш до фиксации, параллельный запрос успеет закешировать еще не измененные данные. Вне транзакции кеш
+    сбрасывается сразу. Внутри блока batch_invalidation() идентификаторы накапливаются и сбрасываются один раз.
+    """
+
+    pending = getattr(_batch, 'pks', None)
+    if pending is not None:
+        pending.update(pks)
+        return
+    pks = list(pks)
+
+    def invalidate():
+        invalidate_list()
+        invalidate_details(pks)
+
+    transaction.on_commit(invalidate)
+
+
+@contextmanager
+def batch_invalidation():
+    """Менеджер контекста для изменения нескольких модулей: сигналы отдельных строк только накапливают идентификаторы,
+    а кеш сбрасывается одним вызовом invalidate_modules() после выхода из блока."""
+
+    if getattr(_batch, 'pks', None) is not None:
+        yield
+        return
+
+    _batch.pks = set()
+    try:
+        yield
+    finally:
+        pks, _batch.pks = _batch.pks, None
+    invalidate_modules(pks)
+
+
+def _get_fresh(key, is_fresh=None):
+    """Метод возвращает значение из кеша или None, если значения нет или оно устарело (is_fresh вернул False)."""
+
+    value = cache.get(key)
+    if value is None or is_fresh is None or is_fresh(value):
+        return value
+    return None
+
+
+def get_cached(key, is_fresh=None):
+    """Метод возвращает значение из кеша или None и учитывает попадание в статистике."""
+
+    value = _get_fresh(key, is_fresh)
+    if value is not None:
+        _incr(STATS_KEYS['hit'])
+    return value
+
+
+def _acquire_lock(lock_key):
+    """Метод захватывает блокировку и возвращает ее уникальный токен или None, если блокировку держит другой процесс.
+    Токен — целое число: RedisCache хранит его без сериализации, поэтому скрипт освобождения сравнивает его как
+    строку."""
+
+    token = secrets.randbits(62)
+    return token if cache.add(lock_key, token, LOCK_TIMEOUT) else None
+
+
+def _release_lock(lock_key, token):
+    """Метод удаляет блокировку, только если она все еще принадлежит текущему процессу: блокировку, которая истекла
+    и была захвачена другим процессом, удалять нельзя. В Redis проверка и удаление выполняются атомарно скриптом."""
+
+    backend = caches['default']
+    if isinstance(backend, RedisCache):
+        key = backend.make_and_validate_key(lock_key)
+        backend._cache.get_client(key, write=True).eval(RELEASE_LOCK_SCRIPT, 1, key, token)
+    elif cache.get(lock_key) == token:
+        cache.delete(lock_key)
+
+
+def compute_once(key, compute, timeout, is_fresh=None):
+    """
+    Метод вычисляет значение при промахе кеша и возвращает пару (значение, статус). Чтобы при промахе популярного
+    ключа в базу данных не ушли сразу все запросы, значение вычисляет только процесс, захвативший блокировку, а
+    остальные ждут его результат не дольше LOCK_WAIT_TIMEOUT секунд и затем вычисляют значение сами.
+    """
+
+    lock_key = f'{key}:lock'
+    token = _acquire_lock(lock_key)
+    if token is None:
+        deadline = time.monotonic() + LOCK_WAIT_TIMEOUT
+        while time.monotonic() < deadline:
+            time.sleep(LOCK_POLL_INTERVAL)
+            value = _get_fresh(key, is_fresh)
+            if value is not None:
+                _incr(STATS_KEYS['coalesced'])
+                return value, 'HIT'
+
+    _incr(STATS_KEYS['miss'])
+    try:
+        value = compute()
+        cache.set(key, value, timeout)
+    finally:
+        if token is not None:
+            _release_lock(lock_key, token)
+    return value, 'MISS'
+
+
+def get_or_compute(key, compute, timeout, is_fresh=None):
+    """Метод возвращает пару (значение, статус) из кеша или вычисляет значение при промахе (см. compute_once).
+    Устаревшее значение (is_fresh вернул False) считается промахом."""
+
+    value = get_cached(key, is_fresh)
+    if value is not None:
+        return value, 'HIT'
+    return compute_once(key, compute, timeout, is_fresh)
+
+
+class CachedListMixin:
+    """
+    Для кеширования сериализованных страниц списка объектов модели Module. ETag списка вычисляется по версии кеша
+    списка, которая увеличивается при каждом изменении модулей и их владельцев (invalidate_list), поэтому условные
+    заголовки проверяются без обращения к базе данных и без сериализации — и при попадании, и при промахе.
+    """
+
+    def list(self, request, *args, **kwargs):
+        version = get_list_version()
+        etag = make_etag(request, version)
+        not_modified = get_not_modified_response(request, etag, None)
+        if not_modified is not None:
+            return set_validators(not_modified, etag, None)
+
+        entry, status = get_or_compute(
+            list_cache_key(request, version),
+            lambda: super(CachedListMixin, self).list(request, *args, **kwargs).data,
+            settings.MODULES_CACHE_TIMEOUT
+        )
+        response = Response(entry)
+        response['X-Cache'] = status
+        return set_validators(response, etag, None)
+
+
+class CachedRetrieveMixin:
+    """
+    Для кеширования детальной информации об объекте модели Module. Вместе с данными хранятся идентификатор владельца
+    и время последнего изменения, поэтому права доступа и условные заголовки (If-None-Match / If-Modified-Since)
+    проверяются при каждом запросе без обращения к базе данных. Запись хранит и версию владельца: после изменения
+    владельца (invalidate_owner) она считается устаревшей и вычисляется заново.
+    """
+
+    def retrieve(self, request, *args, **kwargs):
+        pk = self.kwargs[self.lookup_url_kwarg or self.lookup_field]
+        entry, status = get_or_compute(
+            detail_cache_key(request, pk),
+            lambda: self._build_detail_entry(pk),
+            settings.MODULES_CACHE_TIMEOUT,
+            is_fresh=lambda entry: entry['owner_version'] == get_owner_version(entry['owner_id'])
+        )
+        self.check_object_permissions(request, Module(pk=entry['pk'], module_user_id=entry['owner_id']))
+        last_modified = entry['last_modified']
+        etag = make_etag(request, entry['pk'], last_modified.isoformat())
+        response = get_not_modified_response(request, etag, last_modified) or Response(entry['data'])
+        response['X-Cache'] = status
+        return set_validators(response, etag, last_modified)
+
+    def _build_detail_entry(self, pk):
+        instance = get_object_or_404(self.get_queryset(), **{self.lookup_field: pk})
+        return {
+            'pk': instance.pk,
+            'owner_id': instance.module_user_id,
+            'owner_version': get_owner_version(instance.module_user_id),
+            # Владелец не загружается, если он не выводится в ответе (?fields=)
+            'last_modified': max(
+                instance.updated_at,
+                instance.module_user.updated_at if Module.module_user.is_cached(instance) else instance.updated_at
+            ),
+            'data': self.get_serializer(instance).data,
+        }
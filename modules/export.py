@@ -0,0 +1,88 @@
+import csv
+import json
+from itertools import islice
+
+from django.conf import settings
+from django.db import connections
+
+from modules.models import Module
+
+# Столбцы выгрузки и соответствующие им поля модели (email владельца берется тем же запросом через JOIN)
+EXPORT_COLUMNS = (
+    ('id', 'id'),
+    ('title', 'title'),
+    ('description', 'description'),
+    ('position', 'position'),
+    ('owner_email', 'module_user__email'),
+    ('created_at', 'created_at'),
+    ('updated_at', 'updated_at'),
+)
+EXPORT_FORMATS = {
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+}
+
+
+def get_export_queryset():
+    return Module.objects.order_by('id').values_list(*(field for _, field in EXPORT_COLUMNS))
+
+
+def iter_rows(queryset, chunk_size):
+    """
+    Метод возвращает строки выборки, загружая их из базы данных порциями по <chunk_size> строк. Порции читаются
+    серверным курсором, а если серверные курсоры отключены (PgBouncer в режиме транзакций), выборка разбивается на
+    запросы по первичному ключу (id > последний прочитанный), поэтому в памяти не бывает больше одной порции.
+    """
+
+    if not connections[queryset.db].settings_dict.get('DISABLE_SERVER_SIDE_CURSORS'):
+        yield from queryset.iterator(chunk_size=chunk_size)
+        return
+
+    last_id = None
+    while True:
+        page = queryset if last_id is None else queryset.filter(id__gt=last_id)
+        rows = list(page[:chunk_size])
+        yield from rows
+        if len(rows) < chunk_size:
+            return
+        last_id = rows[-1][0]
+
+
+class _Echo:
+    """Буфер для csv.writer, который возвращает записанную строку вместо ее сохранения."""
+
+    def write(self, value):
+        return value
+
+
+def _serialize(row):
+    return [value.isoformat() if hasattr(value, 'isoformat') else value for value in row]
+
+
+def render_ndjson(rows):
+    names = [name for name, _ in EXPORT_COLUMNS]
+    for row in rows:
+        yield json.dumps(dict(zip(names, _serialize(row))), ensure_ascii=False) + '\n'
+
+
+def render_csv(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow([name for name, _ in EXPORT_COLUMNS])
+    for row in rows:
+        yield writer.writerow(_serialize(row))
+
+
+def stream_export(export_format, chunk_size=None):
+    """
+    Метод возвращает генератор выгрузки модулей с email владельцев в формате NDJSON или CSV. Генератор отдает текст
+    порциями по <chunk_size> строк, поэтому потребление памяти не зависит от размера таблицы.
+    """
+
+    chunk_size = chunk_size or settings.MODULES_EXPORT_CHUNK_SIZE
+    renderer = render_csv if export_format == 'csv' else render_ndjson
+    lines = renderer(iter_rows(get_export_queryset(), chunk_size))
+    while True:
+        chunk = ''.join(islice(lines, chunk_size))
+        if not chunk:
+            return
+        yield chunk
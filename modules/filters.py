@@ -0,0 +1,53 @@
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import DecimalField, F
+from django.db.models.functions import Cast
+from rest_framework.filters import BaseFilterBackend, OrderingFilter
+
+
+class ModuleFullTextSearchFilter(BaseFilterBackend):
+    """
+    Полнотекстовый поиск по полям <title> и <description> модели Module (конфигурация russian). Поиск выполняется по
+    индексированному полю <search_vector>, результаты сортируются по релевантности, если клиент не указал другую
+    сортировку. Синтаксис запроса — как у поисковых систем: слова, "фразы", -исключения, or.
+    """
+
+    search_param = 'search'
+    search_config = 'russian'
+
+    def get_search_term(self, request):
+        return request.query_params.get(self.search_param, '').strip()
+
+    def filter_queryset(self, request, queryset, view):
+        search_term = self.get_search_term(request)
+        if not search_term:
+            return queryset
+
+        query = SearchQuery(search_term, config=self.search_config, search_type='websearch')
+        return queryset.filter(search_vector=query).annotate(
+            # Релевантность приводится к numeric, чтобы значение курсора пагинации сравнивалось без потери точности
+            rank=Cast(
+                SearchRank(F('search_vector'), query),
+                output_field=DecimalField(max_digits=20, decimal_places=10)
+            )
+        )
+
+    def get_ordering(self, request, queryset, view):
+        """Метод используется курсорной пагинацией: при поиске без явной сортировки записи упорядочиваются по
+        релевантности, в остальных случаях — как в OrderingFilter."""
+
+        if self.get_search_term(request) and OrderingFilter.ordering_param not in request.query_params:
+            return ('-rank',)
+        return OrderingFilter().get_ordering(request, queryset, view)
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.search_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Полнотекстовый поиск по названию и описанию модуля',
+                'schema': {
+                    'type': 'string',
+                },
+            },
+        ]
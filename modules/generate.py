@@ -0,0 +1,120 @@
+import csv
+import io
+import itertools
+import random
+import re
+
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.db.models import BigIntegerField, Max
+from django.db.models.functions import Cast, Length, Substr
+from django.utils import timezone
+
+from modules.cache import invalidate_list
+from modules.models import POSITION_STEP, BannedWord, Module
+from users.models import User
+
+GENERATED_EMAIL_DOMAIN = 'generated.local'
+GENERATED_PASSWORD = 'GeneratedPassword123'
+
+DISTRIBUTIONS = ('uniform', 'zipf')
+
+TITLE_WORDS = (
+    'математика', 'физика', 'химия', 'биология', 'история', 'география', 'литература', 'информатика',
+    'экономика', 'право', 'философия', 'музыка', 'рисование', 'астрономия', 'геометрия', 'алгебра',
+)
+DESCRIPTION_WORDS = (
+    'работа', 'с', 'формулами', 'задачами', 'теорией', 'практикой', 'основы', 'введение', 'в', 'курс',
+    'для', 'начинающих', 'продвинутых', 'упражнения', 'примеры', 'разбор', 'ошибок', 'тесты', 'проекты', 'и',
+)
+DESCRIPTION_LENGTH = 12
+
+COPY_MODULES_SQL = f'''
+    COPY {Module._meta.db_table} (title, description, module_user_id, position, created_at, updated_at)
+    FROM STDIN WITH (FORMAT csv)
+'''
+
+
+def _next_user_number(email_domain):
+    """Метод возвращает номер, следующий за наибольшим номером в адресах user<номер>@<email_domain>. Количество
+    пользователей домена для этого не подходит: после удаления части пользователей номера повторились бы."""
+
+    prefix = 'user'
+    number = Cast(
+        Substr('email', len(prefix) + 1, Length('email') - len(prefix) - len(f'@{email_domain}')),
+        BigIntegerField()
+    )
+    last_number = User.objects.filter(
+        email__regex=rf'^{prefix}[0-9]+@{re.escape(email_domain)}$'
+    ).aggregate(number=Max(number))['number']
+    return 0 if last_number is None else last_number + 1
+
+
+def generate_users(count, email_domain=GENERATED_EMAIL_DOMAIN, password=GENERATED_PASSWORD, batch_size=10000):
+    """
+    Метод создает <count> активных пользователей с адресами user<номер>@<email_domain> и возвращает их
+    идентификаторы. Номера продолжаются после наибольшего номера уже созданных пользователей домена. Пароль
+    хешируется один раз для всех пользователей, поэтому создание не упирается в make_password.
+    """
+
+    password = make_password(password)
+    start = _next_user_number(email_domain)
+    ids = []
+    for offset in range(start, start + count, batch_size):
+        users = User.objects.bulk_create(
+            User(email=f'user{number}@{email_domain}', password=password, is_active=True)
+            for number in range(offset, min(offset + batch_size, start + count))
+        )
+        ids += [user.pk for user in users]
+    return ids
+
+
+def _module_rows(count, owners, next_positions, banned_words, banned_ratio, now):
+    titles = random.choices(TITLE_WORDS, k=count)
+    title_numbers = random.choices(range(1, 1000), k=count)
+    words = random.choices(DESCRIPTION_WORDS, k=count * DESCRIPTION_LENGTH)
+    banned = random.choices(banned_words or ('',), k=count)
+    for number, owner_id in enumerate(owners):
+        description = ' '.join(words[number * DESCRIPTION_LENGTH:(number + 1) * DESCRIPTION_LENGTH])
+        # Часть модулей содержит запрещенное слово, как если бы они были созданы до его добавления в список
+        if banned_words and random.random() < banned_ratio:
+            description = f'{description} {banned[number]}'
+        position = next_positions[owner_id]
+        next_positions[owner_id] = position + POSITION_STEP
+        yield f'{titles[number]} {title_numbers[number]}', description, owner_id, position, now, now
+
+
+def generate_modules(count, owner_ids, distribution='uniform', exponent=1.1, banned_ratio=0.01, batch_size=50000):
+    """
+    Метод создает <count> модулей со случайными названиями и описаниями и распределяет их между владельцами
+    <owner_ids> равномерно или по закону Ципфа. Доля <banned_ratio> модулей содержит запрещенное слово. Модули
+    добавляются в конец последовательности владельца и загружаются командой COPY пачками по <batch_size> строк в одной
+    транзакции, пока строки владельцев заблокированы (см. next_positions). Возвращает количество созданных модулей.
+    """
+
+    if not count or not owner_ids:
+        return 0
+
+    banned_words = list(BannedWord.objects.values_list('word', flat=True))
+    # Закон Ципфа: у владельца с рангом r в (r ** exponent) раз меньше модулей, чем у первого
+    cum_weights = None
+    if distribution == 'zipf':
+        cum_weights = list(itertools.accumulate(1 / rank ** exponent for rank in range(1, len(owner_ids) + 1)))
+    now = timezone.now()
+    with transaction.atomic(), connection.cursor() as cursor:
+        next_positions = Module.objects.next_positions(owner_ids)
+        for start in range(0, count, batch_size):
+            size = min(batch_size, count - start)
+            owners = random.choices(owner_ids, cum_weights=cum_weights, k=size)
+            buffer = io.StringIO()
+            csv.writer(buffer).writerows(
+                _module_rows(size, owners, next_positions, banned_words, banned_ratio, now)
+            )
+            buffer.seek(0)
+            cursor.copy_expert(COPY_MODULES_SQL, buffer)
+    with connection.cursor() as cursor:
+        cursor.execute(f'ANALYZE {Module._meta.db_table}')
+
+    # Команда COPY не отправляет сигналы post_save, поэтому кеш списка сбрасывается явно
+    invalidate_list()
+    return count
@@ -0,0 +1,23 @@
+from django.core.management import BaseCommand
+
+from modules.cache import get_stats, reset_stats
+
+
+class Command(BaseCommand):
+    help = 'Выводит счетчики попаданий и промахов кеша модулей'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Обнулить счетчики после вывода')
+
+    def handle(self, *args, **options):
+        stats = get_stats()
+        requests = stats['hit'] + stats['miss'] + stats['coalesced']
+        hit_ratio = (stats['hit'] + stats['coalesced']) / requests if requests else 0
+        self.stdout.write(
+            f'hits: {stats["hit"]}\n'
+            f'coalesced: {stats["coalesced"]}\n'
+            f'misses: {stats["miss"]}\n'
+            f'hit ratio: {hit_ratio:.2%}'
+        )
+        if options['reset']:
+            reset_stats()
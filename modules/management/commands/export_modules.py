@@ -0,0 +1,25 @@
+from django.core.management import BaseCommand
+
+from modules.export import EXPORT_FORMATS, stream_export
+
+
+class Command(BaseCommand):
+    help = 'Выгружает модули с email владельцев в формате NDJSON или CSV, читая их из базы данных порциями'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=EXPORT_FORMATS, default='ndjson', help='Формат выгрузки')
+        parser.add_argument('--output', help='Файл для выгрузки (по умолчанию стандартный вывод)')
+        parser.add_argument('--chunk-size', type=int, help='Количество строк в одной порции')
+
+    def handle(self, *args, **options):
+        chunks = stream_export(options['format'], options['chunk_size'])
+        if options['output'] is None:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
+            return
+
+        # newline='' — переводы строк в CSV расставляет csv.writer
+        with open(options['output'], 'w', encoding='utf-8', newline='') as file:
+            for chunk in chunks:
+                file.write(chunk)
+        self.stderr.write(f'Модули выгружены в {options["output"]}')
@@ -0,0 +1,56 @@
+import time
+
+from django.core.management import BaseCommand, CommandError
+
+from modules.generate import (DISTRIBUTIONS, GENERATED_EMAIL_DOMAIN, GENERATED_PASSWORD, generate_modules,
+                              generate_users)
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = 'Создает пользователей и модули со случайными данными для нагрузочного тестирования'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=0, help='Количество пользователей')
+        parser.add_argument(
+            '--modules',
+            type=int,
+            default=0,
+            help='Количество модулей (распределяются между созданными пользователями, без --users — между всеми)'
+        )
+        parser.add_argument('--distribution', choices=DISTRIBUTIONS, default='uniform', help='Распределение модулей')
+        parser.add_argument('--zipf-exponent', type=float, default=1.1, help='Показатель для распределения zipf')
+        parser.add_argument(
+            '--banned-ratio',
+            type=float,
+            default=0.01,
+            help='Доля модулей, описание которых содержит запрещенное слово'
+        )
+        parser.add_argument('--email-domain', default=GENERATED_EMAIL_DOMAIN, help='Домен адресов пользователей')
+        parser.add_argument('--password', default=GENERATED_PASSWORD, help='Пароль всех пользователей')
+        parser.add_argument('--batch-size', type=int, default=50000, help='Количество строк в одной пачке')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        user_ids = generate_users(
+            options['users'],
+            options['email_domain'],
+            options['password'],
+            min(options['batch_size'], 10000)
+        )
+        owner_ids = user_ids
+        if options['modules'] and not owner_ids:
+            owner_ids = list(User.objects.order_by('id').values_list('id', flat=True))
+            if not owner_ids:
+                raise CommandError('Нет пользователей для модулей: укажите --users')
+
+        modules = generate_modules(
+            options['modules'],
+            owner_ids,
+            options['distribution'],
+            options['zipf_exponent'],
+            options['banned_ratio'],
+            options['batch_size']
+        )
+        self.stdout.write(f'users: {len(user_ids)}\nmodules: {modules}')
+        self.stdout.write(f'elapsed: {time.monotonic() - started:.1f} s')
@@ -0,0 +1,36 @@
+from django.core.management import BaseCommand, CommandError
+from django.db import DatabaseError
+
+from modules.bulk_import import ImportFormatError, import_modules
+
+
+class Command(BaseCommand):
+    help = 'Загружает модули из файла CSV или NDJSON командой COPY через промежуточную таблицу'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл с модулями')
+        parser.add_argument(
+            '--format',
+            choices=('csv', 'ndjson'),
+            help='Формат файла (по умолчанию определяется по расширению, иначе ndjson)'
+        )
+        parser.add_argument('--batch-size', type=int, help='Количество строк, переносимых в одной транзакции')
+        parser.add_argument(
+            '--rejected',
+            help='Файл для отклоненных строк (по умолчанию <path>.rejected.csv)'
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or ('csv' if path.lower().endswith('.csv') else 'ndjson')
+        rejected_path = options['rejected'] or f'{path}.rejected.csv'
+
+        try:
+            with open(path, encoding='utf-8', newline='') as file:
+                imported, rejected = import_modules(file, file_format, rejected_path, options['batch_size'])
+        except (ImportFormatError, DatabaseError, OSError) as error:
+            raise CommandError(error)
+
+        self.stdout.write(f'imported: {imported}\nrejected: {rejected}')
+        if rejected:
+            self.stdout.write(f'rejected rows: {rejected_path}')
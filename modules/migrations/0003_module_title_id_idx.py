@@ -0,0 +1,17 @@
+# Generated by Django 4.2.6 on 2026-10-18 12:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('modules', '0002_module_module_user'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='module',
+            index=models.Index(fields=['title', 'id'], name='module_title_id_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.6 on 2026-10-18 13:02
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('modules', '0003_module_title_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='module',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now, verbose_name='дата создания'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='module',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, verbose_name='дата изменения'),
+        ),
+    ]
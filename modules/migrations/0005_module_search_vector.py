@@ -0,0 +1,47 @@
+# Generated by Django 4.2.6 on 2026-10-18 13:09
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+SEARCH_VECTOR_SQL = '''
+    CREATE FUNCTION modules_module_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('russian', coalesce(NEW.title, '')), 'A') ||
+            setweight(to_tsvector('russian', coalesce(NEW.description, '')), 'B');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql;
+
+    CREATE TRIGGER modules_module_search_vector_trigger
+        BEFORE INSERT OR UPDATE OF title, description ON modules_module
+        FOR EACH ROW EXECUTE FUNCTION modules_module_search_vector_update();
+
+    UPDATE modules_module SET title = title;
+'''
+
+SEARCH_VECTOR_REVERSE_SQL = '''
+    DROP TRIGGER modules_module_search_vector_trigger ON modules_module;
+    DROP FUNCTION modules_module_search_vector_update();
+'''
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('modules', '0004_module_created_at_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='module',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='поисковый вектор'),
+        ),
+        migrations.AddIndex(
+            model_name='module',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='module_search_vector_idx'),
+        ),
+        migrations.RunSQL(SEARCH_VECTOR_SQL, SEARCH_VECTOR_REVERSE_SQL),
+    ]
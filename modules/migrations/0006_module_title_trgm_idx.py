@@ -0,0 +1,20 @@
+# Generated by Django 4.2.6 on 2026-10-18 13:11
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('modules', '0005_module_search_vector'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name='module',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['title'], name='module_title_trgm_idx', opclasses=('gin_trgm_ops',)),
+        ),
+    ]
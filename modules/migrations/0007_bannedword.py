@@ -0,0 +1,41 @@
+# Generated by Django 4.2.6 on 2026-10-18 13:13
+
+from django.db import migrations, models
+
+# Слова, которые ранее были заданы в регулярном выражении TitleValidation
+INITIAL_BANNED_WORDS = (
+    'биржа', 'казино', 'криптовалюта', 'крипта', 'дешево', 'бесплатно', 'обман', 'полиция', 'радар',
+)
+
+
+def create_banned_words(apps, schema_editor):
+    BannedWord = apps.get_model('modules', 'BannedWord')
+    BannedWord.objects.bulk_create(BannedWord(word=word) for word in INITIAL_BANNED_WORDS)
+
+
+def delete_banned_words(apps, schema_editor):
+    BannedWord = apps.get_model('modules', 'BannedWord')
+    BannedWord.objects.filter(word__in=INITIAL_BANNED_WORDS).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('modules', '0006_module_title_trgm_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BannedWord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('word', models.CharField(max_length=100, unique=True, verbose_name='слово')),
+            ],
+            options={
+                'verbose_name': 'Запрещенное слово',
+                'verbose_name_plural': 'Запрещенные слова',
+                'ordering': ('word',),
+            },
+        ),
+        migrations.RunPython(create_banned_words, delete_banned_words),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.6 on 2026-10-18 16:20
+
+from django.db import migrations, models
+
+# Существующие модули нумеруются в порядке создания с шагом modules.models.POSITION_STEP
+POSITION_BACKFILL_SQL = '''
+    UPDATE modules_module AS module
+    SET position = numbered.row_number * 1024
+    FROM (
+        SELECT id, row_number() OVER (PARTITION BY module_user_id ORDER BY id) AS row_number
+        FROM modules_module
+    ) AS numbered
+    WHERE module.id = numbered.id;
+'''
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('modules', '0007_bannedword'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='module',
+            name='position',
+            field=models.BigIntegerField(editable=False, null=True, verbose_name='порядковый номер'),
+        ),
+        migrations.RunSQL(POSITION_BACKFILL_SQL, migrations.RunSQL.noop),
+        migrations.AlterField(
+            model_name='module',
+            name='position',
+            field=models.BigIntegerField(editable=False, verbose_name='порядковый номер'),
+        ),
+        migrations.AddIndex(
+            model_name='module',
+            index=models.Index(fields=['module_user', 'position'], name='module_user_position_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.6 on 2026-10-18 13:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('modules', '0008_module_position'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Notification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('email', models.EmailField(max_length=254, verbose_name='адрес получателя')),
+                ('subject', models.CharField(max_length=255, verbose_name='тема')),
+                ('message', models.TextField(verbose_name='текст')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='дата создания')),
+                ('sent_at', models.DateTimeField(blank=True, null=True, verbose_name='дата отправки')),
+            ],
+            options={
+                'verbose_name': 'Уведомление',
+                'verbose_name_plural': 'Уведомления',
+                'indexes': [models.Index(condition=models.Q(('sent_at__isnull', True)), fields=['id'], name='notification_pending_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.6 on 2026-10-18 13:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('modules', '0009_notification'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='digest',
+            field=models.BooleanField(default=False, verbose_name='для сводки'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.6 on 2026-10-18 13:43
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('modules', '0010_notification_digest'),
+    ]
+
+    operations = [
+        # Составной индекс создается раньше, чем удаляется индекс по внешнему ключу
+        migrations.AddIndex(
+            model_name='module',
+            index=models.Index(fields=['module_user', 'id'], name='module_user_id_idx'),
+        ),
+        migrations.AlterField(
+            model_name='module',
+            name='module_user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='создатель модуля'),
+        ),
+    ]
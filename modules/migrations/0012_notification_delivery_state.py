@@ -0,0 +1,41 @@
+# Generated by Django 4.2.6 on 2026-10-18 15:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('modules', '0011_module_user_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0, verbose_name='количество неудачных попыток'),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='claimed_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='дата захвата'),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='error',
+            field=models.TextField(blank=True, verbose_name='последняя ошибка'),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='failed_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='дата отказа от отправки'),
+        ),
+        migrations.RemoveIndex(
+            model_name='notification',
+            name='notification_pending_idx',
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('failed_at__isnull', True), ('sent_at__isnull', True)), fields=['id'], name='notification_pending_idx'),
+        ),
+    ]
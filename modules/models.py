@@ -1,15 +1,146 @@
-from django.db import models
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.db import models, transaction
+from django.db.models import Max, Q
+
+# Шаг между порядковыми номерами соседних модулей: модуль перемещается в середину промежутка между соседями, поэтому
+# перемещение изменяет только одну строку, пока промежуток не исчерпан
+POSITION_STEP = 1024
+
+
+class ModuleQuerySet(models.QuerySet):
+
+    def with_owner(self, fields, owner_fields):
+        """Метод подгружает владельца модуля тем же запросом (JOIN) и ограничивает выборку переданными полями модуля
+        и владельца, чтобы сериализация списка не порождала отдельный запрос на каждого владельца."""
+
+        return self.select_related('module_user').only(
+            *fields,
+            *(f'module_user__{field}' for field in owner_fields)
+        )
+
+    def lock_owners(self, owner_ids):
+        """Метод блокирует строки владельцев до конца транзакции. Строки блокируются в порядке первичного ключа,
+        чтобы одновременные транзакции с пересекающимися владельцами не взаимоблокировались."""
+
+        owner_model = self.model._meta.get_field('module_user').related_model
+        list(
+            owner_model.objects.select_for_update().filter(pk__in=owner_ids).order_by('pk').values_list('pk', flat=True)
+        )
+
+    def next_positions(self, owner_ids):
+        """Метод возвращает словарь с порядковым номером, следующим за последним модулем каждого владельца. Номера
+        для всех владельцев вычисляются одним запросом после блокировки владельцев (lock_owners), поэтому метод
+        вызывается внутри транзакции, в которой модули и вставляются: одновременные вставки модулей одного владельца
+        выполняются по очереди и не получают одинаковые номера."""
+
+        self.lock_owners(owner_ids)
+        last_positions = dict(
+            self.filter(module_user_id__in=owner_ids).order_by().values('module_user_id').annotate(
+                last_position=Max('position')
+            ).values_list('module_user_id', 'last_position')
+        )
+        return {owner_id: last_positions.get(owner_id, 0) + POSITION_STEP for owner_id in owner_ids}
 
 
 # Create your models here.
 class Module(models.Model):
     title = models.CharField(max_length=30, verbose_name='Название')
     description = models.TextField(verbose_name='Описание')
-    module_user = models.ForeignKey('users.User', on_delete=models.CASCADE, verbose_name='создатель модуля')
+    # Отдельный индекс по внешнему ключу не нужен: его заменяет составной индекс (module_user, id)
+    module_user = models.ForeignKey(
+        'users.User',
+        on_delete=models.CASCADE,
+        db_index=False,
+        verbose_name='создатель модуля'
+    )
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='дата создания')
+    updated_at = models.DateTimeField(auto_now=True, db_index=True, verbose_name='дата изменения')
+    # Заполняется триггером базы данных из полей <title> и <description> (конфигурация russian)
+    search_vector = SearchVectorField(null=True, editable=False, verbose_name='поисковый вектор')
+    # Порядок модулей внутри владельца; номера идут с промежутками (см. modules.positions)
+    position = models.BigIntegerField(editable=False, verbose_name='порядковый номер')
+
+    objects = ModuleQuerySet.as_manager()
 
     def __str__(self):
         return f'{self.title}'
 
+    def save(self, *args, **kwargs):
+        if self.position is not None:
+            return super().save(*args, **kwargs)
+        # Новый модуль добавляется в конец последовательности модулей владельца: номер вычисляется и модуль
+        # вставляется в одной транзакции, пока строка владельца заблокирована
+        with transaction.atomic():
+            self.position = Module.objects.next_positions([self.module_user_id])[self.module_user_id]
+            super().save(*args, **kwargs)
+
     class Meta:
         verbose_name = 'Модуль'
         verbose_name_plural = 'Модули'
+        indexes = [
+            # Для курсорной пагинации при сортировке по названию
+            models.Index(fields=('title', 'id'), name='module_title_id_idx'),
+            # Для списка модулей владельца и поиска модуля с проверкой владельца в условии WHERE
+            models.Index(fields=('module_user', 'id'), name='module_user_id_idx'),
+            # Для выборки модулей владельца в заданном порядке и поиска соседей при перемещении
+            models.Index(fields=('module_user', 'position'), name='module_user_position_idx'),
+            GinIndex(fields=('search_vector',), name='module_search_vector_idx'),
+            # Для подсказок по названию (операторы pg_trgm %, <% и ILIKE)
+            GinIndex(fields=('title',), opclasses=('gin_trgm_ops',), name='module_title_trgm_idx'),
+        ]
+
+
+class BannedWord(models.Model):
+    word = models.CharField(max_length=100, unique=True, verbose_name='слово')
+
+    def __str__(self):
+        return f'{self.word}'
+
+    def save(self, *args, **kwargs):
+        self.word = self.word.strip().casefold()
+        super().save(*args, **kwargs)
+
+    class Meta:
+        verbose_name = 'Запрещенное слово'
+        verbose_name_plural = 'Запрещенные слова'
+        ordering = ('word',)
+
+
+class Notification(models.Model):
+    """
+    Сообщение, ожидающее отправки. Сообщения отправляются фоновой задачей по одному через общее SMTP-соединение.
+    Сообщения для сводки (digest) не отправляются по отдельности: периодическая задача объединяет их в одно письмо
+    на каждый адрес. Сообщение, которое сервер отклонил или не смог отправить NOTIFICATIONS_MAX_ATTEMPTS раз,
+    отмечается неотправляемым (failed_at) и больше не задерживает очередь.
+    """
+
+    email = models.EmailField(verbose_name='адрес получателя')
+    subject = models.CharField(max_length=255, verbose_name='тема')
+    # Для сводки хранятся только строки, которые войдут в общее письмо
+    message = models.TextField(verbose_name='текст')
+    digest = models.BooleanField(default=False, verbose_name='для сводки')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='дата создания')
+    sent_at = models.DateTimeField(null=True, blank=True, verbose_name='дата отправки')
+    # Время, когда задача отправки забрала сообщение: другие задачи пропускают его, пока не истечет
+    # NOTIFICATIONS_CLAIM_TIMEOUT
+    claimed_at = models.DateTimeField(null=True, blank=True, verbose_name='дата захвата')
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name='количество неудачных попыток')
+    error = models.TextField(blank=True, verbose_name='последняя ошибка')
+    failed_at = models.DateTimeField(null=True, blank=True, verbose_name='дата отказа от отправки')
+
+    def __str__(self):
+        return f'{self.email}: {self.subject}'
+
+    class Meta:
+        verbose_name = 'Уведомление'
+        verbose_name_plural = 'Уведомления'
+        indexes = [
+            # Очередь неотправленных сообщений: частичный индекс остается маленьким, сколько бы сообщений ни было
+            # отправлено
+            models.Index(
+                fields=('id',),
+                condition=Q(sent_at__isnull=True, failed_at__isnull=True),
+                name='notification_pending_idx'
+            ),
+        ]
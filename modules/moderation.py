@@ -0,0 +1,104 @@
+import threading
+import uuid
+from collections import deque
+
+from django.core.cache import cache
+
+BANNED_WORDS_VERSION_KEY = 'modules:banned_words:version'
+
+
+class AhoCorasick:
+    """
+    Автомат Ахо — Корасик для поиска любого из набора слов в тексте за один проход: время поиска линейно зависит от
+    длины текста и не зависит от количества слов. Ссылки неудач разворачиваются в детерминированный автомат, поэтому
+    на каждый символ текста приходится ровно один переход. Поиск нечувствителен к регистру и находит слова в том числе
+    внутри других слов.
+    """
+
+    def __init__(self, words):
+        goto = [{}]
+        output = [None]
+        for word in words:
+            word = word.casefold()
+            if not word:
+                continue
+            state = 0
+            for char in word:
+                if char not in goto[state]:
+                    goto[state][char] = len(goto)
+                    goto.append({})
+                    output.append(None)
+                state = goto[state][char]
+            output[state] = word
+
+        # Обход в ширину: переходы состояния дополняются переходами его ссылки неудачи, а выход наследуется от нее.
+        # Переходы в корень не храним — отсутствующий символ означает возврат в начальное состояние.
+        fail = [0] * len(goto)
+        self.transitions = [dict(goto[0])] + [None] * (len(goto) - 1)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            fallback = self.transitions[fail[state]]
+            self.transitions[state] = {**fallback, **goto[state]}
+            if output[state] is None:
+                output[state] = output[fail[state]]
+            for char, next_state in goto[state].items():
+                fail[next_state] = fallback.get(char, 0) if state else 0
+                queue.append(next_state)
+
+        self.output = output
+        self.terminal_states = frozenset(state for state, word in enumerate(output) if word is not None)
+
+    def search(self, text):
+        """Метод возвращает первое найденное в тексте слово или None."""
+
+        transitions, terminal_states = self.transitions, self.terminal_states
+        if not terminal_states:
+            return None
+        state = 0
+        for char in text.casefold():
+            state = transitions[state].get(char, 0)
+            if state in terminal_states:
+                return self.output[state]
+        return None
+
+
+_lock = threading.Lock()
+_automaton = None
+_automaton_version = None
+
+
+def invalidate_banned_words():
+    """Метод сообщает всем процессам, что список запрещенных слов изменился и автомат нужно перестроить."""
+
+    cache.set(BANNED_WORDS_VERSION_KEY, uuid.uuid4().hex, None)
+
+
+def get_automaton():
+    """Метод возвращает автомат запрещенных слов, закешированный в процессе. Автомат перестраивается из базы данных,
+    только если версия списка в общем кеше отличается от версии, по которой он был построен."""
+
+    global _automaton, _automaton_version
+    from modules.models import BannedWord
+
+    version = cache.get_or_set(BANNED_WORDS_VERSION_KEY, lambda: uuid.uuid4().hex, None)
+    if _automaton is not None and _automaton_version == version:
+        return _automaton
+
+    with _lock:
+        if _automaton is None or _automaton_version != version:
+            _automaton = AhoCorasick(BannedWord.objects.values_list('word', flat=True))
+            _automaton_version = version
+    return _automaton
+
+
+def find_banned_word(*texts, automaton=None):
+    """Метод возвращает первое запрещенное слово, найденное в переданных текстах, или None."""
+
+    automaton = automaton or get_automaton()
+    for text in texts:
+        if text:
+            word = automaton.search(text)
+            if word is not None:
+                return word
+    return None
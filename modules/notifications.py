@@ -0,0 +1,216 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage
+from django.db import transaction
+from django.db.models import Case, F, Q, Value, When
+from django.utils import timezone
+
+from mailing.delivery import PERMANENT_MAIL_ERRORS, is_connection_error, open_connection
+from modules.models import Notification
+from users.models import User
+
+
+def get_creation_message(email, titles):
+    """Метод возвращает тему и текст сообщения о создании одного или нескольких модулей."""
+
+    if len(titles) == 1:
+        return (
+            'Создание модуля для обучения',
+            f'Здравствуйте, {email}!\n\n'
+            f'На портале 127.0.0.1 вы создали курс —  {titles[0]}!\n\n'
+            f'С уважением, администрация сайта!'
+        )
+    modules = '\n'.join(f'— {title}' for title in titles)
+    return (
+        'Создание модулей для обучения',
+        f'Здравствуйте, {email}!\n\n'
+        f'На портале 127.0.0.1 для вас созданы курсы:\n{modules}\n\n'
+        f'С уважением, администрация сайта!'
+    )
+
+
+def get_digest_message(email, lines):
+    """Метод возвращает тему и текст сводки о модулях, созданных с момента предыдущей сводки."""
+
+    modules = '\n'.join(f'— {line}' for line in lines)
+    return (
+        'Сводка о созданных модулях',
+        f'Здравствуйте, {email}!\n\n'
+        f'С момента прошлой сводки на портале 127.0.0.1 для вас созданы курсы:\n{modules}\n\n'
+        f'С уважением, администрация сайта!'
+    )
+
+
+def queue_creation_notifications(titles_by_user):
+    """
+    Метод ставит в очередь по одному сообщению о создании модулей на каждого пользователя. Сообщения сохраняются одним
+    запросом INSERT в текущей транзакции, а задача отправки запускается только после ее фиксации: при откате сообщения
+    не отправляются, а задача не может прочитать очередь раньше, чем в ней появятся новые записи. Для пользователей,
+    выбравших сводку, сохраняются только названия модулей, которые отправит периодическая задача.
+    """
+
+    from modules.tasks import send_queued_notifications
+
+    notifications = []
+    for user, titles in titles_by_user.items():
+        if user.notification_mode == User.NOTIFICATION_DIGEST:
+            notifications.append(
+                Notification(email=user.email, subject='', message='\n'.join(titles), digest=True)
+            )
+        else:
+            subject, message = get_creation_message(user.email, titles)
+            notifications.append(Notification(email=user.email, subject=subject, message=message))
+    Notification.objects.bulk_create(notifications)
+
+    if any(not notification.digest for notification in notifications):
+        transaction.on_commit(send_queued_notifications.delay)
+
+
+def get_claimable(queryset):
+    """Метод оставляет в выборке сообщения, которые не забрала другая задача, и сообщения, захваченные раньше чем
+    NOTIFICATIONS_CLAIM_TIMEOUT секунд назад (задача завершилась аварийно)."""
+
+    expired = timezone.now() - timedelta(seconds=settings.NOTIFICATIONS_CLAIM_TIMEOUT)
+    return queryset.filter(Q(claimed_at__isnull=True) | Q(claimed_at__lt=expired))
+
+
+def claim_notifications(queryset, limit=None):
+    """
+    Метод забирает для отправки не больше <limit> сообщений выборки и возвращает их вместе со временем захвата.
+    Строки блокируются с SKIP LOCKED только на время короткой транзакции, которая отмечает их захваченными, поэтому
+    несколько одновременно запущенных задач забирают разные сообщения, а отправка выполняется вне транзакции.
+    """
+
+    claimed_at = timezone.now()
+    queryset = get_claimable(queryset).select_for_update(skip_locked=True)
+    if limit:
+        queryset = queryset[:limit]
+    with transaction.atomic():
+        batch = list(queryset)
+        Notification.objects.filter(pk__in=[notification.pk for notification in batch]).update(claimed_at=claimed_at)
+    return batch, claimed_at
+
+
+def release_notifications(batch, claimed_at):
+    """Метод возвращает в очередь сообщения пачки, которые остались захваченными этой задачей."""
+
+    Notification.objects.filter(
+        pk__in=[notification.pk for notification in batch],
+        claimed_at=claimed_at
+    ).update(claimed_at=None)
+
+
+def deliver(connection, notifications, subject, message):
+    """
+    Метод отправляет одно письмо вместо переданных сообщений (все они адресованы одному получателю) и сразу фиксирует
+    результат. Если сервер отклонил письмо, сообщения отмечаются неотправляемыми и метод возвращает False. Ошибка
+    соединения передается дальше без изменения сообщений: они не виноваты в недоступности сервера. При остальных
+    ошибках у сообщений увеличивается счетчик попыток (после NOTIFICATIONS_MAX_ATTEMPTS попыток они тоже отмечаются
+    неотправляемыми), а ошибка передается дальше.
+    """
+
+    pks = [notification.pk for notification in notifications]
+    email = EmailMessage(
+        subject=subject,
+        body=message,
+        from_email=settings.EMAIL_HOST_USER,
+        to=[notifications[0].email],
+        connection=connection
+    )
+    try:
+        connection.send_messages([email])
+    except PERMANENT_MAIL_ERRORS as exc:
+        record_failure(pks, exc, permanent=True)
+        return False
+    except Exception as exc:
+        # Любая SMTPException наследует OSError, поэтому ошибка соединения определяется is_connection_error
+        if not is_connection_error(exc):
+            record_failure(pks, exc)
+        raise
+    Notification.objects.filter(pk__in=pks).update(sent_at=timezone.now(), claimed_at=None)
+    return True
+
+
+def record_failure(pks, exc, permanent=False):
+    """Метод сохраняет ошибку отправки сообщений и отмечает неотправляемыми те, которые не стоит отправлять снова."""
+
+    now = timezone.now()
+    if permanent:
+        failed_at = Value(now)
+    else:
+        failed_at = Case(When(attempts__gte=settings.NOTIFICATIONS_MAX_ATTEMPTS - 1, then=Value(now)), default=None)
+    Notification.objects.filter(pk__in=pks).update(
+        attempts=F('attempts') + 1,
+        error=repr(exc),
+        failed_at=failed_at,
+        claimed_at=None
+    )
+
+
+def send_queued_notifications(batch_size=None):
+    """
+    Метод отправляет неотправленные сообщения через одно SMTP-соединение и возвращает количество отправленных.
+    Сообщения забираются пачками по <batch_size> штук и отправляются по одному: отметка об отправке фиксируется сразу,
+    поэтому после ошибки соединения повторная задача не отправляет доставленные сообщения заново, а сообщение с
+    отклоненным адресом не задерживает остальные.
+    """
+
+    batch_size = batch_size or settings.NOTIFICATIONS_BATCH_SIZE
+    pending = Notification.objects.filter(sent_at__isnull=True, failed_at__isnull=True, digest=False).order_by('id')
+    sent = 0
+    with open_connection() as connection:
+        while True:
+            batch, claimed_at = claim_notifications(pending, batch_size)
+            if not batch:
+                return sent
+            try:
+                for notification in batch:
+                    if deliver(connection, [notification], notification.subject, notification.message):
+                        sent += 1
+            finally:
+                release_notifications(batch, claimed_at)
+
+
+def purge_notifications(retention_days=None):
+    """Метод удаляет отправленные и неотправляемые сообщения старше <retention_days> дней и возвращает количество
+    удаленных сообщений."""
+
+    retention_days = retention_days or settings.NOTIFICATIONS_RETENTION_DAYS
+    threshold = timezone.now() - timedelta(days=retention_days)
+    deleted, _ = Notification.objects.filter(Q(sent_at__lt=threshold) | Q(failed_at__lt=threshold)).delete()
+    return deleted
+
+
+def send_notification_digests(batch_size=None):
+    """
+    Метод отправляет каждому адресу одно письмо со всеми накопленными для сводки сообщениями и возвращает количество
+    отправленных писем. Сообщения забираются пачками по <batch_size> адресов (см. claim_notifications), а письма
+    отправляются по одному через общее SMTP-соединение. Метод завершается, когда не остается сообщений, которые можно
+    забрать: пустая пачка означает лишь то, что выбранные адреса сейчас забирает другая задача.
+    """
+
+    batch_size = batch_size or settings.NOTIFICATIONS_BATCH_SIZE
+    pending = Notification.objects.filter(sent_at__isnull=True, failed_at__isnull=True, digest=True)
+    sent = 0
+    with open_connection() as connection:
+        while True:
+            claimable = get_claimable(pending)
+            emails = claimable.order_by('email').values('email').distinct()[:batch_size]
+            batch, claimed_at = claim_notifications(pending.filter(email__in=emails).order_by('email', 'id'))
+            if not batch:
+                if not claimable.exists():
+                    return sent
+                continue
+
+            notifications_by_email = defaultdict(list)
+            for notification in batch:
+                notifications_by_email[notification.email].append(notification)
+            try:
+                for email, notifications in notifications_by_email.items():
+                    lines = [line for notification in notifications for line in notification.message.splitlines()]
+                    if deliver(connection, notifications, *get_digest_message(email, lines)):
+                        sent += 1
+            finally:
+                release_notifications(batch, claimed_at)
@@ -0,0 +1,108 @@
+import json
+
+from django.db import connections
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
+
+
+def get_estimated_count(queryset):
+    """Метод возвращает оценку количества строк в queryset по данным планировщика PostgreSQL без выполнения
+    SELECT COUNT(*). Для других СУБД выполняется точный подсчет."""
+
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return queryset.count()
+
+    # Оценивается только выборка первичных ключей: queryset списка модулей присоединяет владельца (select_related),
+    # и без values('pk') в план попало бы соединение, которое не влияет на количество строк, но меняет оценку
+    sql, params = queryset.order_by().values('pk').query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class EstimatedCountCursorPagination(CursorPagination):
+    """
+    Курсорная (keyset) пагинация: страница выбирается по условию WHERE на поле сортировки, а не через OFFSET, поэтому
+    глубокие страницы стоят столько же, сколько первая. Дополнительно в ответ может добавляться количество записей:
+    - exact — точный SELECT COUNT(*);
+    - estimate — оценка планировщика PostgreSQL (для небольших выборок выполняется точный подсчет);
+    - none — количество не считается.
+    Режим по умолчанию задается атрибутом <count_mode>, клиент может переопределить его параметром запроса <count>.
+    """
+
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = 'id'
+
+    count_query_param = 'count'
+    count_modes = ('exact', 'estimate', 'none')
+    count_mode = 'none'
+    # Ниже этого порога оценка планировщика заменяется точным подсчетом, который на малых выборках дешев
+    exact_count_threshold = 1000
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count, self.count_mode_used = self.get_count(queryset, self.get_count_mode(request))
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_ordering(self, request, queryset, view):
+        """Метод дополняет сортировку первичным ключом, чтобы порядок записей с одинаковым значением поля
+        сортировки был детерминированным."""
+
+        ordering = super().get_ordering(request, queryset, view)
+        if ordering[0].lstrip('-') in ('id', 'pk'):
+            return ordering
+        tie_breaker = '-id' if ordering[0].startswith('-') else 'id'
+        return (*ordering, tie_breaker)
+
+    def get_count_mode(self, request):
+        count_mode = request.query_params.get(self.count_query_param, self.count_mode)
+        if count_mode not in self.count_modes:
+            return self.count_mode
+        return count_mode
+
+    def get_count(self, queryset, count_mode):
+        """Метод возвращает количество записей и режим, которым оно фактически получено."""
+
+        if count_mode == 'estimate':
+            estimated_count = get_estimated_count(queryset)
+            if estimated_count >= self.exact_count_threshold:
+                return estimated_count, 'estimate'
+            count_mode = 'exact'
+        if count_mode == 'exact':
+            return queryset.count(), 'exact'
+        return None, None
+
+    def get_paginated_response(self, data):
+        response_data = {
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        }
+        if self.count is not None:
+            response_data['count'] = self.count
+            response_data['count_mode'] = self.count_mode_used
+        return Response(response_data)
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema['properties']['count'] = {
+            'type': 'integer',
+            'nullable': True,
+        }
+        response_schema['properties']['count_mode'] = {
+            'type': 'string',
+            'enum': list(self.count_modes),
+            'nullable': True,
+        }
+        return response_schema
+
+
+class ModuleCursorPagination(EstimatedCountCursorPagination):
+    """Пагинация списка объектов модели Module: курсор по <id> и оценка количества записей по умолчанию."""
+
+    count_mode = 'estimate'
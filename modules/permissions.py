@@ -13,13 +13,24 @@ class IsAuthenticatedAndIsOwner(BasePermission):
         return False
 
     def has_object_permission(self, request, view, obj):
+        # Владелец сравнивается по внешнему ключу, чтобы не загружать связанного пользователя
+        is_owner = obj.module_user_id == request.user.pk
         if request.method in SAFE_METHODS:
-            if request.user == obj.module_user:
+            if is_owner:
                 return True
         elif request.method in ('PATCH', 'PUT', 'POST'):
-            return request.user == obj.module_user
+            return is_owner
         elif request.method == 'DELETE':
             if not request.user.is_authenticated:
                 return False
-            return request.user == obj.module_user or request.user.is_superuser
+            return is_owner or request.user.is_superuser
         return False
+
+    @staticmethod
+    def filter_permitted(request, queryset):
+        """Метод применяет правила has_object_permission ко всей выборке условием WHERE: изменять можно только свои
+        объекты, удалять — свои объекты или любые, если пользователь является суперпользователем."""
+
+        if request.method == 'DELETE' and request.user.is_superuser:
+            return queryset
+        return queryset.filter(module_user_id=request.user.pk)
@@ -0,0 +1,123 @@
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from modules.cache import batch_invalidation, invalidate_modules
+from modules.models import POSITION_STEP, Module
+
+# Если после перемещения промежуток до соседа стал меньше этого значения, нумерация владельца выравнивается в фоне,
+# чтобы следующие перемещения в это место снова изменяли одну строку
+POSITION_MIN_GAP = 16
+
+RENUMBER_SQL = f'''
+    UPDATE {Module._meta.db_table} AS module
+    SET position = numbered.row_number * %(step)s, updated_at = %(now)s
+    FROM (
+        SELECT id, row_number() OVER (ORDER BY position, id) AS row_number
+        FROM {Module._meta.db_table}
+        WHERE module_user_id = %(owner_id)s
+    ) AS numbered
+    WHERE module.id = numbered.id AND module.position <> numbered.row_number * %(step)s
+    RETURNING module.id
+'''
+
+
+def lock_owner(owner_id):
+    """Метод блокирует строку владельца до конца транзакции: перемещения модулей одного владельца выполняются
+    последовательно и не могут занять один и тот же промежуток."""
+
+    Module.objects.lock_owners([owner_id])
+
+
+def renumber_positions(owner_id):
+    """Метод восстанавливает равные промежутки между порядковыми номерами модулей владельца одним запросом UPDATE,
+    сохраняя их порядок. Изменяются только строки, номер которых отличается от нового."""
+
+    with transaction.atomic():
+        lock_owner(owner_id)
+        with connection.cursor() as cursor:
+            cursor.execute(RENUMBER_SQL, {'step': POSITION_STEP, 'now': timezone.now(), 'owner_id': owner_id})
+            renumbered_ids = [row[0] for row in cursor.fetchall()]
+
+        # Запрос UPDATE не отправляет сигналы post_save, поэтому кеш сбрасывается явно
+        if renumbered_ids:
+            invalidate_modules(renumbered_ids)
+    return len(renumbered_ids)
+
+
+def get_gap(module, target, after):
+    """Метод возвращает границы промежутка, в который нужно поместить модуль, чтобы он оказался сразу после
+    (или перед) модулем <target>. Сам перемещаемый модуль соседом не считается."""
+
+    siblings = Module.objects.filter(module_user_id=target.module_user_id).exclude(pk=module.pk)
+    if after:
+        neighbour = siblings.filter(
+            Q(position__gt=target.position) | Q(position=target.position, pk__gt=target.pk)
+        ).order_by('position', 'pk').values_list('position', flat=True).first()
+        return target.position, neighbour if neighbour is not None else target.position + 2 * POSITION_STEP
+
+    neighbour = siblings.filter(
+        Q(position__lt=target.position) | Q(position=target.position, pk__lt=target.pk)
+    ).order_by('-position', '-pk').values_list('position', flat=True).first()
+    return neighbour if neighbour is not None else target.position - 2 * POSITION_STEP, target.position
+
+
+def move_module(module, target_id, after=True):
+    """
+    Метод перемещает модуль сразу после (или перед) другим модулем того же владельца. Модуль получает номер из
+    середины промежутка между соседями, поэтому изменяется только его строка. Если промежуток исчерпан, нумерация
+    владельца выравнивается сразу; если он стал слишком мал, выравнивание запускается фоновой задачей. Если модуля
+    <target_id> нет среди других модулей владельца, возбуждается исключение Module.DoesNotExist.
+    """
+
+    from modules.tasks import renumber_module_positions
+
+    owner_id = module.module_user_id
+    with transaction.atomic(), batch_invalidation():
+        lock_owner(owner_id)
+        target = Module.objects.exclude(pk=module.pk).only('pk', 'module_user', 'position').get(
+            pk=target_id,
+            module_user_id=owner_id
+        )
+        lower, upper = get_gap(module, target, after)
+        if upper - lower < 2:
+            renumber_positions(owner_id)
+            target.refresh_from_db(fields=('position',))
+            lower, upper = get_gap(module, target, after)
+
+        module.position = lower + (upper - lower) // 2
+        module.save(update_fields=('position', 'updated_at'))
+
+        if min(module.position - lower, upper - module.position) < POSITION_MIN_GAP:
+            transaction.on_commit(lambda: renumber_module_positions.delay(owner_id))
+    return module
+
+
+def reorder_modules(owner_id, ids):
+    """Метод расставляет модули владельца в порядке <ids>, используя номера, которые эти модули уже занимают.
+    Остальные модули владельца не изменяются. Возвращает идентификаторы модулей, номер которых изменился."""
+
+    with transaction.atomic(), batch_invalidation():
+        lock_owner(owner_id)
+        modules = Module.objects.filter(module_user_id=owner_id, pk__in=ids).only('pk', 'position')
+        positions = sorted(module.position for module in modules)
+        if len(set(positions)) < len(positions):
+            # Одинаковые номера (например, после одновременного создания модулей) делают порядок неоднозначным
+            renumber_positions(owner_id)
+            modules = modules.all()
+            positions = sorted(module.position for module in modules)
+
+        modules_by_id = {module.pk: module for module in modules}
+        now = timezone.now()
+        reordered = []
+        for pk, position in zip((pk for pk in dict.fromkeys(ids) if pk in modules_by_id), positions):
+            module = modules_by_id[pk]
+            if module.position != position:
+                module.position, module.updated_at = position, now
+                reordered.append(module)
+        Module.objects.bulk_update(reordered, ('position', 'updated_at'))
+
+        # Метод bulk_update() не отправляет сигналы post_save, поэтому кеш сбрасывается явно
+        if reordered:
+            invalidate_modules(module.pk for module in reordered)
+    return [module.pk for module in reordered]
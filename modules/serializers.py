@@ -1,6 +1,10 @@
+from django.conf import settings
+from django.db import transaction
 from rest_framework import serializers
 
-from modules.models import Module
+from config.fieldsets import SparseFieldsetSerializerMixin
+from modules.models import POSITION_STEP, Module
+from modules.moderation import get_automaton
 from modules.validators import TitleValidation
 from users.models import User
 from users.serializers import UserListSerializer
@@ -12,13 +16,107 @@ class ModuleCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Module
         fields = ('id', 'title', 'description', 'module_user')
-        validators = [TitleValidation(field='title')]
+        validators = [TitleValidation()]
 
 
-class ModuleSerializer(serializers.ModelSerializer):
+class ModuleSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     module_user = UserListSerializer(read_only=True)
 
+    class Meta:
+        model = Module
+        fields = ('id', 'title', 'description', 'module_user', 'position', 'created_at', 'updated_at')
+        validators = [TitleValidation()]
+
+
+class ModuleBulkCreateListSerializer(serializers.ListSerializer):
+    """
+    Для пакетного создания объектов модели Module: владельцы всех модулей выбираются одним запросом, модули
+    вставляются одним многострочным INSERT. Владельцем модулей пользователя, который не является сотрудником, всегда
+    становится он сам; сотрудник может указать владельца (по умолчанию — он сам). Запрещенные слова проверяются одним
+    автоматом для всего пакета.
+    """
+
+    def to_internal_value(self, data):
+        # Ошибки из validate() DRF оборачивает в non_field_errors, а ошибки здесь возвращаются списком по модулям
+        attrs = super().to_internal_value(data)
+        request_user = self.context['request'].user
+        if request_user.is_staff:
+            emails = {item['module_user'] for item in attrs if 'module_user' in item}
+            users = User.objects.filter(email__in=emails).in_bulk(field_name='email')
+        else:
+            users = {}
+
+        automaton = get_automaton()
+        title_validation = TitleValidation()
+        errors = []
+        for item in attrs:
+            item_errors = title_validation.get_errors(item, automaton=automaton)
+            email = item.get('module_user') if request_user.is_staff else None
+            if email is None:
+                item['module_user'] = request_user
+            elif email in users:
+                item['module_user'] = users[email]
+            else:
+                item_errors['module_user'] = [f'Пользователь {email} не существует.']
+            errors.append(item_errors)
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return attrs
+
+    def create(self, validated_data):
+        # Новые модули добавляются в конец последовательности модулей своего владельца в порядке запроса. Владельцы
+        # блокируются в next_positions до вставки, поэтому номера вычисляются в той же транзакции
+        with transaction.atomic():
+            positions = Module.objects.next_positions({item['module_user'].pk for item in validated_data})
+            modules = []
+            for item in validated_data:
+                owner_id = item['module_user'].pk
+                modules.append(Module(**item, position=positions[owner_id]))
+                positions[owner_id] += POSITION_STEP
+            return Module.objects.bulk_create(modules)
+
+
+class ModuleBulkCreateSerializer(serializers.ModelSerializer):
+    module_user = serializers.EmailField(required=False)
+
     class Meta:
         model = Module
         fields = ('id', 'title', 'description', 'module_user')
-        validators = [TitleValidation(field='title')]
+        # Запрещенные слова проверяет ModuleBulkCreateListSerializer сразу для всего пакета
+        validators = []
+        list_serializer_class = ModuleBulkCreateListSerializer
+
+
+class ModuleBulkDeleteSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(),
+        allow_empty=False,
+        max_length=settings.MODULES_BULK_MAX_SIZE
+    )
+
+
+class ModuleBulkUpdateSerializer(ModuleBulkDeleteSerializer):
+    title = serializers.CharField(max_length=30, required=False)
+    description = serializers.CharField(required=False)
+
+    def validate(self, attrs):
+        if not attrs.keys() - {'ids'}:
+            raise serializers.ValidationError('Не указаны поля для изменения')
+        TitleValidation()(attrs)
+        return attrs
+
+
+class ModuleReorderSerializer(serializers.Serializer):
+    """Для перемещения объекта модели Module сразу после (<after>) или перед (<before>) другим модулем владельца."""
+
+    after = serializers.IntegerField(required=False)
+    before = serializers.IntegerField(required=False)
+
+    def validate(self, attrs):
+        if len(attrs) != 1:
+            raise serializers.ValidationError('Нужно указать ровно одно из полей after или before')
+        return attrs
+
+
+class ModuleBulkReorderSerializer(ModuleBulkDeleteSerializer):
+    """Для пакетного изменения порядка объектов модели Module: <ids> перечисляются в новом порядке."""
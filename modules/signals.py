@@ -0,0 +1,38 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from modules.cache import invalidate_modules, invalidate_owner
+from modules.models import BannedWord, Module
+from modules.moderation import invalidate_banned_words
+from users.models import User
+from users.serializers import UserListSerializer
+
+
+@receiver(post_save, sender=Module)
+@receiver(post_delete, sender=Module)
+def invalidate_module_cache(sender, instance, **kwargs):
+    """Сбрасывает кеш списка модулей и детальной информации об измененном модуле после фиксации транзакции."""
+
+    invalidate_modules([instance.pk])
+
+
+@receiver(post_save, sender=User)
+def invalidate_owner_modules_cache(sender, instance, created, update_fields=None, **kwargs):
+    """Сбрасывает кеш модулей пользователя после фиксации транзакции, если изменились поля, которые выводятся вместе
+    с модулем."""
+
+    if created:
+        return
+    if update_fields is not None and not set(update_fields) & set(UserListSerializer.Meta.fields):
+        return
+    owner_id = instance.pk
+    transaction.on_commit(lambda: invalidate_owner(owner_id))
+
+
+@receiver(post_save, sender=BannedWord)
+@receiver(post_delete, sender=BannedWord)
+def rebuild_banned_words(sender, **kwargs):
+    """Сообщает процессам, что автомат запрещенных слов нужно перестроить."""
+
+    invalidate_banned_words()
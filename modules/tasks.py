@@ -1,19 +1,33 @@
 from celery import shared_task
-from django.core.mail import send_mail
 
-from config import settings
+from mailing.delivery import MailTask
+from modules import notifications
+from modules.positions import renumber_positions
+
+
+@shared_task(base=MailTask)
+def send_queued_notifications():
+    """Метод отправляет накопленные сообщения по одному через общее SMTP-соединение."""
+
+    return notifications.send_queued_notifications()
+
+
+@shared_task(base=MailTask)
+def send_notification_digests():
+    """Метод отправляет каждому пользователю, выбравшему сводку, одно письмо о созданных за интервал модулях."""
+
+    return notifications.send_notification_digests()
 
 
 @shared_task
-def send_email_creation(email, module):
-    """Метод отправляет сообщение о создании модуля на указанный адрес электронной почты."""
-
-    send_mail(
-        subject='Создание модуля для обучения',
-        message=f'Здравствуйте, {email}!\n\n'
-                f'На портале 127.0.0.1 вы создали курс —  {module}!\n\n'
-                f'С уважением, администрация сайта!',
-        from_email=settings.EMAIL_HOST_USER,
-        recipient_list=[email],
-        fail_silently=False
-    )
+def purge_notifications():
+    """Метод удаляет давно отправленные и неотправляемые сообщения."""
+
+    return notifications.purge_notifications()
+
+
+@shared_task
+def renumber_module_positions(owner_id):
+    """Метод восстанавливает промежутки между порядковыми номерами модулей владельца."""
+
+    return renumber_positions(owner_id)
@@ -1,10 +1,44 @@
+import csv
+import json
+import os
+import re
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from smtplib import SMTPException, SMTPRecipientsRefused, SMTPSenderRefused, SMTPServerDisconnected
 from unittest.mock import patch
 
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.core.mail import get_connection
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
 from rest_framework import status
 
-from modules.models import Module
+from config.metrics import registry, render_metrics
+from config.sql_capture import analyze_queries, is_explainable
+from modules import tasks as modules_tasks, urls as modules_urls
+from modules.cache import compute_once, get_stats, invalidate_list
+from modules.models import POSITION_STEP, BannedWord, Module, Notification
+from modules.moderation import BANNED_WORDS_VERSION_KEY, AhoCorasick, find_banned_word, get_automaton
+from modules.notifications import claim_notifications, purge_notifications, send_notification_digests, \
+    send_queued_notifications
+from modules.pagination import get_estimated_count
+from modules.serializers import ModuleSerializer
+from modules.tasks import renumber_module_positions
+from modules.views import ModuleAsyncListAPIView
+from users.authentication import get_cached_user, invalidate_user
+from users.models import User
 from users.tests import UserModelTestCase
 
+SEND_MESSAGES = 'django.core.mail.backends.locmem.EmailBackend.send_messages'
+
 
 # Create your tests here.
 class ModuleAPITestCase(UserModelTestCase):
@@ -12,6 +46,9 @@ class ModuleAPITestCase(UserModelTestCase):
     def setUp(self) -> None:
         super().setUp()
 
+        # Очистка кеша ответов, оставшегося от предыдущих тестов
+        cache.clear()
+
         # Создание объекта Module для тестового пользователя
         self.module_object_1 = Module.objects.create(
             title='математика',
@@ -58,7 +95,7 @@ class ModuleCreateTestCase(ModuleAPITestCase):
         )
 
         # Отключение отложенной задачи
-        self.patcher = patch('modules.tasks.send_email_creation.delay')
+        self.patcher = patch('modules.tasks.send_queued_notifications.delay')
         self.mock_task = self.patcher.start()
 
         # POST-запрос на создание модуля
@@ -101,7 +138,7 @@ class ModuleCreateTestCase(ModuleAPITestCase):
         )
 
         # Отключение отложенной задачи
-        self.patcher = patch('modules.tasks.send_email_creation.delay')
+        self.patcher = patch('modules.tasks.send_queued_notifications.delay')
         self.mock_task = self.patcher.start()
 
         # POST-запрос на создание модуля
@@ -144,7 +181,7 @@ class ModuleCreateTestCase(ModuleAPITestCase):
         )
 
         # Отключение отложенной задачи
-        self.patcher = patch('modules.tasks.send_email_creation.delay')
+        self.patcher = patch('modules.tasks.send_queued_notifications.delay')
         self.mock_task = self.patcher.start()
 
         # POST-запрос на создание модуля
@@ -170,6 +207,252 @@ class ModuleCreateTestCase(ModuleAPITestCase):
         self.patcher.stop()
 
 
+class ModuleBulkCreateTestCase(ModuleAPITestCase):
+    """Для тестирования API-запросов на пакетное создание объектов модели Module."""
+
+    def setUp(self) -> None:
+        super().setUp()
+
+        # Получение маршрутов
+        self.bulk_create_url = '/modules/bulk/create/'
+
+        # Сырые данные для создания объектов Module двух владельцев
+        self.raw_data_list = [
+            {'title': 'Физика', 'description': 'механика', 'module_user': 'test@test.com'},
+            {'title': 'Химия', 'description': 'органика', 'module_user': 'test@test.com'},
+            {'title': 'Биология', 'description': 'ботаника', 'module_user': 'another@test.com'},
+        ]
+
+    def test_user_cannot_bulk_create_modules_without_authentication(self):
+        """Неавторизованные пользователи не могут создавать объекты модели Module пакетно."""
+
+        # POST-запрос на пакетное создание модулей
+        response = self.client.post(
+            self.bulk_create_url,
+            self.raw_data_list,
+            headers=None,
+            format='json'
+        )
+
+        # Проверка статус кода
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_401_UNAUTHORIZED
+        )
+
+    def test_user_can_bulk_create_modules_correctly(self):
+        """Сотрудник может создавать объекты модели Module пакетно для разных владельцев, каждому владельцу
+        отправляется одно сообщение."""
+
+        # Тестовый пользователь становится сотрудником
+        User.objects.filter(pk=self.user_test.pk).update(is_staff=True)
+        invalidate_user(self.user_test.pk)
+
+        # POST-запрос на пакетное создание модулей
+        response = self.client.post(
+            self.bulk_create_url,
+            self.raw_data_list,
+            headers=self.headers_user_1,
+            format='json'
+        )
+
+        # Проверка статус кода
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_201_CREATED
+        )
+
+        # Количество модулей после создания
+        self.assertEqual(
+            Module.objects.count(),
+            5
+        )
+
+        # Проверка постановки в очередь одного сообщения на каждого владельца
+        self.assertEqual(
+            sorted(Notification.objects.values_list('email', flat=True)),
+            ['another@test.com', 'test@test.com']
+        )
+        self.assertIn('— Химия', Notification.objects.get(email='test@test.com').message)
+
+    def test_regular_user_bulk_creates_only_own_modules(self):
+        """Владельцем модулей, созданных пользователем, который не является сотрудником, всегда становится он сам,
+        а запрещенные слова проверяются одним обращением к кешу на весь пакет."""
+
+        with patch('modules.moderation.cache.get_or_set', wraps=cache.get_or_set) as mock_version:
+            response = self.client.post(
+                self.bulk_create_url,
+                self.raw_data_list,
+                headers=self.headers_user_1,
+                format='json'
+            )
+
+        # Проверка статус кода
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_201_CREATED
+        )
+
+        # Проверка владельца всех созданных модулей и проверки версии списка слов
+        self.assertEqual(
+            [module['module_user'] for module in response.json()],
+            ['test@test.com'] * 3
+        )
+        self.assertFalse(Module.objects.filter(title='Биология', module_user=self.user_2).exists())
+        self.assertEqual(
+            len([call for call in mock_version.call_args_list if call.args[0] == BANNED_WORDS_VERSION_KEY]),
+            1
+        )
+
+    def test_user_cannot_bulk_create_modules_with_incorrect_data(self):
+        """Если хотя бы один модуль некорректен, пакет не создается, а ошибки возвращаются для каждого модуля."""
+
+        # Добавление модуля с запрещенным словом и модуля несуществующего пользователя
+        self.raw_data_list.append({'title': 'казино', 'description': 'описание', 'module_user': 'test@test.com'})
+        self.raw_data_list.append({'title': 'Алгебра', 'description': 'описание', 'module_user': 'no@test.com'})
+
+        # POST-запрос на пакетное создание модулей
+        response = self.client.post(
+            self.bulk_create_url,
+            self.raw_data_list,
+            headers=self.headers_user_1,
+            format='json'
+        )
+
+        # Проверка статус кода
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_400_BAD_REQUEST
+        )
+
+        # Проверка ошибок для каждого модуля
+        self.assertEqual(
+            response.json()[3],
+            {'banned_words': ['Нельзя публиковать запрещенные материалы']}
+        )
+
+        # Количество модулей и сообщений после запроса
+        self.assertEqual(
+            Module.objects.count(),
+            2
+        )
+        self.assertFalse(Notification.objects.exists())
+
+
+class ModuleBulkUpdateDeleteTestCase(ModuleAPITestCase):
+    """Для тестирования API-запросов на пакетное изменение и удаление объектов модели Module."""
+
+    def setUp(self) -> None:
+        super().setUp()
+
+        # Получение маршрутов
+        self.bulk_update_url = '/modules/bulk/update/'
+        self.bulk_delete_url = '/modules/bulk/delete/'
+
+        # Идентификаторы своего, чужого и несуществующего модуля тестового пользователя
+        self.ids = [self.module_object_1.pk, self.module_object_2.pk, 0]
+
+    def test_user_can_bulk_update_only_own_modules(self):
+        """Пакетно изменяются только модули пользователя, результат возвращается для каждого идентификатора."""
+
+        # PATCH-запрос на пакетное изменение модулей
+        response = self.client.patch(
+            self.bulk_update_url,
+            {'ids': self.ids, 'title': 'Астрономия'},
+            headers=self.headers_user_1,
+            format='json'
+        )
+
+        # Проверка статус кода
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_200_OK
+        )
+
+        # Проверка результата для каждого идентификатора
+        self.assertEqual(
+            response.json().get('results'),
+            [
+                {'id': self.module_object_1.pk, 'status': 'updated'},
+                {'id': self.module_object_2.pk, 'status': 'forbidden'},
+                {'id': 0, 'status': 'not_found'},
+            ]
+        )
+
+        # Проверка изменения только своего модуля
+        self.assertEqual(
+            list(Module.objects.order_by('pk').values_list('title', flat=True)),
+            ['Астрономия', 'русский язык']
+        )
+
+    def test_user_cannot_bulk_update_modules_with_banned_word(self):
+        """Пакетное изменение с запрещенными словами отклоняется."""
+
+        # PATCH-запрос на пакетное изменение модулей
+        response = self.client.patch(
+            self.bulk_update_url,
+            {'ids': self.ids, 'title': 'казино'},
+            headers=self.headers_user_1,
+            format='json'
+        )
+
+        # Проверка статус кода
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_400_BAD_REQUEST
+        )
+
+    def test_user_can_bulk_delete_only_own_modules(self):
+        """Пакетно удаляются только модули пользователя."""
+
+        # DELETE-запрос на пакетное удаление модулей
+        response = self.client.delete(
+            self.bulk_delete_url,
+            {'ids': self.ids},
+            headers=self.headers_user_1,
+            format='json'
+        )
+
+        # Проверка результата для каждого идентификатора
+        self.assertEqual(
+            [obj.get('status') for obj in response.json().get('results')],
+            ['deleted', 'forbidden', 'not_found']
+        )
+
+        # Количество модулей после удаления
+        self.assertEqual(
+            Module.objects.count(),
+            1
+        )
+
+    def test_superuser_can_bulk_delete_any_modules(self):
+        """Суперпользователь может пакетно удалять любые модули."""
+
+        # Назначение тестового пользователя суперпользователем
+        self.user_test.is_superuser = True
+        self.user_test.save()
+
+        # DELETE-запрос на пакетное удаление модулей
+        response = self.client.delete(
+            self.bulk_delete_url,
+            {'ids': self.ids},
+            headers=self.headers_user_1,
+            format='json'
+        )
+
+        # Проверка результата для каждого идентификатора
+        self.assertEqual(
+            [obj.get('status') for obj in response.json().get('results')],
+            ['deleted', 'deleted', 'not_found']
+        )
+
+        # Количество модулей после удаления
+        self.assertEqual(
+            Module.objects.count(),
+            0
+        )
+
+
 class ModuleGetTestCase(ModuleAPITestCase):
     """Для тестирования API-запросов на получение объектов модели Module."""
     def setUp(self) -> None:
@@ -196,7 +479,7 @@ class ModuleGetTestCase(ModuleAPITestCase):
 
         # Проверка количества объектов в содержании ответа
         self.assertTrue(
-            len(response.json()) == 2
+            len(response.json().get('results')) == 2
         )
 
         # Проверка количества объектов в базе данных
@@ -204,6 +487,105 @@ class ModuleGetTestCase(ModuleAPITestCase):
             Module.objects.count() == 2
         )
 
+    def test_user_can_get_modules_by_cursor_pages(self):
+        """Список объектов модели Module отдается постранично, переход между страницами выполняется по курсору."""
+
+        # GET-запрос на получение первой страницы
+        response_page_1 = self.client.get(
+            self.get_url,
+            {'page_size': 1},
+            headers=self.headers_user_1,
+            format='json'
+        )
+
+        # Проверка содержимого первой страницы
+        self.assertEqual(
+            [obj.get('id') for obj in response_page_1.json().get('results')],
+            [self.module_object_1.pk]
+        )
+        self.assertIsNone(
+            response_page_1.json().get('previous')
+        )
+
+        # GET-запрос на получение второй страницы по ссылке из ответа
+        response_page_2 = self.client.get(
+            response_page_1.json().get('next'),
+            headers=self.headers_user_1,
+            format='json'
+        )
+
+        # Проверка содержимого второй страницы
+        self.assertEqual(
+            [obj.get('id') for obj in response_page_2.json().get('results')],
+            [self.module_object_2.pk]
+        )
+        self.assertIsNone(
+            response_page_2.json().get('next')
+        )
+
+    def test_user_can_get_modules_ordered_by_title(self):
+        """Курсорная пагинация поддерживает сортировку по полю <title>."""
+
+        # GET-запрос на получение модулей в обратном алфавитном порядке
+        response = self.client.get(
+            self.get_url,
+            {'ordering': '-title'},
+            headers=self.headers_user_1,
+            format='json'
+        )
+
+        # Проверка порядка объектов
+        self.assertEqual(
+            [obj.get('title') for obj in response.json().get('results')],
+            ['русский язык', 'математика']
+        )
+
+    def test_user_can_choose_count_mode(self):
+        """Количество объектов по умолчанию оценивается планировщиком (на малых таблицах считается точно), клиент
+        может отключить подсчет."""
+
+        # GET-запрос с режимом подсчета по умолчанию
+        response_default = self.client.get(
+            self.get_url,
+            headers=self.headers_user_1,
+            format='json'
+        )
+
+        # Проверка количества объектов
+        self.assertEqual(
+            (response_default.json().get('count'), response_default.json().get('count_mode')),
+            (2, 'exact')
+        )
+
+        # GET-запрос без подсчета количества объектов
+        response_without_count = self.client.get(
+            self.get_url,
+            {'count': 'none'},
+            headers=self.headers_user_1,
+            format='json'
+        )
+
+        # Проверка отсутствия количества объектов в ответе
+        self.assertNotIn(
+            'count',
+            response_without_count.json()
+        )
+
+    def test_estimated_count_uses_planner(self):
+        """Оценка количества объектов берется из плана запроса без выполнения SELECT COUNT(*)."""
+
+        with CaptureQueriesContext(connection) as context:
+            estimated_count = get_estimated_count(Module.objects.all())
+
+        # Проверка выполненного запроса
+        self.assertTrue(
+            context.captured_queries[0]['sql'].startswith('EXPLAIN')
+        )
+        self.assertIsInstance(
+            estimated_count,
+            int
+        )
+
     def test_user_cannot_get_modules_without_authentication(self):
         """Неавторизованные пользователи не могут получать информацию об объектах модели Module."""
 
@@ -489,3 +871,1811 @@ class ModuleDeleteTestCase(ModuleAPITestCase):
         self.assertTrue(
             Module.objects.count() == 1
         )
+
+
+class QueryBudgetTestMixin:
+    """Для проверки того, что запрос к эндпоинту укладывается в заявленный бюджет SQL-запросов."""
+
+    def assertQueryBudget(self, budget, func, *args, **kwargs):
+        """Метод выполняет <func> и завершает тест ошибкой, если количество SQL-запросов превысило <budget>."""
+
+        with CaptureQueriesContext(connection) as context:
+            response = func(*args, **kwargs)
+            # Потоковый ответ выполняет запросы при чтении, поэтому читается целиком внутри замера
+            if getattr(response, 'streaming', False):
+                b''.join(response.streaming_content)
+        queries = '\n'.join(query['sql'] for query in context.captured_queries)
+        self.assertLessEqual(
+            len(context),
+            budget,
+            msg=f'Превышен бюджет SQL-запросов ({len(context)} > {budget}):\n{queries}'
+        )
+        return response
+
+
+class ModuleQueryBudgetTestCase(QueryBudgetTestMixin, ModuleAPITestCase):
+    """Для контроля количества SQL-запросов эндпоинтов модуля modules. Бюджет объявляется для каждого маршрута и не
+    должен зависеть от количества объектов и их владельцев."""
+
+    # Бюджет SQL-запросов для каждого маршрута приложения modules
+    query_budgets = {
+        'create_module': 8,
+        'bulk_create_module': 6,
+        'list_module': 5,
+        'my_list_module': 3,
+        'export_module': 1,
+        'async_list_module': 1,
+        'async_detail_module': 1,
+        'autocomplete_module': 1,
+        'detail_module': 1,
+        'update_module': 2,
+        'delete_module': 2,
+        'bulk_update_module': 5,
+        'bulk_delete_module': 6,
+        'reorder_module': 7,
+        'bulk_reorder_module': 7,
+    }
+
+    def setUp(self) -> None:
+        super().setUp()
+
+        # Создание модулей разных владельцев, чтобы запрос на каждого владельца увеличил количество SQL-запросов
+        for number in range(10):
+            owner = User.objects.create(email=f'owner_{number}@test.com')
+            Module.objects.create(
+                title=f'модуль {number}',
+                description='описание',
+                module_user=owner
+            )
+
+        # Второй модуль тестового пользователя для перемещения
+        self.module_object_3 = Module.objects.create(
+            title='физика',
+            description='работа с формулами',
+            module_user=self.user_test
+        )
+
+        # Построение автомата запрещенных слов и загрузка пользователя для аутентификации, которые в рабочем режиме
+        # закешированы в процессе
+        get_automaton()
+        get_cached_user(self.user_test.pk)
+
+    def test_every_route_has_query_budget(self):
+        """Для каждого маршрута приложения modules объявлен бюджет SQL-запросов."""
+
+        self.assertEqual(
+            {pattern.name for pattern in modules_urls.urlpatterns},
+            set(self.query_budgets)
+        )
+
+    def test_routes_fit_query_budget(self):
+        """Запросы к маршрутам приложения modules укладываются в бюджет SQL-запросов."""
+
+        requests = {
+            'create_module': (self.client.post, {}, {'title': 'Data science', **self.raw_data}),
+            'bulk_create_module': (self.client.post, {}, [
+                {'title': f'модуль {number}', 'description': 'описание', 'module_user': f'owner_{number}@test.com'}
+                for number in range(10)
+            ]),
+            'list_module': (self.client.get, {}, None),
+            'my_list_module': (self.client.get, {}, None),
+            'export_module': (self.client.get, {}, {'export_format': 'csv'}),
+            'async_list_module': (self.client.get, {}, None),
+            'async_detail_module': (self.client.get, {'pk': self.module_object_1.pk}, None),
+            'autocomplete_module': (self.client.get, {}, {'q': 'модуль'}),
+            'detail_module': (self.client.get, {'pk': self.module_object_1.pk}, None),
+            'update_module': (self.client.patch, {'pk': self.module_object_1.pk}, {'title': 'Астрономия'}),
+            'reorder_module': (self.client.post, {'pk': self.module_object_1.pk}, {'before': self.module_object_3.pk}),
+            'bulk_reorder_module': (self.client.post, {}, {
+                'ids': [self.module_object_3.pk, self.module_object_1.pk, self.module_object_2.pk]
+            }),
+            'delete_module': (self.client.delete, {'pk': self.module_object_1.pk}, None),
+            'bulk_update_module': (self.client.patch, {}, {
+                'ids': list(Module.objects.values_list('pk', flat=True)), 'description': 'новое описание'
+            }),
+            'bulk_delete_module': (self.client.delete, {}, {
+                'ids': list(Module.objects.values_list('pk', flat=True))
+            }),
+        }
+
+        with patch('modules.tasks.send_queued_notifications.delay'):
+            for name, (method, kwargs, data) in requests.items():
+                with self.subTest(route=name):
+                    response = self.assertQueryBudget(
+                        self.query_budgets[name],
+                        method,
+                        reverse(f'modules:{name}', kwargs=kwargs),
+                        data,
+                        headers=self.headers_user_1,
+                        format='json'
+                    )
+
+                    # Проверка успешного выполнения запроса
+                    self.assertLess(
+                        response.status_code,
+                        status.HTTP_400_BAD_REQUEST
+                    )
+
+
+class ModuleCacheTestCase(ModuleAPITestCase):
+    """Для тестирования кеширования ответов на получение объектов модели Module."""
+
+    def setUp(self) -> None:
+        super().setUp()
+
+        # Получение маршрутов
+        self.get_url = '/modules/'
+        self.get_detail_url = f'/modules/{self.module_object_1.pk}/'
+
+    def test_repeated_list_request_is_served_from_cache(self):
+        """Повторный запрос списка отдается из кеша без обращения к таблице модулей."""
+
+        # Первый GET-запрос заполняет кеш
+        response_miss = self.client.get(self.get_url, headers=self.headers_user_1)
+
+        # Повторный GET-запрос не обращается к базе данных: пользователь для аутентификации тоже берется из кеша
+        with self.assertNumQueries(0):
+            response_hit = self.client.get(self.get_url, headers=self.headers_user_1)
+
+        # Проверка статусов кеша и содержимого ответов
+        self.assertEqual(
+            (response_miss['X-Cache'], response_hit['X-Cache']),
+            ('MISS', 'HIT')
+        )
+        self.assertEqual(
+            response_miss.json(),
+            response_hit.json()
+        )
+        self.assertEqual(
+            get_stats(),
+            {'hit': 1, 'miss': 1, 'coalesced': 0}
+        )
+
+    def test_compute_releases_only_own_lock(self):
+        """Процесс освобождает только свою блокировку, а ждет чужую не дольше LOCK_WAIT_TIMEOUT."""
+
+        # Блокировка, захваченная другим процессом
+        cache.set('key:lock', 42, 60)
+
+        with patch('modules.cache.LOCK_WAIT_TIMEOUT', 0):
+            value, cache_status = compute_once('key', lambda: 'значение', 60)
+
+        # Проверка вычисленного значения и чужой блокировки
+        self.assertEqual((value, cache_status), ('значение', 'MISS'))
+        self.assertEqual(cache.get('key:lock'), 42)
+
+        # Собственная блокировка освобождается после вычисления
+        cache.delete_many(['key', 'key:lock'])
+        compute_once('key', lambda: 'значение', 60)
+        self.assertIsNone(cache.get('key:lock'))
+
+    def test_cached_detail_checks_owner(self):
+        """Закешированная детальная информация о модуле доступна только владельцу."""
+
+        # GET-запрос владельца заполняет кеш
+        self.client.get(self.get_detail_url, headers=self.headers_user_1)
+
+        # GET-запрос второго пользователя
+        response = self.client.get(self.get_detail_url, headers=self.headers_user_2)
+
+        # Проверка статус кода
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_403_FORBIDDEN
+        )
+
+    def test_module_update_invalidates_cache(self):
+        """Изменение модуля сбрасывает кеш списка и детальной информации о модуле."""
+
+        # GET-запросы заполняют кеш
+        self.client.get(self.get_url, headers=self.headers_user_1)
+        self.client.get(self.get_detail_url, headers=self.headers_user_1)
+
+        # PATCH-запрос на обновление модуля, кеш сбрасывается после фиксации транзакции
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(
+                f'/modules/update/{self.module_object_1.pk}/',
+                {'title': 'Астрономия'},
+                headers=self.headers_user_1,
+                format='json'
+            )
+
+        # Повторные GET-запросы
+        response_list = self.client.get(self.get_url, headers=self.headers_user_1)
+        response_detail = self.client.get(self.get_detail_url, headers=self.headers_user_1)
+
+        # Проверка обновленных данных
+        self.assertEqual(
+            (response_list['X-Cache'], response_detail['X-Cache']),
+            ('MISS', 'MISS')
+        )
+        self.assertEqual(
+            response_detail.json().get('title'),
+            'Астрономия'
+        )
+
+    def test_owner_profile_change_invalidates_cache(self):
+        """Изменение профиля владельца сбрасывает кеш его модулей."""
+
+        # GET-запрос заполняет кеш
+        self.client.get(self.get_detail_url, headers=self.headers_user_1)
+
+        # Изменение профиля владельца модуля
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user_test.city = 'Москва'
+            self.user_test.save()
+
+        # Повторный GET-запрос
+        response = self.client.get(self.get_detail_url, headers=self.headers_user_1)
+
+        # Проверка обновленных данных владельца
+        self.assertEqual(
+            response.json().get('module_user').get('city'),
+            'Москва'
+        )
+
+    def test_owner_profile_change_invalidates_cache_without_loading_modules(self):
+        """Изменение профиля владельца сбрасывает кеш всех его модулей одной версией, не выбирая модули из базы
+        данных."""
+
+        # GET-запрос заполняет кеш
+        self.client.get(self.get_detail_url, headers=self.headers_user_1)
+
+        # Изменение профиля владельца: запрос UPDATE без выборки модулей
+        with self.captureOnCommitCallbacks(execute=True), self.assertNumQueries(1):
+            self.user_test.city = 'Москва'
+            self.user_test.save(update_fields=('city',))
+
+        # Повторный GET-запрос
+        response = self.client.get(self.get_detail_url, headers=self.headers_user_1)
+
+        # Проверка промаха кеша
+        self.assertEqual(response['X-Cache'], 'MISS')
+
+    def test_cache_is_not_invalidated_before_commit(self):
+        """Кеш сбрасывается только после фиксации транзакции: параллельный запрос не закеширует данные, которые еще не
+        зафиксированы."""
+
+        # GET-запрос заполняет кеш
+        self.client.get(self.get_detail_url, headers=self.headers_user_1)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.module_object_1.title = 'Астрономия'
+            self.module_object_1.save()
+
+            # Проверка того, что до фиксации транзакции кеш не сброшен
+            response = self.client.get(self.get_detail_url, headers=self.headers_user_1)
+            self.assertEqual(response['X-Cache'], 'HIT')
+
+        for callback in callbacks:
+            callback()
+
+        # Проверка того, что после фиксации транзакции кеш сброшен
+        response = self.client.get(self.get_detail_url, headers=self.headers_user_1)
+        self.assertEqual(response['X-Cache'], 'MISS')
+
+    def test_bulk_delete_invalidates_cache_once(self):
+        """Пакетное удаление сбрасывает кеш одним вызовом после фиксации транзакции, а не для каждой строки."""
+
+        module_object_2 = Module.objects.create(title='Геометрия', description='Описание', module_user=self.user_test)
+
+        with patch('modules.cache.invalidate_list', wraps=invalidate_list) as mock_invalidate, \
+                self.captureOnCommitCallbacks(execute=True) as callbacks:
+            response = self.client.delete(
+                reverse('modules:bulk_delete_module'),
+                {'ids': [self.module_object_1.pk, module_object_2.pk]},
+                headers=self.headers_user_1,
+                format='json'
+            )
+
+        # Проверка статус кода и однократного сброса кеша
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_200_OK
+        )
+        self.assertEqual(len(callbacks), 1)
+        mock_invalidate.assert_called_once()
+
+
+class ModuleSearchTestCase(ModuleAPITestCase):
+    """Для тестирования полнотекстового поиска по объектам модели Module."""
+
+    def setUp(self) -> None:
+        super().setUp()
+
+        # Получение маршрутов
+        self.get_url = '/modules/'
+
+        # Создание модулей, в которых искомое слово встречается в описании и в названии
+        self.module_description_match = Module.objects.create(
+            title='геометрия',
+            description='задачи по математике для старших классов',
+            module_user=self.user_test
+        )
+        self.module_title_match = Module.objects.create(
+            title='высшая математика',
+            description='пределы и производные',
+            module_user=self.user_2
+        )
+
+    def test_user_can_search_modules_with_morphology(self):
+        """Поиск учитывает морфологию русского языка и сортирует модули по релевантности: совпадение в названии
+        важнее совпадения в описании."""
+
+        # GET-запрос на поиск модулей
+        response = self.client.get(
+            self.get_url,
+            {'search': 'математики'},
+            headers=self.headers_user_1
+        )
+
+        # Проверка найденных модулей: совпадения в названии идут раньше совпадения в описании
+        found_ids = [obj.get('id') for obj in response.json().get('results')]
+        self.assertEqual(
+            (set(found_ids[:2]), found_ids[2:]),
+            ({self.module_object_1.pk, self.module_title_match.pk}, [self.module_description_match.pk])
+        )
+
+    def test_user_can_page_through_search_results(self):
+        """Результаты поиска отдаются постранично по курсору релевантности без пропусков и повторов."""
+
+        # Получение всех страниц результатов поиска
+        found_ids = []
+        url, params = self.get_url, {'search': 'математика', 'page_size': 1}
+        while url:
+            response = self.client.get(url, params, headers=self.headers_user_1)
+            found_ids.extend(obj.get('id') for obj in response.json().get('results'))
+            url, params = response.json().get('next'), None
+
+        # Проверка найденных модулей
+        self.assertEqual(
+            sorted(found_ids),
+            sorted([self.module_object_1.pk, self.module_title_match.pk, self.module_description_match.pk])
+        )
+        self.assertEqual(
+            found_ids[-1],
+            self.module_description_match.pk
+        )
+
+    def test_search_vector_follows_module_changes(self):
+        """Поисковый вектор обновляется при изменении модуля."""
+
+        # Изменение названия модуля
+        self.module_object_2.title = 'астрономия'
+        self.module_object_2.save()
+
+        # GET-запрос на поиск по новому названию
+        response = self.client.get(
+            self.get_url,
+            {'search': 'астрономии'},
+            headers=self.headers_user_1
+        )
+
+        # Проверка найденного модуля
+        self.assertEqual(
+            [obj.get('id') for obj in response.json().get('results')],
+            [self.module_object_2.pk]
+        )
+
+
+class ModuleAutocompleteTestCase(ModuleAPITestCase):
+    """Для тестирования подсказок по названию объектов модели Module."""
+
+    def setUp(self) -> None:
+        super().setUp()
+
+        # Получение маршрутов
+        self.autocomplete_url = '/modules/autocomplete/'
+
+        # Создание модуля с похожим названием
+        self.module_object_3 = Module.objects.create(
+            title='высшая математика',
+            description='пределы и производные',
+            module_user=self.user_2
+        )
+
+    def test_user_can_get_suggestions_by_prefix(self):
+        """Подсказки по началу слова содержат только <id> и <title> подходящих модулей."""
+
+        # GET-запрос на получение подсказок
+        response = self.client.get(
+            self.autocomplete_url,
+            {'q': 'матем'},
+            headers=self.headers_user_1
+        )
+
+        # Проверка содержимого ответа
+        self.assertEqual(
+            sorted(response.json(), key=lambda obj: obj['id']),
+            [
+                {'id': self.module_object_1.pk, 'title': 'математика'},
+                {'id': self.module_object_3.pk, 'title': 'высшая математика'},
+            ]
+        )
+
+    def test_suggestions_tolerate_typos(self):
+        """Подсказки находятся и при опечатке в запросе."""
+
+        # GET-запрос на получение подсказок с опечаткой
+        response = self.client.get(
+            self.autocomplete_url,
+            {'q': 'матиматика', 'limit': 1},
+            headers=self.headers_user_1
+        )
+
+        # Проверка наиболее похожего модуля
+        self.assertEqual(
+            response.json(),
+            [{'id': self.module_object_1.pk, 'title': 'математика'}]
+        )
+
+    def test_suggestions_are_cached(self):
+        """Повторный запрос подсказок не обращается к таблице модулей."""
+
+        # GET-запрос заполняет кеш
+        self.client.get(self.autocomplete_url, {'q': 'матем'}, headers=self.headers_user_1)
+
+        # Повторный GET-запрос не обращается к базе данных: пользователь для аутентификации тоже берется из кеша
+        with self.assertNumQueries(0):
+            self.client.get(self.autocomplete_url, {'q': 'МАТЕМ '}, headers=self.headers_user_1)
+
+
+class ModuleConditionalGetTestCase(ModuleAPITestCase):
+    """Для тестирования условных GET-запросов (ETag / Last-Modified) к объектам модели Module."""
+
+    def setUp(self) -> None:
+        super().setUp()
+
+        # Получение маршрутов
+        self.get_url = '/modules/'
+        self.get_detail_url = f'/modules/{self.module_object_1.pk}/'
+
+    def test_unchanged_list_returns_not_modified(self):
+        """Неизменившийся список возвращается ответом 304 без тела, после изменения модуля — ответом 200."""
+
+        # GET-запрос на получение валидаторов списка
+        response = self.client.get(self.get_url, headers=self.headers_user_1)
+
+        # Повторный GET-запрос с полученным ETag
+        response_not_modified = self.client.get(
+            self.get_url,
+            headers={**self.headers_user_1, 'If-None-Match': response['ETag']}
+        )
+
+        # Проверка статус кода и отсутствия тела
+        self.assertEqual(
+            response_not_modified.status_code,
+            status.HTTP_304_NOT_MODIFIED
+        )
+        self.assertEqual(
+            response_not_modified.content,
+            b''
+        )
+
+        # Изменение модуля
+        with self.captureOnCommitCallbacks(execute=True):
+            self.module_object_2.title = 'литература'
+            self.module_object_2.save()
+
+        # GET-запрос с устаревшим ETag
+        response_modified = self.client.get(
+            self.get_url,
+            headers={**self.headers_user_1, 'If-None-Match': response['ETag']}
+        )
+
+        # Проверка статус кода
+        self.assertEqual(
+            response_modified.status_code,
+            status.HTTP_200_OK
+        )
+
+    def test_list_is_validated_by_etag_only(self):
+        """Список отдается без Last-Modified, а удаление модуля изменяет его ETag."""
+
+        # GET-запрос на получение валидаторов списка
+        response = self.client.get(self.get_url, headers=self.headers_user_1)
+
+        # Проверка заголовков
+        self.assertIn('ETag', response)
+        self.assertNotIn('Last-Modified', response)
+
+        # Удаление модуля
+        with self.captureOnCommitCallbacks(execute=True):
+            self.module_object_2.delete()
+
+        # GET-запрос с устаревшим ETag
+        response_modified = self.client.get(
+            self.get_url,
+            headers={**self.headers_user_1, 'If-None-Match': response['ETag']}
+        )
+
+        # Проверка статус кода
+        self.assertEqual(
+            response_modified.status_code,
+            status.HTTP_200_OK
+        )
+
+    def test_not_modified_list_is_not_serialized_on_cache_miss(self):
+        """При промахе кеша неизменившийся список возвращается ответом 304 без сериализации страницы."""
+
+        # GET-запрос на получение ETag списка
+        response = self.client.get(self.get_url, headers=self.headers_user_1)
+
+        with patch('modules.cache.get_cached', return_value=None), \
+                patch.object(ModuleSerializer, 'to_representation') as mock_representation:
+            response_not_modified = self.client.get(
+                self.get_url,
+                headers={**self.headers_user_1, 'If-None-Match': response['ETag']}
+            )
+
+        # Проверка статус кода и отсутствия сериализации
+        self.assertEqual(
+            response_not_modified.status_code,
+            status.HTTP_304_NOT_MODIFIED
+        )
+        mock_representation.assert_not_called()
+
+    def test_list_etag_does_not_survive_cache_flush(self):
+        """После очистки кеша версия списка начинается со случайного значения, поэтому прежний ETag не совпадает."""
+
+        # GET-запрос на получение ETag списка и очистка кеша
+        response = self.client.get(self.get_url, headers=self.headers_user_1)
+        cache.clear()
+
+        response_after_flush = self.client.get(
+            self.get_url,
+            headers={**self.headers_user_1, 'If-None-Match': response['ETag']}
+        )
+
+        # Проверка статус кода и нового ETag
+        self.assertEqual(
+            response_after_flush.status_code,
+            status.HTTP_200_OK
+        )
+        self.assertNotEqual(response_after_flush['ETag'], response['ETag'])
+
+    def test_unchanged_detail_returns_not_modified(self):
+        """Неизменившийся модуль возвращается ответом 304 по заголовку If-Modified-Since."""
+
+        # GET-запрос на получение валидаторов модуля
+        response = self.client.get(self.get_detail_url, headers=self.headers_user_1)
+
+        # Повторный GET-запрос с полученной датой изменения
+        response_not_modified = self.client.get(
+            self.get_detail_url,
+            headers={**self.headers_user_1, 'If-Modified-Since': response['Last-Modified']}
+        )
+
+        # Проверка статус кода
+        self.assertEqual(
+            response_not_modified.status_code,
+            status.HTTP_304_NOT_MODIFIED
+        )
+
+    def test_not_modified_requires_owner(self):
+        """Ответ 304 не отдается пользователю, который не является владельцем модуля."""
+
+        # GET-запрос владельца на получение валидаторов модуля
+        response = self.client.get(self.get_detail_url, headers=self.headers_user_1)
+
+        # GET-запрос второго пользователя с полученным ETag
+        response_another_user = self.client.get(
+            self.get_detail_url,
+            headers={**self.headers_user_2, 'If-None-Match': response['ETag']}
+        )
+
+        # Проверка статус кода
+        self.assertEqual(
+            response_another_user.status_code,
+            status.HTTP_403_FORBIDDEN
+        )
+
+
+class ModuleModerationTestCase(ModuleAPITestCase):
+    """Для тестирования проверки запрещенных слов в объектах модели Module."""
+    def setUp(self) -> None:
+        super().setUp()
+
+        # Получение маршрутов
+        self.create_url = reverse('modules:create_module')
+
+    def test_automaton_finds_overlapping_words(self):
+        """Автомат находит слова, которые пересекаются друг с другом или находятся внутри других слов."""
+
+        automaton = AhoCorasick(['he', 'she', 'his', 'hers'])
+
+        # Проверка найденных слов
+        self.assertEqual(automaton.search('ushers'), 'she')
+        self.assertEqual(automaton.search('ahishers'), 'his')
+        self.assertEqual(automaton.search('HERS'), 'he')
+        self.assertIsNone(automaton.search('история'))
+        self.assertIsNone(AhoCorasick([]).search('текст'))
+
+    def test_banned_word_is_case_insensitive_substring(self):
+        """Запрещенное слово находится без учета регистра, в том числе внутри другого слова."""
+
+        self.raw_data['title'] = 'Онлайн-КАЗИНОвед'
+
+        response = self.client.post(
+            self.create_url,
+            self.raw_data,
+            headers=self.headers_user_1
+        )
+
+        # Проверка статус кода
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_400_BAD_REQUEST
+        )
+
+    def test_user_cannot_create_module_with_banned_word_in_description(self):
+        """Запрещенное слово в описании модуля не проходит валидацию."""
+
+        self.raw_data['title'] = 'Экономика'
+        self.raw_data['description'] = 'как обмануть систему'
+
+        response = self.client.post(
+            self.create_url,
+            self.raw_data,
+            headers=self.headers_user_1
+        )
+
+        # Проверка статус кода
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_400_BAD_REQUEST
+        )
+
+        # Проверка текста ошибки
+        self.assertEqual(
+            response.json(),
+            {'banned_words': ['Нельзя публиковать запрещенные материалы']}
+        )
+
+    def test_new_banned_word_is_applied_without_restart(self):
+        """Слово, добавленное в модель BannedWord, сразу учитывается при валидации, а удаленное — перестает."""
+
+        self.raw_data['title'] = 'Букмекерская контора'
+        get_automaton()
+
+        banned_word = BannedWord.objects.create(word='  Букмекер ')
+
+        # Проверка нормализации слова
+        self.assertEqual(banned_word.word, 'букмекер')
+
+        response = self.client.post(
+            self.create_url,
+            self.raw_data,
+            headers=self.headers_user_1
+        )
+
+        # Проверка статус кода
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_400_BAD_REQUEST
+        )
+
+        banned_word.delete()
+
+        with patch('modules.tasks.send_queued_notifications.delay'):
+            response = self.client.post(
+                self.create_url,
+                self.raw_data,
+                headers=self.headers_user_1
+            )
+
+        # Проверка статус кода
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_201_CREATED
+        )
+
+
+class ModuleReorderTestCase(ModuleAPITestCase):
+    """Для тестирования порядка объектов модели Module и его изменения."""
+    def setUp(self) -> None:
+        super().setUp()
+
+        # Создание модулей тестового пользователя: математика, физика, химия, биология
+        self.modules = [self.module_object_1] + [
+            Module.objects.create(title=title, description='описание', module_user=self.user_test)
+            for title in ('физика', 'химия', 'биология')
+        ]
+        self.bulk_reorder_url = reverse('modules:bulk_reorder_module')
+
+    def get_order(self):
+        return list(
+            Module.objects.filter(module_user=self.user_test).order_by('position', 'id').values_list('pk', flat=True)
+        )
+
+    def reorder(self, module, data, headers=None):
+        return self.client.post(
+            reverse('modules:reorder_module', kwargs={'pk': module.pk}),
+            data,
+            headers=headers or self.headers_user_1,
+            format='json'
+        )
+
+    def test_new_modules_are_appended_to_owner_sequence(self):
+        """Новые модули получают порядковый номер после последнего модуля своего владельца."""
+
+        positions = [module.position for module in self.modules]
+
+        # Проверка возрастания порядковых номеров
+        self.assertEqual(positions, sorted(positions))
+        self.assertEqual(len(set(positions)), len(positions))
+
+        response = self.client.post(
+            reverse('modules:bulk_create_module'),
+            [{'title': 'астрономия', 'description': 'описание', 'module_user': 'test@test.com'}],
+            headers=self.headers_user_1,
+            format='json'
+        )
+
+        # Проверка статус кода
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_201_CREATED
+        )
+
+        # Проверка того, что модуль добавлен в конец
+        self.assertEqual(self.get_order()[-1], response.json()[0]['id'])
+
+    def test_owner_is_locked_before_next_position_is_read(self):
+        """Строка владельца блокируется до чтения последнего номера, и вставка выполняется в той же транзакции."""
+
+        with CaptureQueriesContext(connection) as context:
+            Module.objects.create(title='астрономия', description='описание', module_user=self.user_test)
+
+        # Проверка порядка запросов: блокировка владельца, чтение последнего номера, вставка модуля
+        queries = [query['sql'] for query in context.captured_queries]
+        lock_index = next(index for index, sql in enumerate(queries) if sql.endswith('FOR UPDATE'))
+        max_index = next(index for index, sql in enumerate(queries) if 'MAX("modules_module"."position")' in sql)
+        insert_index = next(index for index, sql in enumerate(queries) if sql.startswith('INSERT'))
+        self.assertLess(lock_index, max_index)
+        self.assertLess(max_index, insert_index)
+
+    def test_user_can_move_module_changing_only_one_row(self):
+        """Перемещение модуля изменяет порядковый номер только перемещаемого модуля."""
+
+        math, physics, chemistry, biology = self.modules
+
+        response = self.reorder(biology, {'after': math.pk})
+
+        # Проверка статус кода
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_200_OK
+        )
+
+        # Проверка нового порядка
+        self.assertEqual(self.get_order(), [math.pk, biology.pk, physics.pk, chemistry.pk])
+
+        # Проверка того, что номера остальных модулей не изменились
+        for module in (math, physics, chemistry):
+            self.assertEqual(Module.objects.get(pk=module.pk).position, module.position)
+
+        response = self.reorder(chemistry, {'before': math.pk})
+
+        # Проверка нового порядка
+        self.assertEqual(response.json()['position'], Module.objects.get(pk=chemistry.pk).position)
+        self.assertEqual(self.get_order(), [chemistry.pk, math.pk, biology.pk, physics.pk])
+
+    def test_list_is_ordered_by_position(self):
+        """Список модулей владельца можно получить в заданном порядке."""
+
+        math, physics, chemistry, biology = self.modules
+        self.reorder(math, {'after': biology.pk})
+
+        response = self.client.get(
+            reverse('modules:list_module'),
+            {'module_user': self.user_test.pk, 'ordering': 'position'},
+            headers=self.headers_user_1
+        )
+
+        # Проверка порядка модулей в ответе
+        self.assertEqual(
+            [module['id'] for module in response.json()['results']],
+            [physics.pk, chemistry.pk, biology.pk, math.pk]
+        )
+
+    def test_exhausted_gap_is_renumbered(self):
+        """Если промежуток между соседями исчерпан, нумерация выравнивается и порядок остается правильным."""
+
+        math, physics, chemistry, biology = self.modules
+
+        # Попеременное перемещение двух модулей в один и тот же промежуток делит его пополам при каждом перемещении
+        for _ in range(15):
+            self.reorder(chemistry, {'after': math.pk})
+            self.reorder(biology, {'after': math.pk})
+
+        positions = list(
+            Module.objects.filter(module_user=self.user_test).values_list('position', flat=True)
+        )
+
+        # Проверка порядка и отсутствия одинаковых номеров
+        self.assertEqual(self.get_order(), [math.pk, biology.pk, chemistry.pk, physics.pk])
+        self.assertEqual(len(set(positions)), len(positions))
+
+    def test_renumber_task_restores_gaps(self):
+        """Фоновая задача выравнивает промежутки между номерами, сохраняя порядок модулей."""
+
+        math, physics, chemistry, biology = self.modules
+        self.reorder(biology, {'before': physics.pk})
+        order = self.get_order()
+
+        renumber_module_positions(self.user_test.pk)
+
+        # Проверка порядка и равных промежутков
+        self.assertEqual(self.get_order(), order)
+        self.assertEqual(
+            list(Module.objects.filter(pk__in=order).order_by('position').values_list('position', flat=True)),
+            [POSITION_STEP * number for number in range(1, len(order) + 1)]
+        )
+
+    def test_user_cannot_move_module_relative_to_foreign_module(self):
+        """Модуль нельзя переместить относительно модуля другого владельца или относительно самого себя."""
+
+        for data in ({'after': self.module_object_2.pk}, {'before': self.module_object_1.pk}):
+            response = self.reorder(self.module_object_1, data)
+
+            # Проверка статус кода
+            self.assertEqual(
+                response.status_code,
+                status.HTTP_400_BAD_REQUEST
+            )
+
+    def test_user_must_pass_exactly_one_neighbour(self):
+        """Нужно указать ровно одно из полей after или before."""
+
+        for data in ({}, {'after': self.modules[1].pk, 'before': self.modules[2].pk}):
+            response = self.reorder(self.module_object_1, data)
+
+            # Проверка статус кода
+            self.assertEqual(
+                response.status_code,
+                status.HTTP_400_BAD_REQUEST
+            )
+
+    def test_user_cannot_move_foreign_module(self):
+        """Пользователь не может перемещать чужие модули."""
+
+        response = self.reorder(self.module_object_2, {'after': self.module_object_2.pk})
+
+        # Проверка статус кода
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_403_FORBIDDEN
+        )
+
+    def test_user_can_bulk_reorder_modules(self):
+        """Переданные модули расставляются в заданном порядке на занимаемые ими номера, остальные не изменяются."""
+
+        math, physics, chemistry, biology = self.modules
+
+        response = self.client.post(
+            self.bulk_reorder_url,
+            {'ids': [chemistry.pk, self.module_object_2.pk, math.pk, 0]},
+            headers=self.headers_user_1,
+            format='json'
+        )
+
+        # Проверка статус кода
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_200_OK
+        )
+
+        # Проверка результата для каждого модуля
+        self.assertEqual(
+            response.json()['results'],
+            [
+                {'id': chemistry.pk, 'status': 'reordered'},
+                {'id': self.module_object_2.pk, 'status': 'forbidden'},
+                {'id': math.pk, 'status': 'reordered'},
+                {'id': 0, 'status': 'not_found'},
+            ]
+        )
+
+        # Проверка нового порядка
+        self.assertEqual(self.get_order(), [chemistry.pk, physics.pk, math.pk, biology.pk])
+        self.assertEqual(Module.objects.get(pk=self.module_object_2.pk).position, self.module_object_2.position)
+
+
+class ModuleNotificationTestCase(ModuleAPITestCase):
+    """Для тестирования очереди сообщений о создании объектов модели Module."""
+    def setUp(self) -> None:
+        super().setUp()
+
+        # Получение маршрутов
+        self.create_url = reverse('modules:create_module')
+        self.raw_data['title'] = 'Астрономия'
+
+    def test_notification_is_sent_after_commit(self):
+        """Сообщение ставится в очередь при создании модуля и отправляется только после фиксации транзакции."""
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.post(
+                self.create_url,
+                self.raw_data,
+                headers=self.headers_user_1
+            )
+
+            # Проверка того, что до фиксации транзакции сообщение не отправлено
+            self.assertEqual(len(mail.outbox), 0)
+
+        # Проверка статус кода
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_201_CREATED
+        )
+
+        for callback in callbacks:
+            callback()
+
+        # Проверка отправленного сообщения
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['test@test.com'])
+        self.assertIn('Астрономия', mail.outbox[0].body)
+        self.assertFalse(Notification.objects.filter(sent_at__isnull=True).exists())
+
+    def test_queued_notifications_are_sent_in_batches_over_one_connection(self):
+        """Все накопленные сообщения отправляются пачками через одно соединение."""
+
+        Notification.objects.bulk_create(
+            Notification(email=f'user_{number}@test.com', subject='тема', message='текст') for number in range(5)
+        )
+
+        with patch('mailing.delivery.get_connection', wraps=get_connection) as mock_connection:
+            sent = send_queued_notifications(batch_size=2)
+
+        # Проверка количества отправленных сообщений и открытых соединений
+        self.assertEqual(sent, 5)
+        self.assertEqual(len(mail.outbox), 5)
+        mock_connection.assert_called_once()
+        self.assertFalse(Notification.objects.filter(sent_at__isnull=True).exists())
+
+    def test_failed_batch_stays_in_queue(self):
+        """Если отправка не удалась, сообщения остаются в очереди до следующего запуска задачи."""
+
+        Notification.objects.create(email='user@test.com', subject='тема', message='текст')
+
+        with patch(SEND_MESSAGES, side_effect=SMTPException):
+            with self.assertRaises(SMTPException):
+                send_queued_notifications()
+
+        # Проверка того, что сообщение не отмечено отправленным, а попытка учтена
+        self.assertTrue(Notification.objects.filter(sent_at__isnull=True, failed_at__isnull=True, attempts=1).exists())
+
+    def test_repeated_server_error_marks_notification_failed(self):
+        """Ответ сервера с ошибкой, не относящийся к адресу, учитывается в попытках, и после NOTIFICATIONS_MAX_ATTEMPTS
+        попыток сообщение отмечается неотправляемым."""
+
+        Notification.objects.create(email='user@test.com', subject='тема', message='текст')
+        refused = SMTPSenderRefused(553, b'Sender rejected', 'noreply@test.com')
+
+        with patch(SEND_MESSAGES, side_effect=refused):
+            for _ in range(settings.NOTIFICATIONS_MAX_ATTEMPTS):
+                with self.assertRaises(SMTPSenderRefused):
+                    send_queued_notifications()
+
+        # Проверка счетчика попыток и отметки об отказе
+        notification = Notification.objects.get(email='user@test.com')
+        self.assertEqual(notification.attempts, settings.NOTIFICATIONS_MAX_ATTEMPTS)
+        self.assertIsNotNone(notification.failed_at)
+        self.assertIn('Sender rejected', notification.error)
+
+        # Повторный запуск не пытается отправить сообщение снова
+        self.assertEqual(send_queued_notifications(), 0)
+
+    def test_rejected_recipient_does_not_block_queue(self):
+        """Сообщение с отклоненным адресом отмечается неотправляемым, а остальные сообщения отправляются."""
+
+        Notification.objects.bulk_create(
+            Notification(email=email, subject='тема', message='текст')
+            for email in ('bad@test.com', 'user_1@test.com', 'user_2@test.com')
+        )
+        send_messages = mail.get_connection().send_messages
+
+        def refuse_bad_address(messages):
+            if messages[0].to == ['bad@test.com']:
+                raise SMTPRecipientsRefused({'bad@test.com': (550, b'No such user')})
+            return send_messages(messages)
+
+        with patch(SEND_MESSAGES, side_effect=refuse_bad_address):
+            sent = send_queued_notifications()
+
+        # Проверка отправленных сообщений и отметки об отказе
+        self.assertEqual(sent, 2)
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox), ['user_1@test.com', 'user_2@test.com'])
+        rejected = Notification.objects.get(email='bad@test.com')
+        self.assertIsNotNone(rejected.failed_at)
+        self.assertIn('No such user', rejected.error)
+
+        # Повторный запуск не пытается отправить сообщение снова
+        self.assertEqual(send_queued_notifications(), 0)
+
+    def test_connection_error_keeps_delivered_messages_sent(self):
+        """После разрыва соединения доставленные сообщения остаются отправленными и не отправляются повторно."""
+
+        Notification.objects.bulk_create(
+            Notification(email=f'user_{number}@test.com', subject='тема', message='текст') for number in range(3)
+        )
+        send_messages = mail.get_connection().send_messages
+
+        def disconnect_on_second(messages):
+            if messages[0].to == ['user_1@test.com']:
+                raise SMTPServerDisconnected
+            return send_messages(messages)
+
+        with patch(SEND_MESSAGES, side_effect=disconnect_on_second):
+            with self.assertRaises(SMTPServerDisconnected):
+                send_queued_notifications()
+
+        # Проверка того, что первое сообщение отмечено отправленным, а остальные вернулись в очередь
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(Notification.objects.filter(sent_at__isnull=True, claimed_at__isnull=True).count(), 2)
+        self.assertEqual(Notification.objects.get(email='user_1@test.com').attempts, 0)
+
+        # Повторный запуск отправляет только оставшиеся сообщения
+        self.assertEqual(send_queued_notifications(), 2)
+        self.assertEqual(len(mail.outbox), 3)
+
+    def test_old_notifications_are_purged(self):
+        """Давно отправленные и неотправляемые сообщения удаляются, неотправленные остаются."""
+
+        old = timezone.now() - timedelta(days=settings.NOTIFICATIONS_RETENTION_DAYS + 1)
+        Notification.objects.bulk_create([
+            Notification(email='sent@test.com', subject='тема', message='текст', sent_at=old),
+            Notification(email='failed@test.com', subject='тема', message='текст', failed_at=old),
+            Notification(email='recent@test.com', subject='тема', message='текст', sent_at=timezone.now()),
+            Notification(email='pending@test.com', subject='тема', message='текст'),
+        ])
+
+        # Проверка количества удаленных и оставшихся сообщений
+        self.assertEqual(purge_notifications(), 2)
+        self.assertEqual(
+            sorted(Notification.objects.values_list('email', flat=True)),
+            ['pending@test.com', 'recent@test.com']
+        )
+
+    def test_digest_user_gets_one_summary_email(self):
+        """Пользователю, выбравшему сводку, сообщения не отправляются сразу, а объединяются в одно письмо."""
+
+        self.user_test.notification_mode = User.NOTIFICATION_DIGEST
+        self.user_test.save()
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            for title in ('Астрономия', 'Геометрия'):
+                self.client.post(
+                    self.create_url,
+                    {**self.raw_data, 'title': title},
+                    headers=self.headers_user_1
+                )
+
+        # Проверка того, что задача немедленной отправки не запускалась и письма не отправлены
+        self.assertNotIn(modules_tasks.send_queued_notifications.delay, callbacks)
+        self.assertEqual(len(mail.outbox), 0)
+
+        # Сообщение пользователя с немедленной отправкой в сводку не попадает
+        Notification.objects.create(email='another@test.com', subject='тема', message='текст')
+
+        sent = send_notification_digests()
+
+        # Проверка одного письма-сводки со всеми модулями
+        self.assertEqual(sent, 1)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['test@test.com'])
+        self.assertIn('— Астрономия\n— Геометрия', mail.outbox[0].body)
+        self.assertTrue(Notification.objects.filter(email='another@test.com', sent_at__isnull=True).exists())
+
+        # Повторный запуск ничего не отправляет
+        self.assertEqual(send_notification_digests(), 0)
+
+    def test_digests_continue_while_pending_rows_remain(self):
+        """Пустая пачка (адреса забрала другая задача) не завершает отправку, пока в очереди остаются сообщения."""
+
+        Notification.objects.create(email='test@test.com', subject='', message='Астрономия', digest=True)
+        claims = [([], timezone.now())]
+
+        def claim_after_concurrent_task(*args, **kwargs):
+            return claims.pop() if claims else claim_notifications(*args, **kwargs)
+
+        with patch('modules.notifications.claim_notifications', side_effect=claim_after_concurrent_task):
+            sent = send_notification_digests()
+
+        # Проверка отправленной сводки
+        self.assertEqual(sent, 1)
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_user_can_choose_notification_mode(self):
+        """Пользователь может выбрать режим уведомлений."""
+
+        response = self.client.patch(
+            '/auth/users/me/',
+            {'notification_mode': User.NOTIFICATION_DIGEST},
+            headers=self.headers_user_1
+        )
+
+        # Проверка статус кода
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_200_OK
+        )
+
+        # Проверка сохраненного режима
+        self.user_test.refresh_from_db()
+        self.assertEqual(self.user_test.notification_mode, User.NOTIFICATION_DIGEST)
+
+
+class ModuleOwnerScopeTestCase(QueryBudgetTestMixin, ModuleAPITestCase):
+    """Для тестирования выборки объектов модели Module с проверкой владельца в условии WHERE."""
+    def setUp(self) -> None:
+        super().setUp()
+
+        # Получение маршрутов
+        self.my_url = reverse('modules:my_list_module')
+
+        # Прогрев кешей пользователя и запрещенных слов
+        get_cached_user(self.user_test.pk)
+        get_automaton()
+
+    def test_user_gets_only_own_modules(self):
+        """Список «мои модули» содержит только модули текущего пользователя."""
+
+        response = self.client.get(self.my_url, headers=self.headers_user_1)
+
+        # Проверка статус кода
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_200_OK
+        )
+
+        # Проверка модулей в ответе
+        self.assertEqual(
+            [module['id'] for module in response.json()['results']],
+            [self.module_object_1.pk]
+        )
+
+    def test_owner_lookup_filters_by_owner_in_where_clause(self):
+        """Модуль для изменения выбирается одним запросом с условием на владельца, без отдельной загрузки владельца."""
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.patch(
+                reverse('modules:update_module', kwargs={'pk': self.module_object_1.pk}),
+                {'description': 'новое описание'},
+                headers=self.headers_user_1
+            )
+
+        # Проверка статус кода
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_200_OK
+        )
+
+        # Проверка условия на владельца в запросе выборки
+        lookup_query = context.captured_queries[0]['sql']
+        self.assertIn('"modules_module"."module_user_id" = %s' % self.user_test.pk, lookup_query)
+        self.assertFalse(any(query['sql'].startswith('SELECT') for query in context.captured_queries[1:]))
+
+    def test_foreign_and_missing_modules_keep_distinct_statuses(self):
+        """Чужой модуль возвращает 403, несуществующий — 404."""
+
+        cases = ((self.module_object_2.pk, status.HTTP_403_FORBIDDEN), (0, status.HTTP_404_NOT_FOUND))
+        for pk, expected_status in cases:
+            response = self.client.patch(
+                reverse('modules:update_module', kwargs={'pk': pk}),
+                {'description': 'новое описание'},
+                headers=self.headers_user_1
+            )
+
+            # Проверка статус кода
+            self.assertEqual(
+                response.status_code,
+                expected_status
+            )
+
+
+class ModuleSparseFieldsetTestCase(ModuleAPITestCase):
+    """Для тестирования выборочного вывода полей объектов модели Module (?fields= / ?expand=)."""
+    def setUp(self) -> None:
+        super().setUp()
+
+        # Получение маршрутов
+        self.get_url = '/modules/'
+        self.detail_url = f'/modules/{self.module_object_1.pk}/'
+
+    def get_with_queries(self, url, params):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, params, headers=self.headers_user_1)
+        module_queries = [query['sql'] for query in context.captured_queries if 'FROM "modules_module"' in query['sql']]
+        return response, module_queries[-1]
+
+    def test_user_gets_only_requested_columns(self):
+        """Невыбранные поля не выводятся и не загружаются, а владелец без ?expand= не присоединяется к запросу."""
+
+        response, sql = self.get_with_queries(self.get_url, {'fields': 'id,title'})
+
+        # Проверка статус кода
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_200_OK
+        )
+
+        # Проверка полей в ответе
+        self.assertEqual(
+            response.json()['results'][0],
+            {'id': self.module_object_1.pk, 'title': 'математика'}
+        )
+
+        # Проверка запроса к базе данных
+        self.assertNotIn('"description"', sql)
+        self.assertNotIn('JOIN', sql)
+
+    def test_user_gets_owner_as_primary_key_unless_expanded(self):
+        """Владелец выводится идентификатором, а с ?expand= — вложенным объектом."""
+
+        response, sql = self.get_with_queries(self.detail_url, {'fields': 'id,module_user'})
+        self.assertEqual(response.json(), {'id': self.module_object_1.pk, 'module_user': self.user_test.pk})
+        self.assertNotIn('JOIN', sql)
+
+        response, sql = self.get_with_queries(self.detail_url, {'fields': 'id,module_user', 'expand': 'module_user'})
+        self.assertEqual(response.json()['module_user']['email'], 'test@test.com')
+        self.assertIn('JOIN', sql)
+
+    def test_user_can_choose_owner_fields(self):
+        """Поля владельца выбираются через точку, остальные столбцы владельца не загружаются."""
+
+        response, sql = self.get_with_queries(self.get_url, {'fields': 'title,module_user.email'})
+
+        # Проверка полей в ответе
+        self.assertEqual(
+            response.json()['results'][0],
+            {'title': 'математика', 'module_user': {'email': 'test@test.com'}}
+        )
+
+        # Проверка запроса к базе данных
+        self.assertIn('"users_user"."email"', sql)
+        self.assertNotIn('"users_user"."city"', sql)
+
+    def test_user_cannot_request_unknown_fields(self):
+        """Неизвестные поля приводят к ошибке 400."""
+
+        response = self.client.get(
+            self.get_url,
+            {'fields': 'id,password', 'expand': 'title'},
+            headers=self.headers_user_1
+        )
+
+        # Проверка статус кода
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_400_BAD_REQUEST
+        )
+
+        # Проверка содержимого ответа
+        self.assertEqual(
+            set(response.json()),
+            {'fields', 'expand'}
+        )
+
+
+class ModuleExportTestCase(ModuleAPITestCase):
+    """Для тестирования потоковой выгрузки объектов модели Module."""
+    def setUp(self) -> None:
+        super().setUp()
+
+        # Получение маршрутов
+        self.export_url = reverse('modules:export_module')
+
+    def read_lines(self, response):
+        return b''.join(response.streaming_content).decode().splitlines()
+
+    def test_user_can_export_modules_as_ndjson(self):
+        """Выгрузка в NDJSON содержит по одной строке на модуль с email владельца."""
+
+        response = self.client.get(self.export_url, headers=self.headers_user_1)
+
+        # Проверка статус кода и формата ответа
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_200_OK
+        )
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+
+        # Проверка содержимого выгрузки
+        rows = [json.loads(line) for line in self.read_lines(response)]
+        self.assertEqual(
+            [(row['id'], row['title'], row['owner_email']) for row in rows],
+            [
+                (self.module_object_1.pk, 'математика', 'test@test.com'),
+                (self.module_object_2.pk, 'русский язык', self.user_2.email),
+            ]
+        )
+
+    def test_user_can_export_modules_as_csv(self):
+        """Выгрузка в CSV начинается с заголовка, за которым следуют модули."""
+
+        response = self.client.get(self.export_url, {'export_format': 'csv'}, headers=self.headers_user_1)
+        rows = list(csv.reader(self.read_lines(response)))
+
+        # Проверка содержимого выгрузки
+        self.assertEqual(rows[0], ['id', 'title', 'description', 'position', 'owner_email', 'created_at', 'updated_at'])
+        self.assertEqual(
+            rows[1][:5],
+            [str(self.module_object_1.pk), 'математика', 'работа с числами', '1024', 'test@test.com']
+        )
+        self.assertEqual(len(rows), 3)
+
+        # Неизвестный формат
+        response = self.client.get(self.export_url, {'export_format': 'xml'}, headers=self.headers_user_1)
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_400_BAD_REQUEST
+        )
+
+    def test_export_reads_by_primary_key_without_server_side_cursors(self):
+        """Без серверных курсоров выгрузка читает модули запросами по первичному ключу порциями заданного размера."""
+
+        Module.objects.bulk_create(
+            Module(title=f'модуль {number}', description='описание', module_user=self.user_test, position=number)
+            for number in range(3)
+        )
+
+        with patch.dict(connection.settings_dict, {'DISABLE_SERVER_SIDE_CURSORS': True}):
+            with CaptureQueriesContext(connection) as context:
+                output = StringIO()
+                call_command('export_modules', chunk_size=2, stdout=output)
+
+        # Проверка количества модулей в выгрузке и запросов к базе данных
+        self.assertEqual(len(output.getvalue().splitlines()), 5)
+        self.assertEqual(len(context), 3)
+        self.assertIn('"modules_module"."id" >', context.captured_queries[-1]['sql'])
+
+
+class ModuleImportTestCase(ModuleAPITestCase):
+    """Для тестирования загрузки объектов модели Module командой import_modules."""
+    def setUp(self) -> None:
+        super().setUp()
+
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def write_file(self, name, content):
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(content)
+        return path
+
+    def test_command_imports_csv_and_reports_rejected_rows(self):
+        """Корректные строки загружаются в конец последовательности владельца, остальные попадают в файл отклоненных."""
+
+        path = self.write_file('modules.csv', (
+            'title,description,owner_email\n'
+            'физика,работа с формулами,test@test.com\n'
+            'биология,описание,unknown@test.com\n'
+            'химия,работа с веществами,test@test.com\n'
+            'казино,описание,test@test.com\n'
+            'очень длинное название модуля для обучения,описание,test@test.com\n'
+        ))
+        output = StringIO()
+        call_command('import_modules', path, batch_size=2, stdout=output)
+
+        # Проверка отчета команды
+        self.assertIn('imported: 2\nrejected: 3', output.getvalue())
+
+        # Проверка загруженных модулей и их порядковых номеров
+        self.assertEqual(
+            list(
+                Module.objects.filter(module_user=self.user_test).order_by('position').values_list('title', 'position')
+            ),
+            [('математика', POSITION_STEP), ('физика', 2 * POSITION_STEP), ('химия', 3 * POSITION_STEP)]
+        )
+
+        # Проверка файла отклоненных строк
+        with open(f'{path}.rejected.csv', encoding='utf-8') as file:
+            rejected = list(csv.DictReader(file))
+        self.assertEqual([row['line'] for row in rejected], ['2', '4', '5'])
+        self.assertTrue(rejected[0]['error'].startswith('module_user'))
+        self.assertTrue(rejected[1]['error'].startswith('banned_words'))
+        self.assertTrue(rejected[2]['error'].startswith('title'))
+
+    def test_command_matches_banned_words_like_api(self):
+        """Запрещенные слова при загрузке ищутся так же, как в API: с приведением регистра через casefold."""
+
+        BannedWord.objects.create(word='Straße')
+        path = self.write_file('modules.csv', (
+            'title,description,owner_email\n'
+            'STRASSE,описание,test@test.com\n'
+            'физика,описание straße,test@test.com\n'
+            'химия,описание,test@test.com\n'
+        ))
+        output = StringIO()
+        call_command('import_modules', path, batch_size=1, stdout=output)
+
+        # Проверка отчета команды и файла отклоненных строк
+        self.assertIn('imported: 1\nrejected: 2', output.getvalue())
+        with open(f'{path}.rejected.csv', encoding='utf-8') as file:
+            rejected = list(csv.DictReader(file))
+        self.assertEqual([row['line'] for row in rejected], ['1', '2'])
+        self.assertEqual({row['error'] for row in rejected}, {'banned_words: Нельзя публиковать запрещенные материалы'})
+
+    def test_command_imports_exported_ndjson(self):
+        """Выгрузка в NDJSON загружается без изменений, строки с некорректным JSON отклоняются."""
+
+        output = StringIO()
+        call_command('export_modules', stdout=output)
+        path = self.write_file('modules.ndjson', output.getvalue() + '{"title": \n')
+
+        output = StringIO()
+        call_command('import_modules', path, stdout=output)
+
+        # Проверка отчета команды и количества модулей
+        self.assertIn('imported: 2\nrejected: 1', output.getvalue())
+        self.assertEqual(Module.objects.filter(title='математика').count(), 2)
+
+        # Новые модули находятся полнотекстовым поиском
+        self.assertTrue(Module.objects.filter(title='русский язык', search_vector__isnull=False).count() == 2)
+
+    def test_command_rejects_unknown_columns(self):
+        """Файл с неизвестными столбцами не загружается."""
+
+        path = self.write_file('modules.csv', 'title,owner\nфизика,test@test.com\n')
+
+        with self.assertRaisesMessage(CommandError, 'Неизвестные столбцы: owner'):
+            call_command('import_modules', path)
+        self.assertEqual(Module.objects.count(), 2)
+
+
+class ModuleGenerateDataTestCase(ModuleAPITestCase):
+    """Для тестирования создания пользователей и модулей командой generate_data."""
+
+    def test_command_generates_users_and_modules(self):
+        """Пользователи создаются с общим паролем, модули распределяются между ними с порядковыми номерами."""
+
+        output = StringIO()
+        call_command('generate_data', users=5, modules=200, distribution='zipf', banned_ratio=0.5, stdout=output)
+
+        # Проверка отчета команды и количества объектов
+        self.assertIn('users: 5\nmodules: 200', output.getvalue())
+        users = User.objects.filter(email__endswith='@generated.local')
+        self.assertEqual(users.count(), 5)
+        self.assertEqual(Module.objects.filter(module_user__in=users).count(), 200)
+
+        # Проверка пароля пользователей
+        self.assertTrue(users.first().check_password('GeneratedPassword123'))
+
+        # Проверка порядковых номеров: у каждого владельца номера идут подряд с шагом POSITION_STEP
+        for user in users:
+            positions = list(Module.objects.filter(module_user=user).order_by('position').values_list(
+                'position', flat=True
+            ))
+            self.assertEqual(positions, [number * POSITION_STEP for number in range(1, len(positions) + 1)])
+
+        # Проверка модулей с запрещенными словами
+        descriptions = Module.objects.filter(module_user__in=users).values_list('description', flat=True)
+        self.assertTrue(any(find_banned_word(description) for description in descriptions))
+
+    def test_command_continues_user_numbers_after_deletion(self):
+        """Номера новых пользователей продолжают наибольший номер, даже если часть пользователей удалена."""
+
+        call_command('generate_data', users=3, stdout=StringIO())
+        User.objects.filter(email='user1@generated.local').delete()
+
+        output = StringIO()
+        call_command('generate_data', users=2, stdout=output)
+
+        # Проверка отчета команды и адресов пользователей
+        self.assertIn('users: 2', output.getvalue())
+        self.assertEqual(
+            sorted(User.objects.filter(email__endswith='@generated.local').values_list('email', flat=True)),
+            ['user0@generated.local', 'user2@generated.local', 'user3@generated.local', 'user4@generated.local']
+        )
+
+    def test_command_adds_modules_to_existing_users(self):
+        """Без --users модули добавляются в конец последовательностей существующих пользователей."""
+
+        call_command('generate_data', modules=20, banned_ratio=0, stdout=StringIO())
+
+        # Проверка количества модулей и порядковых номеров
+        self.assertEqual(Module.objects.count(), 22)
+        positions = list(Module.objects.filter(module_user=self.user_test).values_list('position', flat=True))
+        self.assertEqual(len(positions), len(set(positions)))
+
+
+class ModuleAsyncTestCase(ModuleAPITestCase):
+    """Для тестирования асинхронных представлений объектов модели Module."""
+    def setUp(self) -> None:
+        super().setUp()
+
+        # Получение маршрутов
+        self.list_url = reverse('modules:async_list_module')
+
+    async def test_user_can_get_modules_by_pages(self):
+        """Асинхронный список совпадает с синхронным и отдается постранично по первичному ключу."""
+
+        response = await self.async_client.get(self.list_url, {'after': self.module_object_1.pk - 1})
+
+        # Проверка статус кода без аутентификации
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_401_UNAUTHORIZED
+        )
+
+        with patch.object(ModuleAsyncListAPIView, 'page_size', 1):
+            response = await self.async_client.get(self.list_url, headers=self.headers_user_1)
+            data = response.json()
+            next_response = await self.async_client.get(data['next'], headers=self.headers_user_1)
+
+        # Проверка содержимого страниц
+        self.assertEqual(
+            data['results'][0]['module_user']['email'],
+            'test@test.com'
+        )
+        self.assertEqual(
+            [module['id'] for module in next_response.json()['results']],
+            [self.module_object_2.pk]
+        )
+        self.assertIsNone(next_response.json()['next'])
+
+    def test_user_gets_detail_only_for_own_module(self):
+        """Детальная информация доступна владельцу, для чужого модуля возвращается 403, для несуществующего — 404."""
+
+        cases = (
+            (self.module_object_1.pk, status.HTTP_200_OK),
+            (self.module_object_2.pk, status.HTTP_403_FORBIDDEN),
+            (0, status.HTTP_404_NOT_FOUND),
+        )
+        for pk, expected_status in cases:
+            response = self.client.get(
+                reverse('modules:async_detail_module', kwargs={'pk': pk}),
+                headers=self.headers_user_1
+            )
+
+            # Проверка статус кода
+            self.assertEqual(
+                response.status_code,
+                expected_status
+            )
+
+        # Проверка содержимого ответа владельцу
+        sync_response = self.client.get(f'/modules/{self.module_object_1.pk}/', headers=self.headers_user_1)
+        response = self.client.get(
+            reverse('modules:async_detail_module', kwargs={'pk': self.module_object_1.pk}),
+            headers=self.headers_user_1
+        )
+        self.assertEqual(
+            response.json(),
+            sync_response.json()
+        )
+
+
+@override_settings(METRICS_TOKEN='secret')
+class ModuleMetricsTestCase(ModuleAPITestCase):
+    """Для тестирования метрик запросов к эндпоинтам модулей."""
+    def setUp(self) -> None:
+        super().setUp()
+
+        # Очистка метрик процесса, оставшихся от предыдущих тестов
+        registry.series.clear()
+
+    def get_metrics(self, headers=None):
+        response = self.client.get(
+            reverse('metrics'),
+            headers={'Authorization': 'Bearer secret'} if headers is None else headers
+        )
+        return response, response.content.decode()
+
+    def test_requests_are_counted_by_route(self):
+        """Запросы учитываются по имени маршрута, методу и коду ответа вместе с SQL-запросами и размером ответа."""
+
+        list_response = self.client.get(reverse('modules:list_module'), headers=self.headers_user_1)
+        self.client.get(reverse('modules:detail_module', kwargs={'pk': self.module_object_2.pk}),
+                        headers=self.headers_user_1)
+        self.client.get('/unknown/path/')
+
+        response, metrics = self.get_metrics()
+
+        # Проверка статус кода и формата ответа
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_200_OK
+        )
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+
+        # Проверка счетчиков запросов
+        list_labels = 'route="modules:list_module",method="GET",status="200"'
+        self.assertIn(f'http_requests_total{{{list_labels}}} 1', metrics)
+        self.assertIn(
+            'http_requests_total{route="modules:detail_module",method="GET",status="403"} 1',
+            metrics
+        )
+        self.assertIn('http_requests_total{route="unmatched",method="GET",status="404"} 1', metrics)
+        self.assertNotIn('route="metrics"', metrics)
+
+        # Проверка гистограммы, SQL-запросов и размера ответа
+        self.assertIn(f'http_request_duration_seconds_bucket{{{list_labels},le="+Inf"}} 1', metrics)
+        self.assertIn(f'http_request_duration_seconds_count{{{list_labels}}} 1', metrics)
+        self.assertIn(f'http_response_size_bytes_total{{{list_labels}}} {len(list_response.content)}', metrics)
+        queries = re.search(rf'http_db_queries_total{{{list_labels}}} (\d+)', metrics)
+        self.assertGreater(int(queries.group(1)), 0)
+
+    async def test_async_requests_are_counted(self):
+        """Запросы к асинхронным эндпоинтам учитываются вместе с SQL-запросами, выполненными в других потоках."""
+
+        await self.async_client.get(reverse('modules:async_list_module'), headers=self.headers_user_1)
+        metrics = render_metrics(await sync_to_async(registry.collect)())
+
+        # Проверка счетчиков запросов
+        labels = 'route="modules:async_list_module",method="GET",status="200"'
+        self.assertIn(f'http_requests_total{{{labels}}} 1', metrics)
+        queries = re.search(rf'http_db_queries_total{{{labels}}} (\d+)', metrics)
+        self.assertGreater(int(queries.group(1)), 0)
+
+    def test_metrics_require_token(self):
+        """Метрики отдаются только с токеном METRICS_TOKEN; без заданного токена эндпоинт закрыт и в режиме DEBUG."""
+
+        response, _ = self.get_metrics(headers={})
+        wrong_token_response, _ = self.get_metrics(headers={'Authorization': 'Bearer wrong'})
+        with self.settings(METRICS_TOKEN=None, DEBUG=True):
+            no_token_response, _ = self.get_metrics(headers={})
+            empty_token_response, _ = self.get_metrics(headers={'Authorization': 'Bearer '})
+
+        # Проверка статус кодов
+        self.assertEqual(
+            [
+                response.status_code,
+                wrong_token_response.status_code,
+                no_token_response.status_code,
+                empty_token_response.status_code,
+            ],
+            [status.HTTP_403_FORBIDDEN] * 4
+        )
+
+    def test_restarted_processes_reuse_free_slots(self):
+        """Процесс занимает первый свободный слот, а слот остановленного процесса освобождается вместе с арендой."""
+
+        registry.flush()
+        slot = registry.slot
+
+        # Процесс, запущенный после остановки текущего, получает тот же слот после истечения аренды
+        cache.delete(registry.lease_key(slot))
+        restarted = type(registry)()
+        restarted.flush()
+        self.assertEqual(restarted.slot, slot)
+
+        # Текущий процесс замечает, что слот занят, и переходит в следующий свободный
+        registry.flush()
+        self.assertEqual(registry.slot, slot + 1)
+
+
+class ModuleSQLCaptureTestCase(ModuleAPITestCase):
+    """Для тестирования записи SQL-запросов по заголовку X-SQL-Capture."""
+    def setUp(self) -> None:
+        super().setUp()
+
+        # Тестовый пользователь становится сотрудником
+        User.objects.filter(pk=self.user_test.pk).update(is_staff=True)
+        invalidate_user(self.user_test.pk)
+
+        # Отчеты записываются во временную директорию
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        settings_override = self.settings(SQL_CAPTURE_DIR=self.directory.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def get_report(self, response):
+        summary = dict(item.split('=', 1) for item in response['X-SQL-Capture'].split('; '))
+        with open(os.path.join(self.directory.name, summary['report']), encoding='utf-8') as file:
+            return summary, json.load(file)
+
+    def test_staff_gets_summary_and_report(self):
+        """Для сотрудника SQL-запросы записываются с местом вызова, сводка возвращается в заголовке ответа."""
+
+        response = self.client.get(
+            reverse('modules:list_module'),
+            headers={**self.headers_user_1, 'X-SQL-Capture': '1'}
+        )
+
+        # Проверка статус кода
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_200_OK
+        )
+
+        # Проверка сводки и отчета
+        summary, report = self.get_report(response)
+        self.assertEqual(int(summary['queries']), report['queries_count'])
+        self.assertGreater(report['queries_count'], 0)
+        self.assertEqual(summary['explained'], '0')
+        self.assertTrue(any(query['origin'].startswith('modules/') for query in report['queries'] if query['origin']))
+
+        # Проверка того, что значения параметров не попадают в отчет
+        self.assertNotIn('test@test.com', json.dumps(report, ensure_ascii=False))
+        self.assertTrue(all(
+            param.startswith('<') for query in report['queries'] for param in (query['params'] or ())
+        ))
+
+    def test_staff_gets_explain_plans(self):
+        """Для значения explain отчет содержит планы выполнения самых медленных запросов SELECT."""
+
+        response = self.client.get(
+            reverse('modules:detail_module', kwargs={'pk': self.module_object_2.pk}),
+            headers={**self.headers_user_1, 'X-SQL-Capture': 'explain'}
+        )
+
+        # Проверка планов выполнения
+        summary, report = self.get_report(response)
+        self.assertGreater(int(summary['explained']), 0)
+        self.assertIn('Execution Time', report['explain'][0]['plan'])
+
+    def test_header_is_ignored_for_regular_user(self):
+        """Для пользователя, который не является сотрудником, и без аутентификации запросы не записываются."""
+
+        for headers in ({**self.headers_user_2, 'X-SQL-Capture': 'explain'}, {'X-SQL-Capture': '1'}):
+            response = self.client.get(reverse('modules:list_module'), headers=headers)
+
+            # Проверка отсутствия сводки и отчета
+            self.assertNotIn('X-SQL-Capture', response)
+        self.assertEqual(os.listdir(self.directory.name), [])
+
+    def test_only_supported_header_values_and_routes_are_captured(self):
+        """Запись включается только значениями 1 и explain и не выполняется для маршрутов аутентификации."""
+
+        for value in ('0', 'yes'):
+            response = self.client.get(
+                reverse('modules:list_module'),
+                headers={**self.headers_user_1, 'X-SQL-Capture': value}
+            )
+
+            # Проверка отсутствия сводки
+            self.assertNotIn('X-SQL-Capture', response)
+
+        response = self.client.post(
+            '/user/token/',
+            {'email': 'test@test.com', 'password': 'ChooseBestPassword'},
+            headers={**self.headers_user_1, 'X-SQL-Capture': '1'}
+        )
+
+        # Проверка отсутствия сводки и отчетов
+        self.assertNotIn('X-SQL-Capture', response)
+        self.assertEqual(os.listdir(self.directory.name), [])
+
+    def test_only_plain_selects_are_explained(self):
+        """EXPLAIN ANALYZE не выполняется для запросов WITH и запросов SELECT с блокировкой строк."""
+
+        self.assertTrue(is_explainable('SELECT "modules_module"."id" FROM "modules_module"'))
+        self.assertFalse(is_explainable('WITH moved AS (DELETE FROM modules_module RETURNING id) SELECT * FROM moved'))
+        self.assertFalse(is_explainable('SELECT * FROM modules_notification FOR UPDATE SKIP LOCKED'))
+        self.assertFalse(is_explainable('SELECT * FROM modules_module FOR NO KEY UPDATE'))
+        self.assertFalse(is_explainable('UPDATE modules_module SET position = 1'))
+
+    def test_old_reports_are_removed(self):
+        """В директории хранится не больше SQL_CAPTURE_MAX_REPORTS отчетов."""
+
+        with self.settings(SQL_CAPTURE_MAX_REPORTS=2):
+            for _ in range(3):
+                self.client.get(
+                    reverse('modules:list_module'),
+                    headers={**self.headers_user_1, 'X-SQL-Capture': '1'}
+                )
+
+        # Проверка количества отчетов
+        self.assertEqual(len(os.listdir(self.directory.name)), 2)
+
+    def test_repeated_queries_are_flagged(self):
+        """Повторяющиеся запросы и один запрос с разными параметрами из цикла отмечаются в отчете."""
+
+        queries = [
+            {'sql': 'SELECT * FROM users_user WHERE id = %s', 'params': (pk,), 'duration_ms': 1.0, 'origin': 'a.py:1'}
+            for pk in (1, 2, 3, 3)
+        ]
+        duplicates, n_plus_one = analyze_queries(queries)
+
+        # Проверка повторяющихся запросов и признаков N+1
+        self.assertEqual([duplicate['count'] for duplicate in duplicates], [2])
+        self.assertEqual(len(n_plus_one), 1)
+        self.assertEqual(n_plus_one[0]['count'], 4)
+        self.assertEqual(n_plus_one[0]['origins'], ['a.py:1'])
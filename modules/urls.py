@@ -3,14 +3,26 @@ from django.urls import path
 from modules.apps import ModulesConfig
 
 from modules.views import ModuleCreateAPIView, ModuleListAPIView, ModuleRetrieveAPIView, ModuleUpdateAPIView, \
-    ModuleDeleteAPIView
+    ModuleDeleteAPIView, ModuleBulkCreateAPIView, ModuleBulkUpdateAPIView, ModuleBulkDeleteAPIView, \
+    ModuleAutocompleteAPIView, ModuleReorderAPIView, ModuleBulkReorderAPIView, ModuleOwnListAPIView, \
+    ModuleExportAPIView, ModuleAsyncListAPIView, ModuleAsyncRetrieveAPIView
 
 app_name = ModulesConfig.name
 
 urlpatterns = [
     path('create/', ModuleCreateAPIView.as_view(), name='create_module'),
+    path('bulk/create/', ModuleBulkCreateAPIView.as_view(), name='bulk_create_module'),
     path('', ModuleListAPIView.as_view(), name='list_module'),
+    path('my/', ModuleOwnListAPIView.as_view(), name='my_list_module'),
+    path('export/', ModuleExportAPIView.as_view(), name='export_module'),
+    path('async/', ModuleAsyncListAPIView.as_view(), name='async_list_module'),
+    path('async/<int:pk>/', ModuleAsyncRetrieveAPIView.as_view(), name='async_detail_module'),
+    path('autocomplete/', ModuleAutocompleteAPIView.as_view(), name='autocomplete_module'),
     path('<int:pk>/', ModuleRetrieveAPIView.as_view(), name='detail_module'),
     path('update/<int:pk>/', ModuleUpdateAPIView.as_view(), name='update_module'),
-    path('delete/<int:pk>/', ModuleDeleteAPIView.as_view(), name='delete_module')
+    path('delete/<int:pk>/', ModuleDeleteAPIView.as_view(), name='delete_module'),
+    path('reorder/<int:pk>/', ModuleReorderAPIView.as_view(), name='reorder_module'),
+    path('bulk/update/', ModuleBulkUpdateAPIView.as_view(), name='bulk_update_module'),
+    path('bulk/delete/', ModuleBulkDeleteAPIView.as_view(), name='bulk_delete_module'),
+    path('bulk/reorder/', ModuleBulkReorderAPIView.as_view(), name='bulk_reorder_module'),
 ]
@@ -1,19 +1,26 @@
 from rest_framework import serializers
-import re
+
+from modules.moderation import find_banned_word
 
 
 class TitleValidation:
-    """Класс валидирует поле <title> модели Module на отсутствие запрещенных слов. Если таковы имеются, то
-    возбудится исключение."""
+    """Класс валидирует поля <title> и <description> модели Module на отсутствие запрещенных слов. Если таковы
+    имеются, то возбудится исключение. Список слов хранится в модели BannedWord, поиск выполняется автоматом
+    Ахо — Корасик за один проход по тексту."""
 
-    def __init__(self, field):
-        self.field = field
+    def __init__(self, fields=('title', 'description')):
+        self.fields = fields
 
     def __call__(self, value):
-        errors = {}
-        banned_words = r'(.*)(биржа|казино|криптовалюта|крипта|дешево|бесплатно|обман|полиция|радар)(.*)'
-        current_title = value.get('title')
-        if re.match(banned_words, current_title, flags=re.IGNORECASE):
-            errors['banned_words'] = 'Нельзя публиковать запрещенные материалы'
+        errors = self.get_errors(value)
         if errors:
             raise serializers.ValidationError(errors)
+
+    def get_errors(self, value, automaton=None):
+        """Метод возвращает ошибки валидации без возбуждения исключения. Для проверки множества объектов можно один
+        раз получить автомат (get_automaton) и передать его, чтобы не проверять версию списка слов для каждого."""
+
+        errors = {}
+        if find_banned_word(*(value.get(field) for field in self.fields), automaton=automaton):
+            errors['banned_words'] = ['Нельзя публиковать запрещенные материалы']
+        return errors
@@ -1,17 +1,87 @@
-from rest_framework import generics
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.postgres.search import TrigramSimilarity, TrigramWordSimilarity
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.functions import Greatest
+from django.http import Http404, StreamingHttpResponse
+from django.utils import timezone
+from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework import exceptions, generics, status
+from rest_framework.filters import OrderingFilter
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
+from config.async_views import AsyncAPIView
+from config.fieldsets import SparseFieldsetMixin
+from modules.cache import CachedListMixin, CachedRetrieveMixin, batch_invalidation, invalidate_modules
+from modules.export import EXPORT_FORMATS, stream_export
+from modules.filters import ModuleFullTextSearchFilter
 from modules.models import Module
+from modules.notifications import queue_creation_notifications
+from modules.pagination import ModuleCursorPagination
 from modules.permissions import IsAuthenticatedAndIsOwner
-from modules.serializers import ModuleCreateSerializer, ModuleSerializer
-from modules.tasks import send_email_creation
+from modules.positions import move_module, reorder_modules
+from modules.serializers import ModuleBulkCreateSerializer, ModuleBulkDeleteSerializer, ModuleBulkReorderSerializer, \
+    ModuleBulkUpdateSerializer, ModuleCreateSerializer, ModuleReorderSerializer, ModuleSerializer
+from users.serializers import UserListSerializer
+
+
+class ModuleQuerySetMixin(SparseFieldsetMixin):
+    """Для выборки объектов модели Module вместе с владельцем одним запросом. Загружаются только поля, которые
+    выводит ModuleSerializer (или выбранные параметрами ?fields= / ?expand=), поля сортировки и время изменения модуля
+    и владельца для условных GET-запросов. Если владелец не разворачивается, JOIN не выполняется."""
+
+    queryset = Module.objects.all()
+    fieldset_required_fields = ('id', 'module_user', 'updated_at')
+
+    def apply_fieldset(self, queryset, fieldset):
+        if fieldset is None:
+            return queryset.with_owner(
+                fields=ModuleSerializer.Meta.fields,
+                owner_fields=(*UserListSerializer.Meta.fields, 'updated_at')
+            )
+
+        # Курсорная пагинация читает значение поля сортировки у последнего объекта страницы
+        ordering = OrderingFilter().get_ordering(self.request, queryset, self) or ()
+        fields = (*fieldset.fields, *self.fieldset_required_fields, *(field.lstrip('-') for field in ordering))
+        if 'module_user' not in fieldset.expand:
+            return queryset.only(*fields)
+        owner_fieldset = fieldset.nested.get('module_user')
+        return queryset.with_owner(
+            fields=fields,
+            owner_fields=(*(owner_fieldset.fields if owner_fieldset else UserListSerializer.Meta.fields), 'updated_at')
+        )
+
+
+class OwnerScopedObjectMixin:
+    """
+    Для выборки объекта модели Module с проверкой владельца в условии WHERE: объект, над которым действие разрешено,
+    находится одним запросом по индексу (module_user_id, id). Только если такого объекта нет, отдельным запросом
+    проверяется, существует ли он вообще, чтобы ответить 403, а не 404.
+    """
+
+    def get_object(self):
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        lookup = {self.lookup_field: self.kwargs[lookup_url_kwarg]}
+
+        obj = IsAuthenticatedAndIsOwner.filter_permitted(self.request, queryset).filter(**lookup).first()
+        if obj is None:
+            if queryset.filter(**lookup).exists():
+                self.permission_denied(self.request)
+            raise Http404
+        self.check_object_permissions(self.request, obj)
+        return obj
 
 
 # Create your views here.
-class ModuleCreateAPIView(generics.CreateAPIView):
+class ModuleCreateAPIView(ModuleQuerySetMixin, generics.CreateAPIView):
     """Для создания объектов модели Module."""
 
-    queryset = Module.objects.all()
     serializer_class = ModuleCreateSerializer
     permission_classes = (IsAuthenticated,)
 
@@ -19,42 +89,320 @@ class ModuleCreateAPIView(generics.CreateAPIView):
         new_mod = serializer.save()
         title = f'{new_mod.title}'
 
-        # Запуск асинхронной задачи по отправке сообщения на указанный электронный адрес
-        send_email_creation.delay(
-            self.request.user.email, title
-        )
+        # Сообщение на указанный электронный адрес отправляется фоновой задачей после фиксации транзакции
+        queue_creation_notifications({self.request.user: [title]})
         if not self.request.user.is_staff:
             new_mod.model_user = self.request.user
         new_mod.save()
 
 
-class ModuleListAPIView(generics.ListAPIView):
-    """Для просмотра информации об объектах модели Module."""
+class ModuleBulkCreateAPIView(generics.CreateAPIView):
+    """Для пакетного создания объектов модели Module: принимает массив модулей, создает их в одной транзакции и
+    отправляет каждому владельцу одно сообщение обо всех его новых модулях."""
 
     queryset = Module.objects.all()
+    serializer_class = ModuleBulkCreateSerializer
+    permission_classes = (IsAuthenticated,)
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(
+            data=request.data,
+            many=True,
+            allow_empty=False,
+            max_length=settings.MODULES_BULK_MAX_SIZE
+        )
+        serializer.is_valid(raise_exception=True)
+        self.perform_create(serializer)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    def perform_create(self, serializer):
+        new_modules = serializer.save()
+
+        # Массовая вставка не отправляет сигналы post_save, поэтому кеш списка сбрасывается явно
+        invalidate_modules()
+
+        titles_by_owner = defaultdict(list)
+        for module in new_modules:
+            titles_by_owner[module.module_user].append(module.title)
+
+        # Одно сообщение на каждого владельца модулей
+        queue_creation_notifications(titles_by_owner)
+
+
+class ModuleListAPIView(CachedListMixin, ModuleQuerySetMixin, generics.ListAPIView):
+    """Для просмотра информации об объектах модели Module. Список отдается постранично с курсором по полю сортировки."""
+
     serializer_class = ModuleSerializer
     permission_classes = (IsAuthenticatedAndIsOwner,)
+    pagination_class = ModuleCursorPagination
+    # Полнотекстовый поиск стоит перед OrderingFilter: курсорная пагинация берет сортировку у первого из них
+    filter_backends = (DjangoFilterBackend, ModuleFullTextSearchFilter, OrderingFilter)
+    filterset_fields = ('module_user',)
+    ordering_fields = ('id', 'title', 'position')
+    ordering = ('id',)
+
+
+class ModuleOwnListAPIView(ModuleQuerySetMixin, generics.ListAPIView):
+    """Для просмотра модулей текущего пользователя. Владелец задается условием WHERE по внешнему ключу, поэтому
+    страница списка выбирается по индексу (module_user_id, id) или (module_user_id, position)."""
+
+    serializer_class = ModuleSerializer
+    permission_classes = (IsAuthenticated,)
+    pagination_class = ModuleCursorPagination
+    filter_backends = (ModuleFullTextSearchFilter, OrderingFilter)
+    ordering_fields = ('id', 'title', 'position')
+    ordering = ('id',)
+
+    def get_queryset(self):
+        return super().get_queryset().filter(module_user_id=self.request.user.pk)
+
+
+class ModuleExportAPIView(APIView):
+    """
+    Для выгрузки всех объектов модели Module с email владельцев в формате NDJSON (по умолчанию) или CSV
+    (?export_format=csv). Ответ отдается потоком: строки читаются из базы данных порциями и сразу отправляются
+    клиенту, поэтому ни выборка, ни ответ целиком в памяти не хранятся.
+    """
+
+    permission_classes = (IsAuthenticated,)
+    format_param = 'export_format'
+
+    def get(self, request, *args, **kwargs):
+        export_format = request.query_params.get(self.format_param, 'ndjson')
+        if export_format not in EXPORT_FORMATS:
+            return Response(
+                {self.format_param: [f'Допустимые форматы: {", ".join(EXPORT_FORMATS)}.']},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        content_type, extension = EXPORT_FORMATS[export_format]
+        response = StreamingHttpResponse(stream_export(export_format), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="modules.{extension}"'
+        return response
+
+
+class ModuleAsyncQuerySetMixin:
+    """Для асинхронных представлений: модули выбираются вместе с владельцем одним запросом, как в
+    ModuleQuerySetMixin, чтобы сериализация не обращалась к базе данных."""
+
+    def get_queryset(self):
+        return Module.objects.with_owner(
+            fields=ModuleSerializer.Meta.fields,
+            owner_fields=UserListSerializer.Meta.fields
+        )
+
+
+class ModuleAsyncListAPIView(ModuleAsyncQuerySetMixin, AsyncAPIView):
+    """
+    Асинхронная версия списка объектов модели Module для ASGI. Страница выбирается по первичному ключу: параметр
+    <after> — идентификатор последнего модуля предыдущей страницы, ссылка на следующую страницу возвращается в <next>.
+    """
+
+    permission_classes = (IsAuthenticatedAndIsOwner,)
+    page_size = ModuleCursorPagination.page_size
+
+    async def get(self, request, *args, **kwargs):
+        modules, next_url = await self.paginate(request, self.get_queryset())
+        return self.render({
+            'next': next_url,
+            'results': ModuleSerializer(modules, many=True, context={'request': request}).data,
+        })
+
+
+class ModuleAsyncRetrieveAPIView(ModuleAsyncQuerySetMixin, AsyncAPIView):
+    """Асинхронная версия детальной информации об объекте модели Module для ASGI."""
+
+    permission_classes = (IsAuthenticatedAndIsOwner,)
+
+    async def get(self, request, pk, *args, **kwargs):
+        try:
+            module = await self.get_queryset().aget(pk=pk)
+        except Module.DoesNotExist:
+            raise exceptions.NotFound()
+        self.check_object_permissions(request, module)
+        return self.render(ModuleSerializer(module, context={'request': request}).data)
+
+
+class ModuleAutocompleteAPIView(APIView):
+    """
+    Для подсказок по названию объектов модели Module. Поиск выполняется по триграммному индексу и допускает опечатки:
+    подходят названия, похожие на запрос целиком или содержащие слово, похожее на запрос. Возвращаются только
+    <id> и <title> наиболее похожих модулей, результаты для частых запросов кешируются на короткое время.
+    """
+
+    permission_classes = (IsAuthenticated,)
+    query_param = 'q'
+    limit_param = 'limit'
+    min_query_length = 3
+    default_limit = 10
+    max_limit = 50
+
+    def get(self, request, *args, **kwargs):
+        query = ' '.join(request.query_params.get(self.query_param, '').lower().split())
+        if len(query) < self.min_query_length:
+            return Response([])
 
+        try:
+            limit = min(int(request.query_params.get(self.limit_param, self.default_limit)), self.max_limit)
+        except ValueError:
+            limit = self.default_limit
+        if limit < 1:
+            limit = self.default_limit
 
-class ModuleRetrieveAPIView(generics.RetrieveAPIView):
+        key = f'modules:autocomplete:{limit}:{query}'
+        suggestions = cache.get(key)
+        if suggestions is None:
+            suggestions = self.get_suggestions(query, limit)
+            cache.set(key, suggestions, settings.MODULES_AUTOCOMPLETE_CACHE_TIMEOUT)
+        return Response(suggestions)
+
+    def get_suggestions(self, query, limit):
+        return list(
+            Module.objects.filter(
+                Q(title__trigram_word_similar=query) | Q(title__trigram_similar=query)
+            ).annotate(
+                similarity=Greatest(TrigramWordSimilarity(query, 'title'), TrigramSimilarity('title', query))
+            ).order_by('-similarity', 'id').values('id', 'title')[:limit]
+        )
+
+
+class ModuleRetrieveAPIView(CachedRetrieveMixin, ModuleQuerySetMixin, generics.RetrieveAPIView):
     """Для получения детальной информации об объекте модели Module."""
 
-    queryset = Module.objects.all()
     serializer_class = ModuleSerializer
     permission_classes = (IsAuthenticatedAndIsOwner,)
 
 
-class ModuleUpdateAPIView(generics.UpdateAPIView):
+class ModuleUpdateAPIView(OwnerScopedObjectMixin, ModuleQuerySetMixin, generics.UpdateAPIView):
     """Для изменения объекта модели Module."""
 
-    queryset = Module.objects.all()
     serializer_class = ModuleSerializer
     permission_classes = (IsAuthenticatedAndIsOwner,)
 
 
-class ModuleDeleteAPIView(generics.DestroyAPIView):
+class ModuleDeleteAPIView(OwnerScopedObjectMixin, ModuleQuerySetMixin, generics.DestroyAPIView):
     """Для удаления объектов модели Module."""
 
-    queryset = Module.objects.all()
     serializer_class = ModuleSerializer
     permission_classes = (IsAuthenticatedAndIsOwner,)
+
+
+class ModuleReorderAPIView(OwnerScopedObjectMixin, ModuleQuerySetMixin, generics.GenericAPIView):
+    """Для перемещения объекта модели Module сразу после или перед другим модулем того же владельца. Изменяется только
+    порядковый номер перемещаемого модуля."""
+
+    serializer_class = ModuleReorderSerializer
+    permission_classes = (IsAuthenticatedAndIsOwner,)
+
+    def post(self, request, *args, **kwargs):
+        instance = self.get_object()
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        after = 'after' in serializer.validated_data
+        target_id = serializer.validated_data['after' if after else 'before']
+
+        try:
+            move_module(instance, target_id, after=after)
+        except Module.DoesNotExist:
+            return Response(
+                {'after' if after else 'before': [f'Модуль {target_id} не найден среди других модулей владельца.']},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(ModuleSerializer(instance).data)
+
+
+class ModuleBulkActionMixin:
+    """Для пакетных действий над объектами модели Module. Права владельца проверяются для всего набора условием WHERE,
+    а результат возвращается для каждого переданного идентификатора."""
+
+    queryset = Module.objects.all()
+    permission_classes = (IsAuthenticated,)
+
+    def get_permitted_ids(self, ids):
+        """Метод блокирует и возвращает идентификаторы объектов, над которыми пользователю разрешено действие."""
+
+        queryset = IsAuthenticatedAndIsOwner.filter_permitted(self.request, self.get_queryset())
+        return set(queryset.select_for_update().filter(pk__in=ids).values_list('pk', flat=True))
+
+    def get_outcomes(self, ids, permitted_ids, status_done):
+        """Метод возвращает результат для каждого идентификатора. Существование объектов, над которыми действие не
+        выполнено, проверяется только для них."""
+
+        rejected_ids = set(ids) - permitted_ids
+        existing_ids = set()
+        if rejected_ids:
+            existing_ids = set(self.get_queryset().filter(pk__in=rejected_ids).values_list('pk', flat=True))
+
+        outcomes = []
+        for pk in dict.fromkeys(ids):
+            if pk in permitted_ids:
+                outcomes.append({'id': pk, 'status': status_done})
+            elif pk in existing_ids:
+                outcomes.append({'id': pk, 'status': 'forbidden'})
+            else:
+                outcomes.append({'id': pk, 'status': 'not_found'})
+        return Response({'results': outcomes})
+
+
+class ModuleBulkUpdateAPIView(ModuleBulkActionMixin, generics.GenericAPIView):
+    """Для пакетного изменения объектов модели Module одним запросом UPDATE. Изменять можно только свои модули."""
+
+    serializer_class = ModuleBulkUpdateSerializer
+
+    def patch(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        fields = dict(serializer.validated_data)
+        ids = fields.pop('ids')
+
+        with transaction.atomic():
+            permitted_ids = self.get_permitted_ids(ids)
+            if permitted_ids:
+                # Метод update() не обновляет поля auto_now и не отправляет сигналы post_save
+                Module.objects.filter(pk__in=permitted_ids).update(**fields, updated_at=timezone.now())
+                invalidate_modules(permitted_ids)
+
+        return self.get_outcomes(ids, permitted_ids, 'updated')
+
+
+class ModuleBulkDeleteAPIView(ModuleBulkActionMixin, generics.GenericAPIView):
+    """Для пакетного удаления объектов модели Module одним запросом DELETE. Удалять можно свои модули, суперпользователь
+    может удалять любые."""
+
+    serializer_class = ModuleBulkDeleteSerializer
+
+    def delete(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data['ids']
+
+        # Сигналы post_delete отдельных строк только накапливают идентификаторы: кеш сбрасывается один раз после
+        # фиксации транзакции
+        with transaction.atomic(), batch_invalidation():
+            permitted_ids = self.get_permitted_ids(ids)
+            if permitted_ids:
+                Module.objects.filter(pk__in=permitted_ids).delete()
+
+        return self.get_outcomes(ids, permitted_ids, 'deleted')
+
+
+class ModuleBulkReorderAPIView(ModuleBulkActionMixin, generics.GenericAPIView):
+    """Для пакетного изменения порядка объектов модели Module: переданные модули пользователя расставляются в порядке
+    <ids> на те порядковые номера, которые они уже занимают, остальные модули не изменяются."""
+
+    serializer_class = ModuleBulkReorderSerializer
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data['ids']
+
+        permitted_ids = set(
+            IsAuthenticatedAndIsOwner.filter_permitted(request, self.get_queryset()).filter(
+                pk__in=ids
+            ).values_list('pk', flat=True)
+        )
+        if permitted_ids:
+            reorder_modules(request.user.pk, [pk for pk in ids if pk in permitted_ids])
+
+        return self.get_outcomes(ids, permitted_ids, 'reordered')
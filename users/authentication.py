@@ -0,0 +1,157 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from users.models import User
+
+
+class LocalLRUCache:
+    """Кеш в памяти процесса с ограничением количества записей (вытесняются давно не использованные) и временем
+    жизни записи."""
+
+    def __init__(self, maxsize, timeout):
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.timeout)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+local_users = LocalLRUCache(
+    maxsize=settings.USERS_AUTH_LOCAL_CACHE_SIZE,
+    timeout=settings.USERS_AUTH_LOCAL_CACHE_TIMEOUT
+)
+
+
+# Поля пользователя, которые хранятся в кеше. Хеш пароля в общий кеш не попадает: при обращении к нему (например,
+# при смене пароля) поле догружается из базы данных как отложенное.
+CACHED_USER_FIELDS = tuple(field.attname for field in User._meta.concrete_fields if field.attname != 'password')
+
+
+def _user_cache_key(user_id):
+    return f'users:auth:{user_id}'
+
+
+def _build_user(data):
+    """Метод собирает пользователя из закешированных полей. Каждый вызов создает новый объект, поэтому изменения
+    request.user в одном запросе не видны другим."""
+
+    return User.from_db(None, CACHED_USER_FIELDS, [data[name] for name in CACHED_USER_FIELDS])
+
+
+def get_cached_user(user_id):
+    """
+    Метод возвращает пользователя по идентификатору: сначала из кеша процесса, затем из общего кеша и только при
+    промахе обоих — из базы данных. В кеше хранятся только поля из CACHED_USER_FIELDS. Если пользователя нет,
+    возвращается None.
+    """
+
+    key = _user_cache_key(user_id)
+    data = local_users.get(key)
+    if data is None:
+        data = cache.get(key)
+        if data is None:
+            data = User.objects.filter(pk=user_id).values(*CACHED_USER_FIELDS).first()
+            if data is None:
+                return None
+            cache.set(key, data, settings.USERS_AUTH_CACHE_TIMEOUT)
+        local_users.set(key, data)
+    return _build_user(data)
+
+
+async def aget_cached_user(user_id):
+    """Асинхронная версия get_cached_user: общий кеш и база данных опрашиваются без блокировки цикла событий."""
+
+    key = _user_cache_key(user_id)
+    data = local_users.get(key)
+    if data is None:
+        data = await cache.aget(key)
+        if data is None:
+            data = await User.objects.filter(pk=user_id).values(*CACHED_USER_FIELDS).afirst()
+            if data is None:
+                return None
+            await cache.aset(key, data, settings.USERS_AUTH_CACHE_TIMEOUT)
+        local_users.set(key, data)
+    return _build_user(data)
+
+
+def invalidate_user(user_id):
+    """Метод удаляет пользователя из общего кеша и кеша текущего процесса. Кеш других процессов устаревает не позже
+    чем через USERS_AUTH_LOCAL_CACHE_TIMEOUT секунд."""
+
+    key = _user_cache_key(user_id)
+    cache.delete(key)
+    local_users.delete(key)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """Для аутентификации по JWT-токену без запроса пользователя к базе данных: пользователь берется из двухуровневого
+    кеша (память процесса, затем Redis), который сбрасывается при сохранении и удалении пользователя."""
+
+    def get_user(self, validated_token):
+        return self.check_user(get_cached_user(self.get_user_id(validated_token)))
+
+    async def aauthenticate(self, request):
+        """Асинхронная версия authenticate для асинхронных представлений: токен проверяется без обращения к базе
+        данных, а пользователь берется из кеша через aget_cached_user."""
+
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+        user = await aget_cached_user(self.get_user_id(validated_token))
+        return self.check_user(user), validated_token
+
+    def get_user_id(self, validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+
+    def check_user(self, user):
+        """Метод проверяет, что пользователь существует и активен."""
+
+        if user is None:
+            raise AuthenticationFailed(_('User not found'), code='user_not_found')
+
+        if not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+
+        return user
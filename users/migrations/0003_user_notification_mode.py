@@ -0,0 +1,18 @@
+# Generated by Django 4.2.6 on 2026-10-18 13:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_user_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='notification_mode',
+            field=models.CharField(choices=[('immediate', 'сразу'), ('digest', 'сводкой')], default='immediate', max_length=10, verbose_name='режим уведомлений'),
+        ),
+    ]
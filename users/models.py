@@ -32,12 +32,26 @@ class UserManager(BaseUserManager):
 
 
 class User(AbstractUser):
+    NOTIFICATION_IMMEDIATE = 'immediate'
+    NOTIFICATION_DIGEST = 'digest'
+    NOTIFICATION_MODES = (
+        (NOTIFICATION_IMMEDIATE, 'сразу'),
+        (NOTIFICATION_DIGEST, 'сводкой'),
+    )
+
     username = None
 
     email = models.EmailField(unique=True, max_length=150, verbose_name='электронная_почта')
     phone = models.CharField(max_length=30, verbose_name='номер_телефона', **NULLABLE)
     city = models.CharField(max_length=150, verbose_name='город', **NULLABLE)
     avatar = models.ImageField(upload_to='users/', verbose_name='аватарка', **NULLABLE)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True, verbose_name='дата изменения')
+    notification_mode = models.CharField(
+        max_length=10,
+        choices=NOTIFICATION_MODES,
+        default=NOTIFICATION_IMMEDIATE,
+        verbose_name='режим уведомлений'
+    )
 
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = []
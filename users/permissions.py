@@ -12,6 +12,4 @@ class IsAuthenticatedOrIsOwner(BasePermission):
         return False
 
     def has_object_permission(self, request, view, obj):
-        if request.user.email == obj.email:
-            return True
-        return False
+        return obj.pk == request.user.pk
@@ -1,17 +1,18 @@
 from rest_framework import serializers
 
+from config.fieldsets import SparseFieldsetSerializerMixin
 from users.models import User
 
 
-class UserListSerializer(serializers.ModelSerializer):
+class UserListSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ('id', 'email', 'first_name', 'city', 'avatar')
         ref_name = 'UserListSerializer'
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = User
-        fields = ('id', 'email', 'first_name', 'last_name', 'city', 'phone', 'avatar')
+        fields = ('id', 'email', 'first_name', 'last_name', 'city', 'phone', 'avatar', 'notification_mode')
         ref_name = 'UserSerializer'
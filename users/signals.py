@@ -0,0 +1,14 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from users.authentication import invalidate_user
+from users.models import User
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_authentication_cache(sender, instance, **kwargs):
+    """Сбрасывает кеш пользователя для аутентификации: изменение пароля, деактивация и любое другое сохранение
+    должны сразу учитываться при проверке токена."""
+
+    invalidate_user(instance.pk)
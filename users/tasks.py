@@ -0,0 +1,22 @@
+from celery import shared_task
+from django.utils.module_loading import import_string
+
+from mailing.delivery import MailTask, open_connection
+from users.models import User
+
+
+@shared_task(base=MailTask)
+def send_user_email(email_class, user_id, context, to):
+    """
+    Метод отрисовывает и отправляет письмо djoser (активация, сброс пароля) пользователю <user_id>. Шаблоны
+    загружаются через кешированный загрузчик, поэтому компилируются один раз на процесс воркера. При ошибке SMTP
+    отправка повторяется с экспоненциально растущей задержкой (1, 2, 4... секунд, не более 10 минут).
+    """
+
+    user = User.objects.filter(pk=user_id).first()
+    if user is None:
+        return
+    message = import_string(email_class)(context={**context, 'user': user})
+    with open_connection() as connection:
+        message.connection = connection
+        message.send_now(to)
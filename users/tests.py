@@ -1,11 +1,21 @@
+import re
+import time
+from smtplib import SMTPException
+from unittest.mock import patch
+
 from django.core import mail
+from django.core.cache import cache
+from django.test import override_settings
 from rest_framework import status
 from rest_framework.test import APITestCase
 
+from users.authentication import LocalLRUCache, get_cached_user
 from users.models import User
+from users.tasks import send_user_email
 
 
 # Create your tests here.
+@override_settings(CELERY_TASK_ALWAYS_EAGER=True)
 class UserModelTestCase(APITestCase):
     def setUp(self) -> None:
         # Получение маршрутов
@@ -65,6 +75,7 @@ class UserModelTestCase(APITestCase):
         return super().tearDown()
 
 
+@override_settings(CELERY_TASK_ALWAYS_EAGER=True)
 class UserRegistrationTestCase(APITestCase):
     """Тестирование регистрации / активации и авторизации пользователей."""
 
@@ -109,12 +120,13 @@ class UserRegistrationTestCase(APITestCase):
         верификация по email. После верификации пользователь может авторизоваться на сайте с использованием JWT-токенов.
         """
 
-        # Регистрация пользователя
-        response_registration = self.client.post(
-            self.register_url,
-            self.user_data,
-            format='json'
-        )
+        # Регистрация пользователя (письмо активации отправляется задачей после фиксации транзакции)
+        with self.captureOnCommitCallbacks(execute=True):
+            response_registration = self.client.post(
+                self.register_url,
+                self.user_data,
+                format='json'
+            )
 
         # Проверка статус кода
         self.assertEqual(
@@ -222,6 +234,34 @@ class UserActionTestCase(UserModelTestCase):
             'test@test.com'
         )
 
+    def test_user_can_choose_fields(self):
+        """Пользователь может получить только выбранные поля профиля и списка пользователей."""
+
+        # GET-запрос на профиль с выбранными полями
+        response = self.client.get(
+            self.user_detail_url,
+            {'fields': 'email,city'},
+            headers=self.headers_user_1
+        )
+
+        # Проверка полей в ответе
+        self.assertEqual(
+            response.json(),
+            {'email': 'test@test.com', 'city': self.user_test.city}
+        )
+
+        # GET-запрос на список пользователей с выбранными полями
+        response = self.client.get(
+            '/user/',
+            {'fields': 'id'},
+            headers=self.headers_user_1
+        )
+
+        # Проверка полей в ответе
+        self.assertTrue(
+            all(set(user) == {'id'} for user in response.json())
+        )
+
     def test_user_cannot_get_detail_without_authentication(self):
         """Анонимные пользователи не имеют доступа к информации веб-ресурса."""
 
@@ -424,3 +464,288 @@ class UserActionTestCase(UserModelTestCase):
             response.json(),
             {'detail': 'У вас недостаточно прав для выполнения данного действия.'}
         )
+
+
+class UserConditionalGetTestCase(UserModelTestCase):
+    """Тестирование условных GET-запросов (ETag / Last-Modified) к пользователям."""
+
+    def setUp(self) -> None:
+        super().setUp()
+
+        # Получение маршрутов
+        self.user_list_url = '/user/'
+        self.user_detail_url = f'/auth/users/{self.user_test.pk}/'
+
+    def test_unchanged_user_list_returns_not_modified(self):
+        """Неизменившийся список пользователей возвращается ответом 304, после изменения профиля — ответом 200."""
+
+        # GET-запрос на получение валидаторов списка
+        response = self.client.get(self.user_list_url, headers=self.headers_user_1)
+
+        # Повторный GET-запрос с полученным ETag
+        response_not_modified = self.client.get(
+            self.user_list_url,
+            headers={**self.headers_user_1, 'If-None-Match': response['ETag']}
+        )
+
+        # Проверка статус кода
+        self.assertEqual(
+            response_not_modified.status_code,
+            status.HTTP_304_NOT_MODIFIED
+        )
+
+        # Изменение профиля пользователя
+        self.user_2.city = 'Казань'
+        self.user_2.save()
+
+        # GET-запрос с устаревшим ETag
+        response_modified = self.client.get(
+            self.user_list_url,
+            headers={**self.headers_user_1, 'If-None-Match': response['ETag']}
+        )
+
+        # Проверка статус кода
+        self.assertEqual(
+            response_modified.status_code,
+            status.HTTP_200_OK
+        )
+
+    def test_unchanged_user_detail_returns_not_modified(self):
+        """Неизменившийся профиль пользователя возвращается ответом 304."""
+
+        # GET-запрос на получение валидаторов профиля
+        response = self.client.get(self.user_detail_url, headers=self.headers_user_1)
+
+        # Повторный GET-запрос с полученным ETag
+        response_not_modified = self.client.get(
+            self.user_detail_url,
+            headers={**self.headers_user_1, 'If-None-Match': response['ETag']}
+        )
+
+        # Проверка статус кода
+        self.assertEqual(
+            response_not_modified.status_code,
+            status.HTTP_304_NOT_MODIFIED
+        )
+
+
+@override_settings(CELERY_TASK_ALWAYS_EAGER=True)
+class UserEmailTestCase(APITestCase):
+    """Для тестирования отправки писем djoser фоновой задачей."""
+
+    def setUp(self) -> None:
+        # Получение маршрутов
+        self.register_url = '/auth/users/'
+        self.activation_url = '/auth/users/activation/'
+        self.reset_password_url = '/auth/users/reset_password/'
+
+        # Данные для регистрации пользователя
+        self.user_data = {
+            'email': 'test@test.com',
+            'password': 'ChooseBestPassword'
+        }
+
+    def test_activation_email_is_sent_by_task_after_commit(self):
+        """Письмо активации не отправляется в запросе на регистрацию, а передается фоновой задаче."""
+
+        with patch('users.tasks.send_user_email.delay') as mock_task:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(
+                    self.register_url,
+                    self.user_data,
+                    format='json'
+                )
+
+        # Проверка статус кода
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_201_CREATED
+        )
+
+        # Проверка того, что в запросе письмо не отправлялось, а задача получила адрес и пользователя
+        self.assertEqual(len(mail.outbox), 0)
+        user = User.objects.get(email='test@test.com')
+        email_class, user_id, context, to = mock_task.call_args.args
+        self.assertEqual((email_class, user_id, to), ('users.views.ActivationEmail', user.pk, ['test@test.com']))
+        self.assertEqual(set(context), {'domain', 'protocol', 'site_name'})
+
+    def test_activation_email_rendered_by_task_activates_user(self):
+        """Письмо, отрисованное задачей, содержит uid и токен, которыми можно активировать пользователя."""
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                self.register_url,
+                self.user_data,
+                format='json'
+            )
+
+        # Получение uid и токена из письма
+        self.assertEqual(len(mail.outbox), 1)
+        email_lines = re.sub(r'<[^>]+>', '', mail.outbox[0].body).splitlines()
+        act_data = dict(line.split(': ') for line in email_lines if line.startswith(('uid: ', 'token: ')))
+
+        # POST-запрос на активацию пользователя
+        response = self.client.post(
+            self.activation_url,
+            act_data,
+            format='json'
+        )
+
+        # Проверка статус кода
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_204_NO_CONTENT
+        )
+
+    def test_password_reset_email_is_sent_by_task(self):
+        """Письмо для сброса пароля отправляется фоновой задачей."""
+
+        User.objects.create(email='test@test.com', is_active=True)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                self.reset_password_url,
+                {'email': 'test@test.com'},
+                format='json'
+            )
+
+        # Проверка статус кода
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_204_NO_CONTENT
+        )
+
+        # Проверка отправленного письма
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['test@test.com'])
+
+    def test_email_task_retries_smtp_errors_with_backoff(self):
+        """Задача отправки повторяет попытки при ошибках SMTP с экспоненциальной задержкой."""
+
+        self.assertIn(SMTPException, send_user_email.autoretry_for)
+        self.assertTrue(send_user_email.retry_backoff)
+        self.assertEqual(send_user_email.max_retries, 5)
+
+
+class UserAuthenticationCacheTestCase(UserModelTestCase):
+    """Для тестирования кеша пользователей при аутентификации по JWT-токену."""
+
+    def setUp(self) -> None:
+        super().setUp()
+
+        # Получение маршрутов
+        self.me_url = '/auth/users/me/'
+
+    def test_authenticated_request_does_not_query_user(self):
+        """Повторный запрос с тем же токеном не загружает пользователя из базы данных."""
+
+        self.client.get(self.me_url, headers=self.headers_user_1)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.me_url, headers=self.headers_user_1)
+
+        # Проверка ответа
+        self.assertEqual(
+            response.json()['email'],
+            'test@test.com'
+        )
+
+    def test_deactivated_user_is_rejected_immediately(self):
+        """Деактивированный пользователь не проходит аутентификацию, даже если он был в кеше."""
+
+        self.client.get(self.me_url, headers=self.headers_user_1)
+
+        self.user_test.is_active = False
+        self.user_test.save()
+
+        response = self.client.get(self.me_url, headers=self.headers_user_1)
+
+        # Проверка статус кода
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_401_UNAUTHORIZED
+        )
+
+    def test_password_change_invalidates_cached_user(self):
+        """После смены пароля пользователь загружается из базы данных заново."""
+
+        # Хеш пароля не хранится в кеше и догружается при обращении, поэтому старый хеш читается до смены пароля
+        old_password = get_cached_user(self.user_test.pk).password
+
+        self.user_test.set_password('AnotherBestPassword')
+        self.user_test.save()
+
+        # Проверка того, что пользователь из кеша получает новый хеш пароля
+        self.assertNotEqual(get_cached_user(self.user_test.pk).password, old_password)
+        self.assertTrue(get_cached_user(self.user_test.pk).check_password('AnotherBestPassword'))
+
+    def test_shared_cache_does_not_store_password_hash(self):
+        """В общий кеш попадают только поля из CACHED_USER_FIELDS, хеш пароля догружается из базы данных."""
+
+        get_cached_user(self.user_test.pk)
+        cached_data = cache.get(f'users:auth:{self.user_test.pk}')
+
+        # Проверка содержимого кеша
+        self.assertEqual(cached_data['email'], 'test@test.com')
+        self.assertNotIn('password', cached_data)
+
+        with self.assertNumQueries(1):
+            self.assertTrue(get_cached_user(self.user_test.pk).check_password('ChooseBestPassword'))
+
+    def test_local_cache_evicts_least_recently_used_and_expired_entries(self):
+        """Кеш процесса вытесняет давно не использованные записи и не возвращает просроченные."""
+
+        local_cache = LocalLRUCache(maxsize=2, timeout=60)
+        local_cache.set('a', 1)
+        local_cache.set('b', 2)
+        local_cache.get('a')
+        local_cache.set('c', 3)
+
+        # Проверка вытеснения записи 'b'
+        self.assertEqual((local_cache.get('a'), local_cache.get('b'), local_cache.get('c')), (1, None, 3))
+
+        with patch('users.authentication.time.monotonic', return_value=time.monotonic() + 61):
+            # Проверка истечения времени жизни
+            self.assertIsNone(local_cache.get('a'))
+
+    async def test_async_user_list_uses_async_authentication(self):
+        """Первая страница асинхронного списка пользователей совпадает с синхронным списком, а недействительный токен
+        отклоняется."""
+
+        response = await self.async_client.get('/user/async/', headers=self.headers_user_1)
+        sync_response = await self.async_client.get('/user/', headers=self.headers_user_1)
+
+        # Проверка содержимого ответа (синхронный список не сортируется, асинхронный упорядочен по id)
+        self.assertEqual(
+            response.json()['results'],
+            sorted(sync_response.json(), key=lambda user: user['id'])
+        )
+
+        response = await self.async_client.get('/user/async/', headers={'Authorization': 'Bearer invalid'})
+
+        # Проверка статус кода
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_401_UNAUTHORIZED
+        )
+        self.assertEqual(response.json()['code'], 'token_not_valid')
+
+    async def test_async_user_list_is_paginated(self):
+        """Асинхронный список пользователей отдается страницами по первичному ключу."""
+
+        with patch('users.views.UserAsyncListAPIView.page_size', 1):
+            response = await self.async_client.get('/user/async/', headers=self.headers_user_1)
+            next_response = await self.async_client.get(response.json()['next'], headers=self.headers_user_1)
+
+        # Проверка страниц и ссылки на следующую страницу
+        self.assertEqual([user['email'] for user in response.json()['results']], ['test@test.com'])
+        self.assertEqual([user['email'] for user in next_response.json()['results']], ['another@test.com'])
+        self.assertIsNone(next_response.json()['next'])
+
+        response = await self.async_client.get('/user/async/', {'after': 'x'}, headers=self.headers_user_1)
+
+        # Проверка статус кода
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_400_BAD_REQUEST
+        )
@@ -2,7 +2,7 @@ from django.urls import path
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 
 from users.apps import UsersConfig
-from users.views import UserListAPIView
+from users.views import UserAsyncListAPIView, UserListAPIView
 
 app_name = UsersConfig.name
 
@@ -10,4 +10,5 @@ urlpatterns = [
     path('token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('', UserListAPIView.as_view(), name='user_list'),
+    path('async/', UserAsyncListAPIView.as_view(), name='user_async_list'),
 ]
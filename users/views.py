@@ -1,24 +1,79 @@
+from django.db import transaction
 from rest_framework import generics
 from rest_framework.permissions import IsAuthenticated
-from djoser import email
+from djoser import email, views
+from templated_mail.mail import BaseEmailMessage
 
+from config.async_views import AsyncAPIView
+from config.conditional import ConditionalListMixin, ConditionalRetrieveMixin
+from config.fieldsets import SparseFieldsetMixin
+from modules.pagination import EstimatedCountCursorPagination
 from users.models import User
 from users.serializers import UserListSerializer
+from users.tasks import send_user_email
 
 
 # Create your views here.
-class UserListAPIView(generics.ListAPIView):
+class UserListAPIView(ConditionalListMixin, SparseFieldsetMixin, generics.ListAPIView):
     """Для получения объектов модели User."""
     queryset = User.objects.all()
     serializer_class = UserListSerializer
     permission_classes = (IsAuthenticated,)
 
 
-class ActivationEmail(email.ActivationEmail):
+class UserAsyncListAPIView(AsyncAPIView):
+    """Асинхронная версия списка объектов модели User для ASGI. Список отдается страницами по первичному ключу
+    (параметр <after>), ссылка на следующую страницу возвращается в <next>."""
+
+    page_size = EstimatedCountCursorPagination.page_size
+
+    async def get(self, request, *args, **kwargs):
+        users, next_url = await self.paginate(request, User.objects.only(*UserListSerializer.Meta.fields))
+        return self.render({
+            'next': next_url,
+            'results': UserListSerializer(users, many=True, context={'request': request}).data,
+        })
+
+
+class UserViewSet(ConditionalListMixin, ConditionalRetrieveMixin, SparseFieldsetMixin, views.UserViewSet):
+    """Эндпоинты djoser для пользователей с поддержкой условных GET-запросов к списку и профилю и выборочного вывода
+    полей (?fields=)."""
+
+    # Время изменения нужно условным GET-запросам к профилю
+    fieldset_required_fields = ('pk', 'updated_at')
+
+
+class CeleryEmailMixin:
+    """
+    Для отправки писем djoser фоновой задачей. В запросе вычисляются только домен, протокол и название сайта, а
+    письмо отрисовывается и отправляется воркером Celery после фиксации транзакции, поэтому время регистрации и
+    сброса пароля не зависит от SMTP-сервера.
+    """
+
+    context_keys = ('domain', 'protocol', 'site_name')
+
+    def send(self, to, *args, **kwargs):
+        # uid и токен вычисляет воркер, в запросе нужен только общий контекст BaseEmailMessage
+        context = BaseEmailMessage.get_context_data(self)
+        email_class = f'{type(self).__module__}.{type(self).__qualname__}'
+        transaction.on_commit(lambda: send_user_email.delay(
+            email_class,
+            context['user'].pk,
+            {key: context[key] for key in self.context_keys},
+            list(to)
+        ))
+
+    def send_now(self, to, *args, **kwargs):
+        """Метод отрисовывает и отправляет письмо в текущем процессе."""
+
+        super().send(to, *args, **kwargs)
+
+
+class ActivationEmail(CeleryEmailMixin, email.ActivationEmail):
     """Для отправки сообщения после регистрации пользователя."""
     template_name = 'users/activation.html'
 
 
-class PasswordResetEmail(email.PasswordResetEmail):
+class PasswordResetEmail(CeleryEmailMixin, email.PasswordResetEmail):
     """Для отправки сообщения, если пользователь решит сменить пароль."""
     template_name = 'users/password_reset_confirm.html'